@@ -0,0 +1,141 @@
+"""
+Benchmark del índice de similitud del mood cache.
+
+Compara la latencia de búsqueda del scan lineal con SequenceMatcher (implementación
+original) contra el índice de trigramas de MoodCacheService, para distintos
+tamaños de caché, y mide en cuántas búsquedas ambos devuelven el mismo mejor
+match (el índice es aproximado: "agreement" puede bajar del 100%).
+
+Uso (desde backend/):
+    python benchmarks/bench_similarity_index.py
+    python benchmarks/bench_similarity_index.py --sizes 100 1000 10000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.mood_cache_service import TrigramIndex
+
+ACTIVITIES = [
+    "studying", "working out", "driving", "cooking", "reading", "running",
+    "estudiando", "cocinando", "conduciendo", "corriendo", "leyendo", "bailando",
+    "coding", "cleaning the house", "walking the dog", "meditating", "painting",
+]
+CONTEXTS = [
+    "late at night", "in the morning", "with friends", "alone", "in the rain",
+    "por la noche", "con amigos", "en la playa", "después del trabajo", "a las 3am",
+    "on a sunday", "before an exam", "after a breakup", "en invierno", "on the bus",
+]
+MOODS = [
+    "need focus", "feeling sad", "super happy", "very tired", "nostalgic",
+    "triste", "feliz", "con energía", "relajado", "melancólico", "motivated",
+    "anxious", "romantic", "chill vibes", "angry", "hopeful",
+]
+
+
+def make_queries(n: int, rng: random.Random) -> list:
+    """Genera n queries sintéticas distintas combinando actividad/contexto/mood"""
+    queries = set()
+    while len(queries) < n:
+        parts = [rng.choice(ACTIVITIES), rng.choice(CONTEXTS), rng.choice(MOODS)]
+        if rng.random() < 0.5:
+            parts.append(rng.choice(CONTEXTS))
+        queries.add(" ".join(parts))
+    return sorted(queries, key=lambda _: rng.random())
+
+
+def perturb(query: str, rng: random.Random) -> str:
+    """Simula typos/variaciones de una query existente"""
+    chars = list(query)
+    for _ in range(rng.randint(1, 4)):
+        pos = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            chars.pop(pos)
+        elif op < 0.8:
+            chars.insert(pos, rng.choice("abcdefghijklmnopqrstuvwxyz "))
+        else:
+            chars[pos] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars).strip()
+
+
+def linear_scan(cache_keys: list, query: str, threshold: float):
+    """Implementación original: SequenceMatcher contra cada entrada"""
+    best_match = None
+    best_similarity = 0.0
+    for cached_query in cache_keys:
+        similarity = SequenceMatcher(None, query, cached_query).ratio()
+        if similarity > best_similarity and similarity >= threshold:
+            best_similarity = similarity
+            best_match = cached_query
+    return best_match
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run(sizes: list, n_queries: int, threshold: float, seed: int):
+    rng = random.Random(seed)
+    print("=" * 86)
+    print("📊 MOOD CACHE SIMILARITY BENCHMARK")
+    print("=" * 86)
+    print(f"{'size':>8} | {'scan p50':>10} | {'index p50':>10} | {'index p95':>10} | {'speedup':>8} | {'agreement':>9}")
+    print("-" * 86)
+
+    for size in sizes:
+        keys = make_queries(size, rng)
+        index = TrigramIndex()
+        for key in keys:
+            index.add(key)
+
+        # Mitad queries perturbadas (deberían hacer match), mitad nuevas (miss)
+        lookups = [perturb(rng.choice(keys), rng) for _ in range(n_queries // 2)]
+        lookups += make_queries(n_queries - len(lookups), random.Random(seed + size))
+
+        # El scan lineal es muy lento en tamaños grandes: se mide sobre una muestra
+        scan_sample = lookups[:max(10, min(len(lookups), 200_000 // size))]
+
+        scan_times, index_times = [], []
+        agree = 0
+        for query in scan_sample:
+            start = time.perf_counter()
+            expected = linear_scan(keys, query, threshold)
+            scan_times.append(time.perf_counter() - start)
+
+            got, _ = index.best_match(query, threshold)
+            agree += got == expected
+
+        for query in lookups:
+            start = time.perf_counter()
+            index.best_match(query, threshold)
+            index_times.append(time.perf_counter() - start)
+
+        scan_p50 = percentile(scan_times, 50) * 1000
+        index_p50 = percentile(index_times, 50) * 1000
+        index_p95 = percentile(index_times, 95) * 1000
+        speedup = scan_p50 / index_p50 if index_p50 else float("inf")
+        print(
+            f"{size:>8} | {scan_p50:>8.2f}ms | {index_p50:>8.3f}ms | {index_p95:>8.3f}ms | "
+            f"{speedup:>7.1f}x | {agree / len(scan_sample):>8.1%}"
+        )
+
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del índice de similitud del mood cache")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.threshold, args.seed)
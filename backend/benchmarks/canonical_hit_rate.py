@@ -0,0 +1,250 @@
+"""
+Informe offline del hit rate del mood cache con keys canónicas.
+
+Toma las queries de datasets/mood_cache.json (solo lectura), genera
+variantes como las que escriben los usuarios (mayúsculas, puntuación,
+emojis, espacios, acentos, stopwords, orden de palabras, typos) y compara
+la key antigua (lower + strip) con la forma canónica de QueryCanonicalizer:
+
+- exact: hit en el dict (O(1))
+- similar: hit por el índice de trigramas (threshold 0.75)
+- miss
+- wrong: hits (exactos o similares) que devuelven un resultado distinto
+  del de la query original
+
+También lista las queries del dataset que comparten forma canónica.
+
+Uso (desde backend/):
+    python benchmarks/canonical_hit_rate.py
+    python benchmarks/canonical_hit_rate.py --variants 10 --seed 3
+    python benchmarks/canonical_hit_rate.py --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.lexicon_service import fold
+from services.mood_cache_service import TrigramIndex
+from services.query_canonicalizer import QueryCanonicalizer
+
+DATASET = os.path.join(BACKEND_DIR, "datasets", "mood_cache.json")
+THRESHOLD = 0.75
+
+EMOJIS = ["🎧", "😢", "🔥", "☕", "💪", "🌧️", "✨"]
+PUNCTUATION = ["!", "!!", "?", "...", ",", ".", " -"]
+FILLERS = ["music for", "songs for", "música para", "canciones para"]
+STOPWORDS = ["the", "a", "my", "de", "la", "el", "con"]
+
+
+def _words(text: str) -> List[str]:
+    return text.split()
+
+
+def vary_case(query: str, rng: random.Random) -> str:
+    return rng.choice([query.upper(), query.title(), query.capitalize()])
+
+
+def vary_punctuation(query: str, rng: random.Random) -> str:
+    words = _words(query)
+    i = rng.randrange(len(words))
+    words[i] += rng.choice(PUNCTUATION)
+    return " ".join(words) + rng.choice(PUNCTUATION)
+
+
+def vary_emoji(query: str, rng: random.Random) -> str:
+    return f"{query} {rng.choice(EMOJIS)}"
+
+
+def vary_whitespace(query: str, rng: random.Random) -> str:
+    return "  " + "   ".join(_words(query)) + " \t"
+
+
+def vary_accents(query: str, rng: random.Random) -> str:
+    return fold(query)
+
+
+def vary_stopwords(query: str, rng: random.Random) -> str:
+    words = _words(query)
+    if rng.random() < 0.5:
+        return f"{rng.choice(FILLERS)} {query}"
+    words.insert(rng.randrange(len(words) + 1), rng.choice(STOPWORDS))
+    return " ".join(words)
+
+
+def vary_word_order(query: str, rng: random.Random) -> str:
+    words = _words(query)
+    if len(words) < 2:
+        return query
+    i = rng.randrange(len(words) - 1)
+    words[i], words[i + 1] = words[i + 1], words[i]
+    return " ".join(words)
+
+
+def vary_typo(query: str, rng: random.Random) -> str:
+    chars = list(query)
+    i = rng.randrange(len(chars))
+    if rng.random() < 0.5:
+        chars.pop(i)
+    else:
+        chars.insert(i, rng.choice("aeiourstn"))
+    return "".join(chars)
+
+
+def vary_combined(query: str, rng: random.Random) -> str:
+    return vary_emoji(vary_punctuation(vary_case(fold(query), rng), rng), rng)
+
+
+TRANSFORMS: Dict[str, Callable[[str, random.Random], str]] = {
+    "case": vary_case,
+    "punctuation": vary_punctuation,
+    "emoji": vary_emoji,
+    "whitespace": vary_whitespace,
+    "accents": vary_accents,
+    "stopwords": vary_stopwords,
+    "word_order": vary_word_order,
+    "typo": vary_typo,
+    "combined": vary_combined,
+}
+
+
+def make_variants(queries: List[str], per_query: int, seed: int) -> List[Tuple[str, str, str]]:
+    """(transformación, variante, query original); solo variantes distintas del original"""
+    rng = random.Random(seed)
+    variants = []
+    for name, transform in TRANSFORMS.items():
+        for query in queries:
+            seen = set()
+            for _ in range(per_query):
+                variant = transform(query, rng)
+                if variant != query and variant not in seen:
+                    seen.add(variant)
+                    variants.append((name, variant, query))
+    return variants
+
+
+class KeyedCache:
+    """Dict + índice de trigramas con una función de key, como MoodCacheService"""
+    
+    def __init__(self, dataset: Dict[str, dict], make_key: Callable[[str], str]):
+        self.make_key = make_key
+        self.results: Dict[str, dict] = {}
+        self.index = TrigramIndex()
+        for query, result in dataset.items():
+            key = make_key(query)
+            self.results[key] = result
+            self.index.add(key)
+    
+    def lookup(self, query: str) -> Tuple[str, dict]:
+        key = self.make_key(query)
+        if key in self.results:
+            return "exact", self.results[key]
+        best_key, _ = self.index.best_match(key, THRESHOLD)
+        if best_key is not None:
+            return "similar", self.results[best_key]
+        return "miss", None
+
+
+def evaluate(cache: KeyedCache, dataset: Dict[str, dict], variants) -> Dict[str, Dict]:
+    by_transform: Dict[str, Dict] = defaultdict(lambda: {"lookups": 0, "exact": 0, "similar": 0, "miss": 0, "wrong": 0})
+    timings: Dict[str, List[float]] = defaultdict(list)
+    for name, variant, original in variants:
+        start = time.perf_counter()
+        outcome, result = cache.lookup(variant)
+        timings[outcome].append(time.perf_counter() - start)
+        for bucket in (by_transform[name], by_transform["total"]):
+            bucket["lookups"] += 1
+            bucket[outcome] += 1
+            if result is not None and result != dataset[original]:
+                bucket["wrong"] += 1
+    latency_us = {outcome: round(sum(t) / len(t) * 1e6, 1) for outcome, t in timings.items()}
+    return {"by_transform": dict(by_transform), "mean_lookup_us": latency_us}
+
+
+def collisions(dataset: Dict[str, dict], canonicalizer: QueryCanonicalizer) -> List[Dict]:
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for query in dataset:
+        groups[canonicalizer.canonicalize(query)].append(query)
+    return [
+        {"key": key, "queries": queries, "same_result": all(dataset[q] == dataset[queries[0]] for q in queries)}
+        for key, queries in groups.items() if len(queries) > 1
+    ]
+
+
+def rate(bucket: Dict, *outcomes: str) -> float:
+    return sum(bucket[o] for o in outcomes) / bucket["lookups"] if bucket["lookups"] else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hit rate del mood cache: key lower+strip vs forma canónica")
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--variants", type=int, default=5, help="Variantes por query y transformación")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+    
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        dataset = json.load(f)
+    
+    canonicalizer = QueryCanonicalizer()
+    variants = make_variants(list(dataset), args.variants, args.seed)
+    report = {
+        "dataset": args.dataset,
+        "entries": len(dataset),
+        "lookups": len(variants),
+        "raw": evaluate(KeyedCache(dataset, lambda q: q.lower().strip()), dataset, variants),
+        "canonical": evaluate(KeyedCache(dataset, canonicalizer.canonicalize), dataset, variants),
+        "collisions": collisions(dataset, canonicalizer),
+    }
+    
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    
+    print("=" * 96)
+    print(f"🔑 MOOD CACHE KEYS: lower+strip vs canonical ({report['entries']} entries, {report['lookups']} lookups)")
+    print("=" * 96)
+    print(f"{'transform':<14}{'lookups':>8} | {'exact':>7}{'similar':>9}{'miss':>7}{'wrong':>7} | "
+          f"{'exact':>7}{'similar':>9}{'miss':>7}{'wrong':>7}")
+    print(f"{'':<22} | {'lower + strip':^30} | {'canonical':^30}")
+    print("-" * 96)
+    for name in list(TRANSFORMS) + ["total"]:
+        raw = report["raw"]["by_transform"].get(name)
+        canonical = report["canonical"]["by_transform"].get(name)
+        if not raw:
+            continue
+        if name == "total":
+            print("-" * 96)
+        cells = []
+        for bucket in (raw, canonical):
+            cells.append(f"{rate(bucket, 'exact'):>7.0%}{rate(bucket, 'similar'):>9.0%}"
+                         f"{rate(bucket, 'miss'):>7.0%}{bucket['wrong']:>7}")
+        print(f"{name:<14}{raw['lookups']:>8} | {cells[0]} | {cells[1]}")
+    print("=" * 96)
+    
+    raw_total = report["raw"]["by_transform"]["total"]
+    canonical_total = report["canonical"]["by_transform"]["total"]
+    print(f"⚡ Exact (O(1)) hit rate: {rate(raw_total, 'exact'):.1%} → {rate(canonical_total, 'exact'):.1%}")
+    print(f"✅ Overall hit rate:      {rate(raw_total, 'exact', 'similar'):.1%} → "
+          f"{rate(canonical_total, 'exact', 'similar'):.1%}")
+    print(f"⚠️ Wrong hits:            {raw_total['wrong']} → {canonical_total['wrong']}")
+    for label in ("raw", "canonical"):
+        latency = report[label]["mean_lookup_us"]
+        print(f"⏱️ Mean lookup µs ({label}): " + ", ".join(f"{k}={v}" for k, v in sorted(latency.items())))
+    if report["collisions"]:
+        print("🔗 Dataset queries sharing a canonical key:")
+        for group in report["collisions"]:
+            flag = "same result" if group["same_result"] else "DIFFERENT results"
+            print(f"   {group['key']!r}: {group['queries']} ({flag})")
+
+
+if __name__ == "__main__":
+    main()
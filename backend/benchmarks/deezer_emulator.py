@@ -0,0 +1,358 @@
+"""
+Emulador local de la API de Deezer para pruebas de carga.
+
+App ASGI (FastAPI) que imita los endpoints que usan DeezerService y
+DeezerAuthService, sobre un catálogo sintético:
+
+    GET  /search                          búsqueda en el catálogo (q, limit, index)
+    GET  /user/me                         usuario del token
+    GET  /user/me/playlists               playlists del usuario
+    POST /user/me/playlists               crea playlist → {"id": ...}
+    GET  /playlist/{id}/tracks            tracks de la playlist
+    POST /playlist/{id}/tracks            añade tracks (songs=1,2,3) → true
+    GET  /oauth/auth.php                  redirige a redirect_uri con un code
+    GET  /oauth/access_token.php          code → {"access_token", "expires"}
+
+Reproduce lo que importa para una prueba de carga:
+- latencia con distribución lognormal por grupo de endpoints
+- inyección de 429 (con Retry-After) y 5xx
+- la cuota de Deezer (50 requests / 5s por token o IP), que la API real
+  señala con HTTP 200 y {"error": {"code": 4, "message": "Quota limit exceeded"}}
+
+Uso (desde backend/):
+    python benchmarks/deezer_emulator.py --port 8001 --search-latency 0.08 --error-rate 0.02
+
+y arrancar el backend apuntando al emulador:
+    DEEZER_API_BASE_URL=http://localhost:8001 \\
+    DEEZER_OAUTH_BASE_URL=http://localhost:8001/oauth \\
+    DEEZER_APP_ID=emulator DEEZER_SECRET_KEY=emulator \\
+    uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
+
+from fakes import LatencyProfile, synthetic_catalog
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class EmulatorConfig:
+    """Configuración del emulador (ver from_env para las variables)"""
+    catalog_size: int = 5000
+    search_latency: float = 0.08
+    user_latency: float = 0.05
+    write_latency: float = 0.15
+    latency_sigma: float = 0.35
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (429, 500, 503)
+    retry_after: int = 1
+    quota_requests: int = 50
+    quota_window: float = 5.0
+    strict_tokens: bool = False
+    seed: int = 7
+    
+    @classmethod
+    def from_env(cls) -> "EmulatorConfig":
+        statuses = os.getenv("DEEZER_EMU_ERROR_STATUSES", "429,500,503")
+        return cls(
+            catalog_size=int(os.getenv("DEEZER_EMU_CATALOG_SIZE", "5000")),
+            search_latency=_env_float("DEEZER_EMU_SEARCH_LATENCY", 0.08),
+            user_latency=_env_float("DEEZER_EMU_USER_LATENCY", 0.05),
+            write_latency=_env_float("DEEZER_EMU_WRITE_LATENCY", 0.15),
+            latency_sigma=_env_float("DEEZER_EMU_LATENCY_SIGMA", 0.35),
+            error_rate=_env_float("DEEZER_EMU_ERROR_RATE", 0.0),
+            error_statuses=tuple(int(s) for s in statuses.split(",") if s.strip()),
+            quota_requests=int(os.getenv("DEEZER_EMU_QUOTA_REQUESTS", "50")),
+            quota_window=_env_float("DEEZER_EMU_QUOTA_WINDOW", 5.0),
+            strict_tokens=os.getenv("DEEZER_EMU_STRICT_TOKENS", "false").lower() == "true",
+            seed=int(os.getenv("DEEZER_EMU_SEED", "7")),
+        )
+
+
+@dataclass
+class EmulatorState:
+    """Estado en memoria: usuarios, tokens, playlists y ventanas de cuota"""
+    tokens: Dict[str, int] = field(default_factory=dict)
+    codes: Dict[str, int] = field(default_factory=dict)
+    playlists: Dict[int, Dict] = field(default_factory=dict)
+    quota: Dict[str, Deque[float]] = field(default_factory=dict)
+    requests: int = 0
+    injected_errors: int = 0
+    quota_errors: int = 0
+
+
+def deezer_error(error_type: str, message: str, code: int) -> JSONResponse:
+    # La API de Deezer devuelve los errores de negocio con HTTP 200
+    return JSONResponse({"error": {"type": error_type, "message": message, "code": code}})
+
+
+class Catalog:
+    """Catálogo sintético con índice invertido palabra → tracks (por rank)"""
+    
+    def __init__(self, size: int):
+        self.tracks = synthetic_catalog(size)
+        self.by_id = {t["id"]: self._public(t) for t in self.tracks}
+        index: Dict[str, List[Dict]] = {}
+        for track in self.tracks:
+            words = {track["_genre"], *track["title"].lower().split(), *track["artist"]["name"].lower().split()}
+            for word in words:
+                index.setdefault(word, []).append(self.by_id[track["id"]])
+        for bucket in index.values():
+            bucket.sort(key=lambda t: t["rank"], reverse=True)
+        self.index = index
+    
+    @staticmethod
+    def _public(track: Dict) -> Dict:
+        return {k: v for k, v in track.items() if k != "_genre"}
+    
+    def search(self, query: str) -> List[Dict]:
+        """Unión de los tracks que contienen alguna palabra de la query"""
+        seen = set()
+        results = []
+        for word in query.lower().replace('"', " ").replace(":", " ").split():
+            for track in self.index.get(word, ()):
+                if track["id"] not in seen:
+                    seen.add(track["id"])
+                    results.append(track)
+        return results
+
+
+def create_app(config: Optional[EmulatorConfig] = None) -> FastAPI:
+    """Construye la app del emulador con su propio catálogo y estado"""
+    config = config or EmulatorConfig.from_env()
+    catalog = Catalog(config.catalog_size)
+    state = EmulatorState()
+    rng = random.Random(config.seed)
+    user_ids = itertools.count(5_000_001)
+    playlist_ids = itertools.count(9_000_000_001)
+    profiles = {
+        name: LatencyProfile(median=median, sigma=config.latency_sigma, seed=config.seed + i)
+        for i, (name, median) in enumerate(
+            (("search", config.search_latency), ("user", config.user_latency), ("write", config.write_latency))
+        )
+    }
+    
+    app = FastAPI(title="Deezer API emulator")
+    app.state.emulator = state
+    app.state.catalog = catalog
+    app.state.config = config
+    
+    def quota_exceeded(key: str) -> bool:
+        now = time.monotonic()
+        window = state.quota.setdefault(key, deque())
+        while window and now - window[0] >= config.quota_window:
+            window.popleft()
+        if len(window) >= config.quota_requests:
+            return True
+        window.append(now)
+        return False
+    
+    async def gate(request: Request, group: str) -> Optional[JSONResponse]:
+        """Latencia + errores inyectados + cuota. Devuelve la respuesta de error, si la hay."""
+        state.requests += 1
+        await asyncio.sleep(profiles[group].sample())
+        
+        if config.error_rate > 0 and rng.random() < config.error_rate:
+            state.injected_errors += 1
+            status = rng.choice(config.error_statuses)
+            headers = {"Retry-After": str(config.retry_after)} if status == 429 else None
+            return JSONResponse({"error": "injected"}, status_code=status, headers=headers)
+        
+        key = request.query_params.get("access_token") or (request.client.host if request.client else "anon")
+        if quota_exceeded(key):
+            state.quota_errors += 1
+            return deezer_error("Exception", "Quota limit exceeded", 4)
+        return None
+    
+    def user_for(token: Optional[str]) -> Optional[int]:
+        if not token:
+            return None
+        user_id = state.tokens.get(token)
+        if user_id is None and not config.strict_tokens:
+            # Modo por defecto: cualquier token es válido (útil para generar carga)
+            user_id = state.tokens[token] = next(user_ids)
+        return user_id
+    
+    def invalid_token() -> JSONResponse:
+        return deezer_error("OAuthException", "Invalid OAuth access token.", 300)
+    
+    @app.get("/search")
+    async def search(request: Request, q: str = "", limit: int = 25, index: int = 0):
+        error = await gate(request, "search")
+        if error:
+            return error
+        matched = catalog.search(q)
+        data = matched[index:index + limit]
+        body = {"data": data, "total": len(matched)}
+        if index + limit < len(matched):
+            body["next"] = f"{request.base_url}search?{urlencode({'q': q, 'limit': limit, 'index': index + limit})}"
+        return body
+    
+    @app.get("/user/me")
+    async def user_me(request: Request):
+        error = await gate(request, "user")
+        if error:
+            return error
+        user_id = user_for(request.query_params.get("access_token"))
+        if user_id is None:
+            return invalid_token()
+        return {"id": user_id, "name": f"Emulated User {user_id}", "country": "ES", "type": "user"}
+    
+    @app.get("/user/me/playlists")
+    async def list_playlists(request: Request):
+        error = await gate(request, "user")
+        if error:
+            return error
+        user_id = user_for(request.query_params.get("access_token"))
+        if user_id is None:
+            return invalid_token()
+        data = [
+            {"id": p["id"], "title": p["title"], "nb_tracks": len(p["tracks"])}
+            for p in state.playlists.values() if p["owner"] == user_id
+        ]
+        return {"data": data, "total": len(data)}
+    
+    @app.post("/user/me/playlists")
+    async def create_playlist(request: Request):
+        error = await gate(request, "write")
+        if error:
+            return error
+        user_id = user_for(request.query_params.get("access_token"))
+        if user_id is None:
+            return invalid_token()
+        title = request.query_params.get("title")
+        if not title:
+            return deezer_error("ParameterException", "Wrong parameter: title", 500)
+        playlist_id = next(playlist_ids)
+        state.playlists[playlist_id] = {
+            "id": playlist_id,
+            "owner": user_id,
+            "title": title,
+            "description": request.query_params.get("description", ""),
+            "tracks": [],
+        }
+        return {"id": playlist_id}
+    
+    @app.get("/playlist/{playlist_id}/tracks")
+    async def playlist_tracks(request: Request, playlist_id: int):
+        error = await gate(request, "user")
+        if error:
+            return error
+        playlist = state.playlists.get(playlist_id)
+        if playlist is None:
+            return deezer_error("DataException", "no data", 800)
+        data = [catalog.by_id[t] for t in playlist["tracks"] if t in catalog.by_id]
+        return {"data": data, "total": len(data)}
+    
+    @app.post("/playlist/{playlist_id}/tracks")
+    async def add_tracks(request: Request, playlist_id: int):
+        error = await gate(request, "write")
+        if error:
+            return error
+        user_id = user_for(request.query_params.get("access_token"))
+        if user_id is None:
+            return invalid_token()
+        playlist = state.playlists.get(playlist_id)
+        if playlist is None:
+            return deezer_error("DataException", "no data", 800)
+        if playlist["owner"] != user_id:
+            return deezer_error("PermissionException", "You are not allowed to do that", 200)
+        try:
+            songs = [int(s) for s in request.query_params.get("songs", "").split(",") if s]
+        except ValueError:
+            return deezer_error("ParameterException", "Wrong parameter: songs", 500)
+        existing = set(playlist["tracks"])
+        # Como Deezer: añadir un track ya presente es un error de la request entera
+        if any(s in existing for s in songs):
+            return deezer_error("DataException", "This song already exists in this playlist", 801)
+        playlist["tracks"].extend(songs)
+        return True
+    
+    @app.get("/oauth/auth.php")
+    async def oauth_authorize(request: Request, redirect_uri: str = ""):
+        code = f"emucode{rng.getrandbits(48):x}"
+        state.codes[code] = next(user_ids)
+        params = {"code": code}
+        if request.query_params.get("state"):
+            params["state"] = request.query_params["state"]
+        separator = "&" if "?" in redirect_uri else "?"
+        return RedirectResponse(f"{redirect_uri}{separator}{urlencode(params)}")
+    
+    @app.get("/oauth/access_token.php")
+    async def oauth_access_token(request: Request, code: str = "", output: str = ""):
+        error = await gate(request, "user")
+        if error:
+            return error
+        user_id = state.codes.pop(code, None)
+        if user_id is None and (config.strict_tokens or not code):
+            return PlainTextResponse("wrong code")
+        token = f"emutoken{rng.getrandbits(96):x}"
+        state.tokens[token] = user_id if user_id is not None else next(user_ids)
+        if output == "json":
+            return {"access_token": token, "expires": 0}
+        return PlainTextResponse(f"access_token={token}&expires=0")
+    
+    @app.get("/_emulator/stats")
+    async def stats():
+        return {
+            "requests": state.requests,
+            "injected_errors": state.injected_errors,
+            "quota_errors": state.quota_errors,
+            "tokens": len(state.tokens),
+            "playlists": len(state.playlists),
+            "catalog_size": len(catalog.tracks),
+        }
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador local de la API de Deezer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--catalog-size", type=int)
+    parser.add_argument("--search-latency", type=float, help="Mediana de latencia de /search (s)")
+    parser.add_argument("--user-latency", type=float, help="Mediana de latencia de lecturas de usuario (s)")
+    parser.add_argument("--write-latency", type=float, help="Mediana de latencia de escrituras (s)")
+    parser.add_argument("--error-rate", type=float, help="Fracción de 429/5xx inyectados")
+    parser.add_argument("--quota", type=int, help="Requests permitidas por ventana de cuota")
+    args = parser.parse_args()
+    
+    config = EmulatorConfig.from_env()
+    overrides = {
+        "catalog_size": args.catalog_size,
+        "search_latency": args.search_latency,
+        "user_latency": args.user_latency,
+        "write_latency": args.write_latency,
+        "error_rate": args.error_rate,
+        "quota_requests": args.quota,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(config, name, value)
+    
+    import uvicorn
+    print(f"🎭 Deezer emulator on http://{args.host}:{args.port} ({config.catalog_size} tracks)")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Backends falsos y deterministas para los benchmarks.
+
+Sustituyen la Inference API de Hugging Face y api.deezer.com por handlers
+de httpx.MockTransport, con latencia configurable (distribución lognormal
+con semilla fija) e inyección de errores. No hay red: los resultados son
+reproducibles y pueden correr en CI.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+
+@dataclass
+class LatencyProfile:
+    """Latencia simulada: mediana en segundos + dispersión lognormal"""
+    median: float = 0.0
+    sigma: float = 0.25
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 1234
+    _rng: random.Random = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+    
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * self._rng.lognormvariate(0.0, self.sigma)
+    
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+class FakeHuggingFace:
+    """Stand-in de /models/{model}/v1/chat/completions"""
+    
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+        self.calls = 0
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.profile.sample())
+        if self.profile.should_fail():
+            return httpx.Response(self.profile.error_status, json={"error": "injected"})
+        
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        energy = ("low", "medium", "high")[len(prompt) % 3]
+        content = json.dumps({
+            "mood_tags": ["focused", "calm"],
+            "energy": energy,
+            "genres": ["lo-fi", "ambient"],
+            "search_query": "lofi study 2026"
+        })
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": content}}]})
+    
+    def client(self, base_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(self.handler))
+
+
+def synthetic_catalog(size: int = 2000, seed: int = 99) -> List[Dict]:
+    """Catálogo sintético con el formato de track de la API de Deezer"""
+    rng = random.Random(seed)
+    genres = ["lo-fi", "ambient", "pop", "rock", "dance", "electronic", "hip-hop", "reggaeton", "ballad",
+              "indie", "chill", "jazz", "classical", "metal", "soul", "acoustic"]
+    catalog = []
+    for i in range(size):
+        genre = genres[i % len(genres)]
+        catalog.append({
+            "id": 1_000_000 + i,
+            "title": f"{genre.title()} Track {i}",
+            "link": f"https://www.deezer.com/track/{1_000_000 + i}",
+            "duration": rng.randint(90, 360),
+            "rank": rng.randint(10_000, 1_000_000),
+            "preview": f"https://cdns-preview.dzcdn.net/stream/{i}.mp3",
+            "artist": {"id": i % 300, "name": f"Artist {i % 300}"},
+            "album": {"id": i // 10, "title": f"Album {i // 10}", "cover_medium": f"https://e-cdns-images.dzcdn.net/{i}.jpg"},
+            "_genre": genre,
+        })
+    return catalog
+
+
+class FakeDeezer:
+    """Stand-in de api.deezer.com/search sobre un catálogo sintético"""
+    
+    def __init__(self, profile: Optional[LatencyProfile] = None, catalog_size: int = 2000):
+        self.profile = profile or LatencyProfile()
+        self.catalog = synthetic_catalog(catalog_size)
+        self.by_genre: Dict[str, List[Dict]] = {}
+        for track in self.catalog:
+            self.by_genre.setdefault(track["_genre"], []).append(track)
+        self.calls = 0
+    
+    def search(self, query: str, limit: int) -> List[Dict]:
+        matched = []
+        for word in query.lower().split():
+            matched.extend(self.by_genre.get(word, []))
+        return [{k: v for k, v in t.items() if k != "_genre"} for t in matched[:limit]]
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.profile.sample())
+        if self.profile.should_fail():
+            return httpx.Response(self.profile.error_status, json={"error": "injected"})
+        params = request.url.params
+        data = self.search(params.get("q", ""), int(params.get("limit", 25)))
+        return httpx.Response(200, json={"data": data, "total": len(data)})
+    
+    def client(self, base_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=base_url, transport=httpx.MockTransport(self.handler))
+    
+    def requests_shim(self) -> "FakeRequests":
+        return FakeRequests(self)
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self._payload = payload
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+    
+    def json(self):
+        return self._payload
+
+
+class FakeRequests:
+    """Sustituto del módulo requests para el search_tracks síncrono"""
+    
+    def __init__(self, deezer: FakeDeezer):
+        self.deezer = deezer
+    
+    def get(self, url: str, params: dict = None, timeout: float = None):
+        self.deezer.calls += 1
+        time.sleep(self.deezer.profile.sample())
+        if self.deezer.profile.should_fail():
+            return _FakeResponse(self.deezer.profile.error_status, {"error": "injected"})
+        params = params or {}
+        return _FakeResponse(200, {"data": self.deezer.search(params.get("q", ""), int(params.get("limit", 25)))})
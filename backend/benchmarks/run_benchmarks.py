@@ -0,0 +1,444 @@
+"""
+Suite de benchmarks offline de MoodTune.
+
+Mide throughput y p50/p95/p99 de:
+- analyze_mood (miss → LLM falso, y hits del caché)
+- MoodCacheService.get_similar con varios tamaños de caché
+- mood cache en dict (json) frente a SQLite compartido (hot tier, lectura en frío)
+- DeezerService.search_tracks (síncrono) y search_tracks_async (secuencial y paralelo)
+- la ruta completa POST /api/discover
+
+Hugging Face y api.deezer.com se sustituyen por backends falsos deterministas
+(benchmarks/fakes.py) con latencia y errores configurables, así que no hay
+red y los números son reproducibles. Los resultados se comparan con
+benchmarks/baselines.json y se marcan las regresiones.
+
+Los baselines son absolutos y dependen de la máquina (CPU, carga, versión de
+Python): solo sirven para comparar en la máquina donde se grabaron. En otra
+máquina, grabar primero un baseline propio con --save-baseline sin commitear
+(se avisa si la máquina no coincide con la del baseline).
+
+Uso (desde backend/):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only get_similar --fail-on-regression
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --hf-latency 0.8 --deezer-latency 0.15 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from fakes import FakeDeezer, FakeHuggingFace, LatencyProfile
+from bench_similarity_index import make_queries, perturb
+from services.mood_cache_service import TrigramIndex
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Queries que el léxico no resuelve con confianza → llegan al LLM
+AMBIGUOUS_TEMPLATES = [
+    "something for this {} evening", "music for a {} afternoon", "algo para una tarde {}",
+    "songs for my {} commute", "canciones para un {} jueves", "background music for a {} day",
+]
+ADJECTIVES = ["grey", "long", "weird", "quiet", "random", "strange", "normal", "gris", "larga", "rara"]
+# Palabras inventadas: ni el léxico ni el caché las reconocen
+SYLLABLES = ["ka", "lo", "mi", "ru", "te", "sa", "po", "ne", "vi", "da", "zu", "fe", "gri", "mon", "tal", "bes"]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(latencies: List[float], wall: float, errors: int) -> Dict[str, float]:
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+    }
+
+
+async def measure(operations: List[Callable[[], Awaitable]], concurrency: int) -> Dict[str, float]:
+    """Ejecuta operaciones async con concurrencia acotada y mide cada una"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    
+    async def run(operation):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+    
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run(op) for op in operations))
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+
+def measure_sync(operations: List[Callable[[], object]]) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    wall_start = time.perf_counter()
+    for operation in operations:
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+
+class Environment:
+    """Instala los backends falsos y un mood cache temporal; restaura al salir"""
+    
+    def __init__(self, hf_profile: LatencyProfile, deezer_profile: LatencyProfile):
+        self.fake_hf = FakeHuggingFace(hf_profile)
+        self.fake_deezer = FakeDeezer(deezer_profile)
+        self._tmp = tempfile.TemporaryDirectory()
+    
+    def __enter__(self):
+        import main
+        from services import deezer_service as deezer_module
+        from services import huggingface_service, llm_service
+        from services.deezer_scheduler import DeezerScheduler
+        from services.rate_limit_service import RateLimiter
+        from services.track_catalog_service import TrackCatalogService
+        
+        self.main = main
+        self.modules = (deezer_module, huggingface_service, llm_service)
+        self.saved = {
+            "requests": deezer_module.requests,
+            "deezer_client": deezer_module.deezer_service._client,
+            "catalog": deezer_module.deezer_service.catalog,
+            "scheduler": deezer_module.deezer_service.scheduler,
+            "rate_limiter": main.rate_limiter,
+            "hf_client": huggingface_service.hf_client._client,
+            "llm_cache": llm_service.mood_cache,
+            "main_cache": main.mood_cache,
+            "token": os.environ.get("HUGGINGFACE_TOKEN"),
+        }
+        
+        deezer_module.requests = self.fake_deezer.requests_shim()
+        deezer_module.deezer_service._client = self.fake_deezer.client(deezer_module.deezer_service.api_base_url)
+        huggingface_service.hf_client._client = self.fake_hf.client(huggingface_service.hf_client.base_url)
+        deezer_module.deezer_service.catalog = TrackCatalogService(db_file=os.path.join(self._tmp.name, "catalog.db"))
+        # Se mide nuestro código, no la cuota de Deezer
+        deezer_module.deezer_service.scheduler = DeezerScheduler(limit=10**9, window=1.0, burst=10**6)
+        main.rate_limiter = RateLimiter(limit=0)
+        os.environ["HUGGINGFACE_TOKEN"] = "hf_benchmark"
+        self.new_mood_cache()
+        return self
+    
+    def new_mood_cache(self):
+        from services.mood_cache_service import MoodCacheService
+        cache = MoodCacheService(cache_file=os.path.join(self._tmp.name, f"cache_{random.random()}.json"))
+        self.modules[2].mood_cache = cache
+        self.main.mood_cache = cache
+        return cache
+    
+    def __exit__(self, *exc):
+        deezer_module, huggingface_service, llm_service = self.modules
+        deezer_module.requests = self.saved["requests"]
+        deezer_module.deezer_service._client = self.saved["deezer_client"]
+        deezer_module.deezer_service.catalog.close()
+        deezer_module.deezer_service.catalog = self.saved["catalog"]
+        deezer_module.deezer_service.scheduler = self.saved["scheduler"]
+        self.main.rate_limiter = self.saved["rate_limiter"]
+        huggingface_service.hf_client._client = self.saved["hf_client"]
+        llm_service.mood_cache.close()
+        llm_service.mood_cache = self.saved["llm_cache"]
+        self.main.mood_cache = self.saved["main_cache"]
+        if self.saved["token"] is None:
+            os.environ.pop("HUGGINGFACE_TOKEN", None)
+        else:
+            os.environ["HUGGINGFACE_TOKEN"] = self.saved["token"]
+        self._tmp.cleanup()
+
+
+def ambiguous_queries(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(AMBIGUOUS_TEMPLATES).format(rng.choice(ADJECTIVES))} #{i}" for i in range(n)]
+
+
+def distinct_queries(n: int, seed: int, make_key: Callable[[str], str], threshold: float = 0.75) -> List[str]:
+    """
+    Queries sin match entre sí en el mood cache (similitud de key < threshold):
+    cada una es un miss, no se une a otro análisis en curso y llega al LLM.
+    """
+    rng = random.Random(seed)
+    index = TrigramIndex()
+    queries = []
+    while len(queries) < n:
+        query = " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(4))
+        key = make_key(query)
+        if index.best_match(key, threshold)[0] is None:
+            index.add(key)
+            queries.append(query)
+    return queries
+
+
+# ============================================
+# ESCENARIOS
+# ============================================
+
+async def bench_analyze_mood(env: Environment, args) -> Dict[str, Dict]:
+    from services import llm_service
+    
+    cache = env.new_mood_cache()
+    # Con queries parecidas casi todo serían hits del caché o análisis coalescidos
+    queries = distinct_queries(args.ops, args.seed, cache.make_key)
+    results = {
+        "analyze_mood_llm": await measure(
+            [lambda q=q: llm_service.analyze_mood(q, "en") for q in queries], args.concurrency
+        )
+    }
+    # Segunda pasada: las mismas queries ya están en el caché
+    results["analyze_mood_cached"] = await measure(
+        [lambda q=q: llm_service.analyze_mood(q, "en") for q in queries], args.concurrency
+    )
+    return results
+
+
+async def bench_get_similar(env: Environment, args) -> Dict[str, Dict]:
+    results = {}
+    rng = random.Random(args.seed)
+    for size in (100, 1000, 5000):
+        cache = env.new_mood_cache()
+        queries = make_queries(size, rng)
+        # add(): las keys pasan por make_key() igual que en get_similar()
+        for query in queries:
+            cache.add(query, {"mood_tags": [], "energy": "low", "genres": [], "search_query": ""})
+        lookups = [perturb(rng.choice(queries), rng) for _ in range(args.ops // 2)]
+        lookups += make_queries(args.ops - len(lookups), random.Random(args.seed + size))
+        results[f"get_similar_{size}"] = measure_sync([lambda q=q: cache.get_similar(q) for q in lookups])
+    return results
+
+
+async def bench_mood_cache_backend(env: Environment, args) -> Dict[str, Dict]:
+    """Mismo caché de 1000 entradas en dict (backend json) y en SQLite compartido"""
+    from services.sqlite_mood_cache import SQLiteMoodCacheService
+    
+    rng = random.Random(args.seed)
+    keys = make_queries(1000, rng)
+    result = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+    db_file = os.path.join(env._tmp.name, f"mood_cache_{random.random()}.db")
+    
+    json_cache = env.new_mood_cache()
+    writer = SQLiteMoodCacheService(db_file=db_file, import_file=None)
+    for key in keys:
+        json_cache.add(key, result)
+        writer.add(key, result)
+    writer.flush()
+    writer.close()
+    
+    exact = [rng.choice(keys) for _ in range(args.ops)]
+    mixed = [perturb(rng.choice(keys), rng) for _ in range(args.ops // 2)]
+    mixed += make_queries(args.ops - len(mixed), random.Random(args.seed + 1))
+    
+    # Otro "worker": hot tier vacío, el índice se sincroniza desde la base
+    hot = SQLiteMoodCacheService(db_file=db_file, import_file=None, hot_size=len(keys))
+    cold = SQLiteMoodCacheService(db_file=db_file, import_file=None, hot_size=0)
+    hot.load()
+    cold.load()
+    for key in exact:
+        hot.get_similar(key)
+    
+    return {
+        "mood_cache_json_exact": measure_sync([lambda q=q: json_cache.get_similar(q) for q in exact]),
+        "mood_cache_sqlite_hot": measure_sync([lambda q=q: hot.get_similar(q) for q in exact]),
+        "mood_cache_sqlite_cold": measure_sync([lambda q=q: cold.get_similar(q) for q in exact]),
+        "mood_cache_json_similar": measure_sync([lambda q=q: json_cache.get_similar(q) for q in mixed]),
+        "mood_cache_sqlite_similar": measure_sync([lambda q=q: cold.get_similar(q) for q in mixed]),
+    }
+
+
+async def bench_search_tracks(env: Environment, args) -> Dict[str, Dict]:
+    from services.deezer_service import deezer_service
+    
+    genre_sets = [["lo-fi", "ambient"], ["pop", "rock"], ["reggaeton", "dance"], ["jazz"], ["metal", "rock"]]
+    
+    def cold(operation):
+        # Sin caché de búsqueda: se mide el camino HTTP completo
+        def run():
+            deezer_service.search_cache.clear()
+            return operation()
+        return run
+    
+    results = {
+        "search_tracks_sync": measure_sync([
+            cold(lambda g=g: deezer_service.search_tracks(["calm"], g, "low", 10))
+            for g in (genre_sets * args.ops)[:max(10, args.ops // 4)]
+        ])
+    }
+    for mode in ("sequential", "parallel"):
+        results[f"search_tracks_async_{mode}"] = await measure([
+            cold(lambda g=g, m=mode: deezer_service.search_tracks_async(["calm"], g, "low", 10, mode=m))
+            for g in (genre_sets * args.ops)[:args.ops]
+        ], args.concurrency)
+    return results
+
+
+async def bench_discover_route(env: Environment, args) -> Dict[str, Dict]:
+    env.new_mood_cache()
+    env.main.deezer_service.search_cache.clear()
+    env.main.discover_response_cache.clear()
+    queries = ambiguous_queries(args.ops // 2, args.seed + 1)
+    queries += ["studying late at night for my exam", "triste después de una ruptura"] * (args.ops // 4)
+    random.Random(args.seed).shuffle(queries)
+    
+    transport = httpx.ASGITransport(app=env.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def discover(query: str):
+            response = await client.post("/api/discover", json={"user_query": query, "language": "en"})
+            response.raise_for_status()
+        
+        return {"discover_route": await measure([lambda q=q: discover(q) for q in queries], args.concurrency)}
+
+
+SCENARIOS = {
+    "analyze_mood": bench_analyze_mood,
+    "get_similar": bench_get_similar,
+    "mood_cache_backend": bench_mood_cache_backend,
+    "search_tracks": bench_search_tracks,
+    "discover_route": bench_discover_route,
+}
+
+
+# ============================================
+# BASELINES
+# ============================================
+
+def machine_info() -> Dict[str, object]:
+    """Identifica la máquina de un baseline (sin hostname)"""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Regresión si p95 empeora más de `tolerance` (y más de 0.5ms, para no
+    marcar ruido en escenarios de microsegundos) o si el throughput cae más
+    de `tolerance`.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baselines.get(name)
+        if not base:
+            continue
+        p95_delta = result["p95_ms"] - base["p95_ms"]
+        if p95_delta > 0.5 and result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.3f}ms → {result['p95_ms']:.3f}ms")
+        if base["throughput"] and result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} → {result['throughput']:.1f} ops/s")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict], baselines: Dict[str, Dict]):
+    print("=" * 100)
+    print("📊 MOODTUNE OFFLINE BENCHMARKS")
+    print("=" * 100)
+    print(f"{'scenario':<30} {'ops':>6} {'err':>5} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'vs base p95':>12}")
+    print("-" * 100)
+    for name, r in results.items():
+        base = baselines.get(name)
+        delta = f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%" if base and base["p95_ms"] else "-"
+        print(f"{name:<30} {r['ops']:>6} {r['errors']:>5} {r['throughput']:>10.1f} {r['p50_ms']:>10.3f} "
+              f"{r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f} {delta:>12}")
+    print("=" * 100)
+
+
+async def main_async(args) -> Dict[str, Dict]:
+    hf_profile = LatencyProfile(median=args.hf_latency, error_rate=args.error_rate, seed=args.seed)
+    deezer_profile = LatencyProfile(median=args.deezer_latency, error_rate=args.error_rate, seed=args.seed + 1)
+    
+    results: Dict[str, Dict] = {}
+    with Environment(hf_profile, deezer_profile) as env:
+        for name, scenario in SCENARIOS.items():
+            if args.only and name not in args.only:
+                continue
+            # Los services imprimen trazas por request: se silencian durante la medición
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.update(await scenario(env, args))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline de MoodTune")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="Escenarios a ejecutar")
+    parser.add_argument("--ops", type=int, default=200, help="Operaciones por escenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hf-latency", type=float, default=0.05, help="Mediana de latencia del LLM falso (s)")
+    parser.add_argument("--deezer-latency", type=float, default=0.01, help="Mediana de latencia de Deezer falso (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de errores 503 inyectados")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Margen antes de marcar regresión")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit code 1 si hay regresiones")
+    args = parser.parse_args()
+    
+    os.chdir(BACKEND_DIR)
+    results = asyncio.run(main_async(args))
+    
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    
+    print_table(results, baselines)
+    
+    if args.save_baseline:
+        baselines.update(results)
+        baselines["_machine"] = machine_info()
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline saved to {BASELINE_FILE}")
+        return 0
+    
+    recorded_on = baselines.get("_machine")
+    if baselines and recorded_on != machine_info():
+        print(f"⚠️ Baseline recorded on another machine ({recorded_on}): deltas are not comparable, "
+              f"re-record with --save-baseline")
+    
+    regressions = compare(results, baselines, args.tolerance)
+    if regressions:
+        print("⚠️ REGRESSIONS vs baseline:")
+        for line in regressions:
+            print(f"   - {line}")
+        return 1 if args.fail_on_regression else 0
+    
+    print("✅ No regressions vs baseline" if baselines else "ℹ️ No baseline yet (run with --save-baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Informe de arranque en frío de MoodTune.
+
+Lanza procesos Python nuevos (sin caché de imports en memoria) y mide:
+- `python -X importtime -c "import main"`: tiempo total y los módulos que
+  más cuestan (acumulado y propio), separando los de services/
+- tiempo hasta la primera respuesta de /health: import de main, arranque
+  del lifespan y un GET /health por ASGI, sin red
+- cuánto tarda después el warm-up en background (STARTUP_WARMUP)
+
+Uso (desde backend/):
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --top 25 --runs 5
+    python benchmarks/startup_report.py --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en un proceso nuevo: el primer import de main cuenta entero
+PROBE = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter()
+
+async def get_health():
+    # ASGI a mano: con un cliente httpx su import contaría como arranque
+    sent = []
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/health", "raw_path": b"/health", "root_path": "",
+             "query_string": b"", "headers": [], "client": ("127.0.0.1", 0), "server": ("app", 80)}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await main.app(scope, receive, send)
+    return sent[0]["status"]
+
+async def probe():
+    async with main.app.router.lifespan_context(main.app):
+        t_lifespan = time.perf_counter()
+        status = await get_health()
+        t_health = time.perf_counter()
+        await main.startup_warmup.wait()
+        t_warm = time.perf_counter()
+        return {
+            "import_ms": (t_import - t0) * 1000,
+            "lifespan_ms": (t_lifespan - t_import) * 1000,
+            "health_ms": (t_health - t_lifespan) * 1000,
+            "ready_ms": (t_health - t0) * 1000,
+            "warmup_ms": (t_warm - t_health) * 1000,
+            "status": status,
+            "warmup": main.startup_warmup.get_status(),
+        }
+
+print("STARTUP_REPORT " + json.dumps(asyncio.run(probe())))
+"""
+
+
+def run_importtime() -> List[Dict]:
+    """Filas de -X importtime: módulo, tiempo propio y acumulado (µs)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "WARNING"}
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                     "depth": (len(name) - len(name.lstrip()) - 1) // 2})
+    return rows
+
+
+def run_probe() -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "WARNING"}
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_REPORT "):
+            return json.loads(line[len("STARTUP_REPORT "):])
+    raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informe de arranque en frío de MoodTune")
+    parser.add_argument("--top", type=int, default=15, help="Módulos a mostrar")
+    parser.add_argument("--runs", type=int, default=3, help="Arranques medidos (se muestra la mediana)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+    
+    rows = run_importtime()
+    total = next((r["cumulative_us"] for r in rows if r["module"] == "main"), 0)
+    # Solo los imports de primer nivel de cada paquete para el ranking acumulado
+    top_level = sorted((r for r in rows if r["depth"] <= 1), key=lambda r: r["cumulative_us"], reverse=True)
+    top_self = sorted(rows, key=lambda r: r["self_us"], reverse=True)
+    ours = [r for r in rows if r["module"] == "main" or r["module"].startswith("services.")]
+    
+    probes = [run_probe() for _ in range(args.runs)]
+    timings = {key: round(statistics.median(p[key] for p in probes), 1)
+               for key in ("import_ms", "lifespan_ms", "health_ms", "ready_ms", "warmup_ms")}
+    
+    if args.json:
+        print(json.dumps({
+            "import_total_ms": round(total / 1000, 1),
+            "top_cumulative": top_level[:args.top],
+            "top_self": top_self[:args.top],
+            "services": ours,
+            "startup": timings,
+            "warmup": probes[-1]["warmup"]
+        }, indent=2))
+        return
+    
+    print("=" * 72)
+    print(f"🚀 import main: {total / 1000:.1f} ms")
+    print("=" * 72)
+    print(f"{'top-level import':<48}{'cumulative ms':>14}{'self ms':>10}")
+    for r in top_level[:args.top]:
+        print(f"{r['module']:<48}{r['cumulative_us'] / 1000:>14.1f}{r['self_us'] / 1000:>10.1f}")
+    print("-" * 72)
+    print(f"{'slowest modules (self)':<48}{'self ms':>24}")
+    for r in top_self[:args.top]:
+        print(f"{r['module']:<48}{r['self_us'] / 1000:>24.1f}")
+    print("-" * 72)
+    print(f"{'services':<48}{'cumulative ms':>14}{'self ms':>10}")
+    for r in sorted(ours, key=lambda r: r["cumulative_us"], reverse=True):
+        print(f"{r['module']:<48}{r['cumulative_us'] / 1000:>14.1f}{r['self_us'] / 1000:>10.1f}")
+    print("=" * 72)
+    print(f"⏱️ Median of {args.runs} cold starts:")
+    print(f"   import main      {timings['import_ms']:>8.1f} ms")
+    print(f"   lifespan start   {timings['lifespan_ms']:>8.1f} ms")
+    print(f"   first /health    {timings['health_ms']:>8.1f} ms")
+    print(f"   ready (total)    {timings['ready_ms']:>8.1f} ms")
+    print(f"   warm-up (bg)     {timings['warmup_ms']:>8.1f} ms  {probes[-1]['warmup']['steps']}")
+
+
+if __name__ == "__main__":
+    main()
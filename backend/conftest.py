@@ -0,0 +1,68 @@
+"""
+Fixtures compartidos por los tests de las rutas /api/discover*.
+
+Sustituyen el análisis de mood y el cliente de Deezer de main por fakes
+locales (sin red) con monkeypatch, que lo restaura todo al acabar el test.
+"""
+import httpx
+import pytest
+
+import main
+from services.deezer_scheduler import DeezerScheduler
+from services.ttl_cache import TTLCache
+
+
+def deezer_items(base: int = 0, count: int = 12, title: str = "Track"):
+    """Tracks en el formato de /search de Deezer; rank == id y un artista por track"""
+    return [
+        {
+            "id": base + i,
+            "title": f"{title} {base + i}",
+            "artist": {"name": f"Artist {base + i}"},
+            "album": {"title": "Album", "cover_medium": "https://example.com/c.jpg"},
+            "link": f"https://www.deezer.com/track/{base + i}",
+            "preview": None,
+            "duration": 200,
+            "rank": base + i
+        }
+        for i in range(count)
+    ]
+
+
+def deezer_handler(request):
+    return httpx.Response(200, json={"data": deezer_items()})
+
+
+@pytest.fixture
+def fake_discover(monkeypatch):
+    """
+    install(analyze, handler=deezer_handler): analyze es el mood fijo (dict)
+    o una corrutina (query, language); handler, el de httpx.MockTransport.
+    Sin catálogo local, con el caché de búsquedas vacío, un caché de
+    respuestas nuevo (también sus contadores) y un scheduler propio, para no
+    gastar la cuota del deezer_scheduler compartido. Se puede llamar varias
+    veces en el mismo test.
+    """
+    def install(analyze, handler=deezer_handler):
+        if isinstance(analyze, dict):
+            mood = analyze
+
+            async def analyze(query, language="en"):
+                return mood
+
+        monkeypatch.setattr(main, "analyze_mood", analyze)
+        monkeypatch.setattr(main.deezer_service, "_client", httpx.AsyncClient(
+            base_url=main.deezer_service.api_base_url, transport=httpx.MockTransport(handler)
+        ))
+        monkeypatch.setattr(main.deezer_service, "catalog", None)
+        scheduler = main.deezer_service.scheduler
+        monkeypatch.setattr(main.deezer_service, "scheduler", DeezerScheduler(
+            limit=scheduler.limit, window=scheduler.window, burst=scheduler.burst
+        ))
+        monkeypatch.setattr(main, "discover_response_cache", TTLCache(
+            maxsize=main.discover_response_cache.maxsize, ttl=main.discover_response_cache.ttl
+        ))
+        main.deezer_service.search_cache.clear()
+
+    yield install
+    main.deezer_service.search_cache.clear()
@@ -1,18 +1,69 @@
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import time
 import uvicorn
 import os
-from services.llm_service import analyze_mood
+from services.lazy_import import lazy_module
+from services.mood_cache_service import mood_cache
+from services.query_canonicalizer import query_canonicalizer
 from services.deezer_service import deezer_service
+from services.deezer_scheduler import deezer_scheduler
+from services.track_catalog_service import track_catalog
 from services.deezer_auth_service import deezer_auth_service
+from services.playlist_job_service import playlist_jobs
+from services.metrics_service import registry, DISCOVER_STAGE_SECONDS, RATE_LIMITED
+from services.rate_limit_service import rate_limiter
+from services.warmup_service import startup_warmup
+from services.json_codec import FastJSONResponse, dumps
+from services.ttl_cache import TTLCache
+
+# Análisis de mood y cliente de Hugging Face: se importan en el warm-up o en
+# el primer análisis, no en el arranque (/health no los necesita)
+llm_service = lazy_module("services.llm_service")
+huggingface_service = lazy_module("services.huggingface_service")
+
+
+async def analyze_mood(query: str, language: str = "en") -> dict:
+    return await llm_service.analyze_mood(query, language)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranca los workers y el warm-up; al cerrar, cierra los clientes HTTP
+    compartidos y persiste el mood cache.
+    
+    Los clientes HTTP, el mood cache y el catálogo se preparan en un warm-up
+    en background (STARTUP_WARMUP): la app acepta requests, y /health
+    responde, sin esperarlo. Sin warm-up, cada servicio se inicializa en su
+    primer uso.
+    """
+    playlist_jobs.start()
+    startup_warmup.start()
+    yield
+    await startup_warmup.aclose()
+    await playlist_jobs.aclose()
+    await deezer_service.aclose()
+    # Si nunca se usaron no hay cliente que cerrar: no se importan/construyen aquí
+    if huggingface_service.loaded:
+        await huggingface_service.hf_client.aclose()
+    if deezer_auth_service.loaded:
+        await deezer_auth_service.aclose()
+    mood_cache.close()
+    if track_catalog is not None:
+        track_catalog.close()
+
 
 app = FastAPI(
     title="MoodTune API",
     description="AI-powered music discovery API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.get("/health", include_in_schema=False)  # Add this line if needed
@@ -22,10 +73,70 @@ async def health():
 
 
 
+# ============================================
+# METRICS
+# ============================================
+
+# Un scrape no debe forzar la carga diferida del mood cache (0 hasta que cargue)
+registry.gauge("moodtune_mood_cache_entries", "Entries in the mood cache",
+               function=lambda: len(mood_cache) if mood_cache.loaded else 0)
+registry.gauge("moodtune_search_cache_entries", "Entries in the Deezer search cache",
+               function=lambda: len(deezer_service.search_cache))
+registry.counter("moodtune_search_cache_hits_total", "Deezer search cache hits (fresh + stale)",
+                 function=lambda: deezer_service.search_cache.hits + deezer_service.search_cache.stale_hits)
+registry.counter("moodtune_search_cache_misses_total", "Deezer search cache misses",
+                 function=lambda: deezer_service.search_cache.misses)
+
+STAGE_MOOD = DISCOVER_STAGE_SECONDS.labels(stage="mood_analysis")
+STAGE_DEEZER = DISCOVER_STAGE_SECONDS.labels(stage="deezer_search")
+STAGE_FORMAT = DISCOVER_STAGE_SECONDS.labels(stage="format")
+STAGE_TOTAL = DISCOVER_STAGE_SECONDS.labels(stage="total")
+
+
 # CORS configuration - allow frontend to make requests
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
+# Concurrencia máxima de /api/discover/batch (análisis + Deezer en paralelo)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Respuestas de /api/discover ya serializadas, keyed por (mood cache key, idioma)
+discover_response_cache = TTLCache(
+    maxsize=int(os.getenv("DISCOVER_RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("DISCOVER_RESPONSE_CACHE_TTL", "300"))
+)
+
+# Proxies delante de la app (Render = 1): la IP del cliente es la que añade el último
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+
+
+def client_key(http_request: Request) -> str:
+    """
+    Identifica al cliente para el rate limit.
+    
+    Con RATE_LIMIT_PROXY_HOPS > 0 se usa la entrada de X-Forwarded-For que
+    añadió nuestro proxy (contando desde la derecha); las de la izquierda
+    las puede falsificar el cliente.
+    """
+    if RATE_LIMIT_PROXY_HOPS > 0:
+        forwarded = [h.strip() for h in http_request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if len(forwarded) >= RATE_LIMIT_PROXY_HOPS:
+            return forwarded[-RATE_LIMIT_PROXY_HOPS]
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def enforce_rate_limit(http_request: Request, route: str, cost: int = 1):
+    """Lanza 429 con Retry-After si el cliente agotó su cupo (RATE_LIMIT_PER_HOUR)"""
+    allowed, wait = rate_limiter.check(client_key(http_request), cost)
+    if not allowed:
+        RATE_LIMITED.labels(route=route).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": rate_limiter.retry_after(wait)}
+        )
+
+
 # Configure allowed origins based on environment
 allowed_origins = [
     "http://localhost:3000",
@@ -73,7 +184,7 @@ class Track(BaseModel):
     album: str
     preview_url: Optional[str]
     deezer_link: str
-    cover_image: str
+    cover_image: Optional[str]
     duration: int
 
 
@@ -90,6 +201,24 @@ class DiscoverResponse(BaseModel):
     metadata: Metadata
 
 
+class BatchDiscoverRequest(BaseModel):
+    items: List[DiscoverRequest] = Field(..., min_length=1, max_length=50, description="Lista de peticiones de discover")
+
+
+class BatchDiscoverItem(BaseModel):
+    index: int
+    success: bool
+    result: Optional[DiscoverResponse] = None
+    error: Optional[str] = None
+
+
+class BatchDiscoverResponse(BaseModel):
+    success: bool
+    results: List[BatchDiscoverItem]
+    unique_queries: int
+    cache_hits: int
+
+
 class ErrorResponse(BaseModel):
     success: bool = False
     error: str
@@ -124,6 +253,21 @@ class PlaylistResponse(BaseModel):
     tracks_count: int
 
 
+class PlaylistJobResponse(BaseModel):
+    """Estado de un trabajo de creación de playlist (mode=job)"""
+    job_id: str
+    status: str
+    attempts: int
+    playlist_id: Optional[str]
+    tracks_added: int
+    tracks_total: int
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+    status_url: Optional[str] = None
+
+
 # ============================================
 # MOCK DATA
 # ============================================
@@ -206,60 +350,221 @@ async def health_check():
         "version": "1.0.0",
         "environment": ENVIRONMENT,
         "cors_enabled": True,
-        "allowed_origins": len(allowed_origins)
+        "allowed_origins": len(allowed_origins),
+        "search_cache": deezer_service.search_cache.get_stats(),
+        "response_cache": discover_response_cache.get_stats(),
+        "track_catalog": track_catalog.get_stats() if track_catalog is not None else None,
+        "deezer_rate_limit": deezer_scheduler.get_stats(),
+        "rate_limit": rate_limiter.get_stats(),
+        "warmup": startup_warmup.get_status()
     }
 
 
+@app.get("/api/warmup")
+async def warmup_status():
+    """Progreso del warm-up de arranque (pasos locales y queries semilla)"""
+    return startup_warmup.get_status()
+
+
+def format_metadata(user_query: str, mood_analysis: dict) -> dict:
+    """Análisis de mood → Metadata de la API"""
+    return {
+        "interpreted_mood": ", ".join(mood_analysis["mood_tags"][:3]),
+        "energy_level": mood_analysis["energy"],
+        "suggested_genres": mood_analysis["genres"][:3],
+        "search_query_used": mood_analysis.get("search_query", user_query)
+    }
+
+
+async def build_discover_response(user_query: str, mood_analysis: dict) -> dict:
+    """
+    Busca tracks en Deezer para un análisis de mood y arma el DiscoverResponse.
+    Compartido por /api/discover y /api/discover/batch.
+    
+    Los tracks son DeezerTrack ya en formato de la API: se serializan con
+    json_codec.dumps sin copiarlos ni validarlos otra vez. La etapa format
+    la mide quien serializa la respuesta.
+    """
+    # Step 2: Search tracks (catálogo local o Deezer)
+    start = time.perf_counter()
+    deezer_result = await deezer_service.discover_tracks(
+        mood_tags=mood_analysis["mood_tags"],
+        genres=mood_analysis["genres"],
+        energy=mood_analysis["energy"],
+        limit=10
+    )
+    STAGE_DEEZER.observe(time.perf_counter() - start)
+    
+    if not deezer_result["success"]:
+        raise HTTPException(status_code=500, detail="Error searching music")
+    
+    return {
+        "success": True,
+        "tracks": deezer_result["tracks"][:10],
+        "metadata": format_metadata(user_query, mood_analysis)
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/api/discover", response_model=DiscoverResponse)
-async def discover_music(request: DiscoverRequest):
+async def discover_music(request: DiscoverRequest, http_request: Request):
     """
     Discover music based on mood description using AI + Deezer.
+    
+    Devuelve un FastJSONResponse: FastAPI no re-valida contra DiscoverResponse
+    (que se mantiene para el schema de OpenAPI). Las queries repetidas se
+    sirven con los bytes ya serializados del caché de respuestas.
     """
+    enforce_rate_limit(http_request, "discover")
     
+    request_start = time.perf_counter()
     try:
+        cache_key = (query_canonicalizer.key_hash(request.user_query), request.language)
+        body = discover_response_cache.get(cache_key)
+        if body is not None:
+            return FastJSONResponse(body)
+        
         # Step 1: Analyze mood with AI
         mood_analysis = await analyze_mood(request.user_query, request.language)
+        STAGE_MOOD.observe(time.perf_counter() - request_start)
         
-        # Step 2: Search tracks on Deezer
-        deezer_result = deezer_service.search_tracks(
-            mood_tags=mood_analysis["mood_tags"],
-            genres=mood_analysis["genres"],
-            energy=mood_analysis["energy"],
-            limit=10
-        )
-        
-        if not deezer_result["success"]:
-            raise HTTPException(status_code=500, detail="Error searching music")
-        
-        # Step 3: Format response
-        tracks = []
-        for track in deezer_result["tracks"][:10]:
-            tracks.append({
-                "id": str(track["id"]),
-                "title": track["name"],
-                "artist": track["artists"][0] if track["artists"] else "Unknown",
-                "album": track["album"],
-                "preview_url": track.get("preview_url"),
-                "deezer_link": track["external_url"],
-                "cover_image": track.get("image_url"),
-                "duration": track["duration_ms"] // 1000
-            })
-        
-        mood_tags_str = ", ".join(mood_analysis["mood_tags"][:3])
+        response = await build_discover_response(request.user_query, mood_analysis)
         
-        return {
-            "success": True,
-            "tracks": tracks,
-            "metadata": {
-                "interpreted_mood": mood_tags_str,
-                "energy_level": mood_analysis["energy"],
-                "suggested_genres": mood_analysis["genres"][:3],
-                "search_query_used": mood_analysis.get("search_query", request.user_query)
-            }
-        }
+        # Step 3: Format response (serialización incluida)
+        start = time.perf_counter()
+        body = dumps(response)
+        STAGE_FORMAT.observe(time.perf_counter() - start)
+        discover_response_cache.set(cache_key, body)
+        return FastJSONResponse(body)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    finally:
+        STAGE_TOTAL.observe(time.perf_counter() - request_start)
+
+
+@app.post("/api/discover/stream")
+async def discover_music_stream(request: DiscoverRequest, http_request: Request):
+    """
+    Versión en streaming de /api/discover.
+    
+    Envía el evento metadata en cuanto analyze_mood resuelve y después los
+    tracks por lotes (DeezerService.iter_tracks): del catálogo local si lo
+    cubre o de cada estrategia de Deezer en orden de prioridad, en vez de
+    esperar a tenerlo todo.
+    
+    Formato: NDJSON (una línea JSON por evento) por defecto, o Server-Sent
+    Events si el cliente envía "Accept: text/event-stream".
+    
+    Eventos:
+        {"type": "metadata", "metadata": {...}}
+        {"type": "track", "track": {...}}      (uno por track, hasta 10)
+        {"type": "done", "total": 10}
+        {"type": "error", "error": "..."}
+    """
+    enforce_rate_limit(http_request, "discover_stream")
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    def encode(event: dict) -> bytes:
+        payload = dumps(event)
+        if use_sse:
+            return b"event: " + event["type"].encode() + b"\ndata: " + payload + b"\n\n"
+        return payload + b"\n"
+    
+    async def events():
+        try:
+            mood_analysis = await analyze_mood(request.user_query, request.language)
+            yield encode({"type": "metadata", "metadata": format_metadata(request.user_query, mood_analysis)})
+            
+            total = 0
+            async for _, tracks in deezer_service.iter_tracks(
+                mood_tags=mood_analysis["mood_tags"],
+                genres=mood_analysis["genres"],
+                energy=mood_analysis["energy"],
+                limit=10
+            ):
+                for track in tracks:
+                    total += 1
+                    yield encode({"type": "track", "track": track})
+            
+            yield encode({"type": "done", "total": total})
+        except Exception as e:
+            yield encode({"type": "error", "error": f"Error processing request: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/discover/batch", response_model=BatchDiscoverResponse)
+async def discover_music_batch(request: BatchDiscoverRequest, http_request: Request):
+    """
+    Discover para muchas descripciones de mood en una sola llamada.
+    
+    - Deduplica queries idénticas (misma cache key + idioma)
+    - Resuelve primero los hits del mood cache
+    - Lanza los misses al analizador y a Deezer con concurrencia acotada
+    - Devuelve un resultado o error por item, en el mismo orden de entrada
+    
+    Cada item cuenta como un discover para el rate limit.
+    """
+    enforce_rate_limit(http_request, "discover_batch", cost=len(request.items))
+    
+    # Agrupar items por query normalizada
+    groups: Dict[tuple, List[int]] = {}
+    first_item: Dict[tuple, DiscoverRequest] = {}
+    for index, item in enumerate(request.items):
+        key = (mood_cache.make_key(item.user_query), item.language)
+        groups.setdefault(key, []).append(index)
+        first_item.setdefault(key, item)
+    
+    # Hits del caché primero: no consumen cupo del LLM
+    analyses: Dict[tuple, dict] = {}
+    for key, item in first_item.items():
+        cached = mood_cache.get_similar(item.user_query, threshold=0.75)
+        if cached:
+            analyses[key] = cached
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def resolve(key: tuple) -> dict:
+        item = first_item[key]
+        async with semaphore:
+            mood_analysis = analyses.get(key)
+            if mood_analysis is None:
+                mood_analysis = await analyze_mood(item.user_query, item.language)
+            return await build_discover_response(item.user_query, mood_analysis)
+    
+    # Los hits van primero en la cola del semáforo
+    keys = sorted(first_item, key=lambda k: k not in analyses)
+    outcomes = await asyncio.gather(*(resolve(key) for key in keys), return_exceptions=True)
+    
+    # Dicts con la forma de BatchDiscoverItem, serializados sin re-validar
+    start = time.perf_counter()
+    results: List[Optional[dict]] = [None] * len(request.items)
+    for key, outcome in zip(keys, outcomes):
+        for index in groups[key]:
+            if isinstance(outcome, Exception):
+                detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+                results[index] = {"index": index, "success": False, "result": None, "error": f"Error processing request: {detail}"}
+            else:
+                results[index] = {"index": index, "success": True, "result": outcome, "error": None}
+    
+    body = dumps({
+        "success": all(r["success"] for r in results),
+        "results": results,
+        "unique_queries": len(first_item),
+        "cache_hits": len(analyses)
+    })
+    STAGE_FORMAT.observe(time.perf_counter() - start)
+    return FastJSONResponse(body)
 
 
 # ============================================
@@ -318,15 +623,15 @@ async def deezer_oauth_callback(code: str, response: Response):
         raise HTTPException(status_code=400, detail="Missing authorization code")
     
     # Intercambiar code por token
-    token_data = deezer_auth_service.exchange_code_for_token(code)
+    token_data = await deezer_auth_service.exchange_code_for_token_async(code)
     
     if not token_data or "access_token" not in token_data:
         raise HTTPException(status_code=401, detail="Failed to obtain access token")
     
     access_token = token_data["access_token"]
     
-    # Obtener info del usuario para confirmar
-    user_info = deezer_auth_service.get_user_info(access_token)
+    # Obtener info del usuario para confirmar (queda en caché para /auth/deezer/user)
+    user_info = await deezer_auth_service.get_user_info_async(access_token)
     
     # Guardar token en cookie httpOnly (seguro contra XSS)
     # En producción, considera usar JWT y guardar en DB con user session
@@ -361,7 +666,8 @@ async def get_deezer_user(request: Request):
     if not token:
         return {"authenticated": False, "user": None}
     
-    user_info = deezer_auth_service.get_user_info(token)
+    # Respuesta desde el caché de perfiles mientras el token sea válido
+    user_info = await deezer_auth_service.get_user_info_async(token)
     
     if not user_info:
         return {"authenticated": False, "user": None}
@@ -377,8 +683,11 @@ async def get_deezer_user(request: Request):
 
 
 @app.post("/auth/deezer/logout")
-async def deezer_logout(response: Response):
-    """Cierra sesión eliminando el token de Deezer"""
+async def deezer_logout(request: Request, response: Response):
+    """Cierra sesión eliminando el token de Deezer y su perfil cacheado"""
+    token = request.cookies.get("deezer_token")
+    if token:
+        deezer_auth_service.forget_user(token)
     response.delete_cookie("deezer_token")
     return {"success": True, "message": "Logged out"}
 
@@ -388,11 +697,19 @@ async def deezer_logout(response: Response):
 # ============================================
 
 @app.post("/api/playlist/create", response_model=PlaylistResponse)
-async def create_mood_playlist(request: CreatePlaylistRequest, http_request: Request):
+async def create_mood_playlist(request: CreatePlaylistRequest, http_request: Request, mode: Optional[str] = None):
     """
     Crea una playlist en Deezer con los tracks del mood analysis.
     Requiere autenticación OAuth (cookie deezer_token).
     
+    Con ?mode=job no espera a Deezer: encola un trabajo y responde 202 con
+    job_id y status_url (GET /api/playlist/jobs/{job_id}). La cabecera
+    opcional Idempotency-Key hace que reenviar la misma petición devuelva
+    el mismo trabajo.
+    
+    Sin mode=job, si falla algún lote de tracks la playlist ya existe en
+    Deezer: se responde igualmente con ella y tracks_count = tracks añadidos.
+    
     Body:
         {
             "track_ids": ["3088638", "916424", ...],
@@ -411,6 +728,8 @@ async def create_mood_playlist(request: CreatePlaylistRequest, http_request: Req
             "tracks_count": 10
         }
     """
+    enforce_rate_limit(http_request, "playlist_create")
+    
     # 1. Verificar autenticación
     token = http_request.cookies.get("deezer_token")
     
@@ -427,14 +746,34 @@ async def create_mood_playlist(request: CreatePlaylistRequest, http_request: Req
             detail="No tracks provided. track_ids cannot be empty."
         )
     
-    # 3. Crear playlist con mood
+    # 3a. Modo job: encolar y responder al momento
+    if mode == "job":
+        try:
+            job = playlist_jobs.submit(
+                access_token=token,
+                mood_name=request.mood_name,
+                track_ids=request.track_ids,
+                genres=request.genres or [],
+                energy=request.energy or "medium",
+                idempotency_key=http_request.headers.get("idempotency-key")
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        return JSONResponse(
+            status_code=202,
+            content={**job.to_dict(), "status_url": f"/api/playlist/jobs/{job.id}"}
+        )
+    
+    # 3b. Crear playlist con mood (sin bloquear el event loop)
     try:
-        playlist_data = deezer_auth_service.create_mood_playlist(
+        playlist_data = await deezer_auth_service.create_mood_playlist_async(
             access_token=token,
             mood_name=request.mood_name,
             track_ids=request.track_ids,
             genres=request.genres or [],
-            energy=request.energy or "medium"
+            energy=request.energy or "medium",
+            partial=True
         )
         
         if not playlist_data:
@@ -460,6 +799,29 @@ async def create_mood_playlist(request: CreatePlaylistRequest, http_request: Req
         )
 
 
+@app.get("/api/playlist/jobs/{job_id}", response_model=PlaylistJobResponse)
+async def get_playlist_job(job_id: str, http_request: Request):
+    """
+    Estado de un trabajo de creación de playlist.
+    Solo visible con la misma cookie deezer_token que lo creó.
+    
+    status: queued → running → succeeded | failed
+    """
+    token = http_request.cookies.get("deezer_token")
+    
+    if not token:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated. Please login with Deezer first."
+        )
+    
+    job = playlist_jobs.get(job_id, token)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.to_dict()
+
+
 # ============================================
 # RUN SERVER
 # ============================================
@@ -0,0 +1,325 @@
+"""
+Bounded Cache
+Mapping acotado por número de entradas y por memoria, con TTL por entrada
+y dos políticas de expulsión:
+
+- lru: se expulsa la entrada usada hace más tiempo
+- tinylfu: W-TinyLFU simplificado. Las entradas nuevas entran en una
+  ventana LRU pequeña (~1% de la capacidad); al salir de ella compiten con
+  la víctima LRU de la zona principal y se queda la que más veces se ha
+  pedido según un Count-Min Sketch con envejecimiento. Así una ráfaga de
+  queries únicas no expulsa a las populares.
+
+El tamaño de cada entrada es una estimación (sys.getsizeof recursivo más
+un coste fijo por entrada y por carácter de key, que cubre el nodo del
+mapping y los trigramas del índice), suficiente para acotar en MB.
+Los instantes de expiración son de reloj de pared (time.time) para poder
+persistirlos.
+"""
+
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+LRU = "lru"
+TINYLFU = "tinylfu"
+
+# Coste aproximado por entrada (objeto _Entry + nodo del OrderedDict) y por
+# carácter de key (sets de postings del TrigramIndex), medido con tracemalloc
+ENTRY_OVERHEAD_BYTES = 180
+KEY_INDEX_BYTES_PER_CHAR = 170
+
+NEVER = math.inf
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_MISSING = object()
+
+
+def estimate_size(obj: Any) -> int:
+    """Tamaño aproximado en bytes de un valor JSON (dicts, listas, strings, números)"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(estimate_size(v) for v in obj)
+    return size
+
+
+class FrequencySketch:
+    """
+    Count-Min Sketch de 4 filas con contadores de un byte saturados en 15.
+    
+    Tras `sample_size` incrementos todos los contadores se dividen entre 2,
+    así la popularidad antigua pierde peso frente a la reciente.
+    """
+    
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+    MAX_COUNT = 15
+    
+    def __init__(self, capacity: int):
+        # ~4 contadores por entrada: con menos, las colisiones de una ráfaga
+        # de queries únicas inflan su frecuencia y ganan la admisión
+        width = 1
+        while width < max(64, 4 * capacity):
+            width <<= 1
+        self._shift = 64 - width.bit_length() + 1
+        self._table = [bytearray(width) for _ in self.SEEDS]
+        self.sample_size = 10 * width
+        self._additions = 0
+    
+    def _slots(self, key: Hashable):
+        # Hashing multiplicativo con una semilla impar por fila (bits altos):
+        # filas casi independientes, dos keys rara vez chocan en todas
+        h = hash(key) & _MASK64
+        for row, seed in enumerate(self.SEEDS):
+            yield row, ((h * seed) & _MASK64) >> self._shift
+    
+    def increment(self, key: Hashable):
+        added = False
+        for row, slot in self._slots(key):
+            if self._table[row][slot] < self.MAX_COUNT:
+                self._table[row][slot] += 1
+                added = True
+        if added:
+            self._additions += 1
+            if self._additions >= self.sample_size:
+                self._reset()
+    
+    def frequency(self, key: Hashable) -> int:
+        return min(self._table[row][slot] for row, slot in self._slots(key))
+    
+    def _reset(self):
+        self._table = [bytearray(count >> 1 for count in row) for row in self._table]
+        self._additions //= 2
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+    
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class BoundedCache(MutableMapping):
+    """Mapping thread-safe con tope de entradas y de bytes, TTL por entrada y política LRU o W-TinyLFU"""
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        policy: str = LRU,
+        ttl: float = 0.0,
+        on_evict: Optional[Callable[[Hashable, str], None]] = None,
+        purge_interval: float = 60.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            max_entries: Máximo de entradas (0 = sin tope)
+            max_bytes: Máximo de bytes estimados (0 = sin tope)
+            policy: "lru" o "tinylfu"
+            ttl: TTL por defecto en segundos (0 = no expira)
+            on_evict: Callback(key, motivo) con motivo "size", "expired" o "rejected"
+            purge_interval: Segundos mínimos entre barridos de entradas expiradas
+            clock: Reloj de pared (inyectable en tests)
+        """
+        if policy not in (LRU, TINYLFU):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.purge_interval = purge_interval
+        self.clock = clock
+        
+        self._entries: Dict[Hashable, _Entry] = {}
+        # lru: todo en _main. tinylfu: las nuevas en _window, las admitidas en _main
+        self._main: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._window: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._window_size = max(1, max_entries // 100) if max_entries else 64
+        self._sketch = FrequencySketch(max_entries or 10000) if policy == TINYLFU else None
+        self._lock = threading.RLock()
+        self._last_purge = clock()
+        
+        self.bytes = 0
+        self.evictions: Dict[str, int] = {"size": 0, "expired": 0, "rejected": 0}
+    
+    # ============================================
+    # MAPPING
+    # ============================================
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator[Hashable]:
+        with self._lock:
+            return iter(list(self._entries))
+    
+    def __contains__(self, key: object) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires_at > self.clock()
+    
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+    
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(key)
+            self._remove(key)
+    
+    # ============================================
+    # API
+    # ============================================
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Devuelve el valor si existe y no ha expirado, y cuenta el acceso"""
+        with self._lock:
+            if self._sketch is not None:
+                self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry.expires_at <= self.clock():
+                self._evict(key, "expired")
+                return default
+            segment = self._window if key in self._window else self._main
+            segment.move_to_end(key)
+            return entry.value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        Guarda una entrada.
+        
+        Args:
+            ttl: TTL de esta entrada (por defecto self.ttl; 0 = no expira)
+            expires_at: Instante absoluto de expiración (tiene prioridad sobre ttl)
+        """
+        now = self.clock()
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = now + ttl if ttl else NEVER
+        entry = _Entry(value, expires_at, estimate_size(value) + self._key_cost(key))
+        
+        with self._lock:
+            if self._sketch is not None:
+                self._sketch.increment(key)
+            previous = self._entries.get(key)
+            if previous is not None:
+                self.bytes += entry.size - previous.size
+                self._entries[key] = entry
+                segment = self._window if key in self._window else self._main
+                segment.move_to_end(key)
+            else:
+                self._entries[key] = entry
+                self.bytes += entry.size
+                (self._window if self.policy == TINYLFU else self._main)[key] = None
+            
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_expired(now)
+            self._enforce_limits()
+    
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry.expires_at if entry is not None else None
+    
+    def snapshot(self) -> Tuple[Dict[Hashable, Any], Dict[Hashable, float]]:
+        """
+        Copia de las entradas vivas y de sus expiraciones finitas, sin tocar
+        la recencia ni disparar callbacks (para persistir desde otro hilo).
+        """
+        now = self.clock()
+        with self._lock:
+            values = {}
+            expiry = {}
+            for key, entry in self._entries.items():
+                if entry.expires_at <= now:
+                    continue
+                values[key] = entry.value
+                if entry.expires_at != NEVER:
+                    expiry[key] = entry.expires_at
+            return values, expiry
+    
+    def purge_expired(self) -> int:
+        """Elimina todas las entradas expiradas; retorna cuántas"""
+        with self._lock:
+            return self._purge_expired(self.clock())
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._main.clear()
+            self._window.clear()
+            self.bytes = 0
+    
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "evictions": dict(self.evictions)
+        }
+    
+    # ============================================
+    # EXPULSIÓN
+    # ============================================
+    
+    @staticmethod
+    def _key_cost(key: Hashable) -> int:
+        key_len = len(key) if isinstance(key, str) else 16
+        return sys.getsizeof(key) + ENTRY_OVERHEAD_BYTES + KEY_INDEX_BYTES_PER_CHAR * key_len
+    
+    def _over(self) -> bool:
+        return bool((self.max_entries and len(self._entries) > self.max_entries)
+                    or (self.max_bytes and self.bytes > self.max_bytes))
+    
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        self._main.pop(key, None)
+        self._window.pop(key, None)
+    
+    def _evict(self, key: Hashable, reason: str):
+        self._remove(key)
+        self.evictions[reason] += 1
+        if self.on_evict is not None:
+            self.on_evict(key, reason)
+    
+    def _purge_expired(self, now: float) -> int:
+        self._last_purge = now
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._evict(key, "expired")
+        return len(expired)
+    
+    def _enforce_limits(self):
+        if self.policy == TINYLFU:
+            # Las que salen de la ventana pasan a la zona principal si hay
+            # sitio; si no, compiten por frecuencia con su víctima LRU
+            while len(self._window) > self._window_size:
+                candidate, _ = self._window.popitem(last=False)
+                self._main[candidate] = None
+                while self._over() and candidate in self._main and len(self._main) > 1:
+                    victim = next(iter(self._main))
+                    if self._sketch.frequency(candidate) > self._sketch.frequency(victim):
+                        self._evict(victim, "size")
+                    else:
+                        self._evict(candidate, "rejected")
+        
+        while self._over():
+            segment = self._main if self._main else self._window
+            self._evict(next(iter(segment)), "size")
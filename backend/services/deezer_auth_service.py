@@ -10,13 +10,61 @@ Flujo:
 """
 
 import os
-import requests
-from typing import Dict, List, Optional
+import time
+import asyncio
+import hashlib
+from typing import Callable, Dict, List, Optional, Set
 from dotenv import load_dotenv
 from urllib.parse import urlencode
+from services.deezer_scheduler import Priority, deezer_scheduler
+from services.metrics_service import OUTBOUND_REQUESTS, OUTBOUND_SECONDS
+from services.ttl_cache import TTLCache
+from services.logging_service import get_logger
+from services.lazy_import import lazy_instance, lazy_module
+from services.ssl_context import shared_ssl_context
+
+log = get_logger(__name__)
+
+# Solo lo usan los métodos síncronos: no se importa hasta la primera llamada
+requests = lazy_module("requests")
+# Se importa al crear el cliente (warm-up o primer request), no con la app
+httpx = lazy_module("httpx")
 
 load_dotenv()
 
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Deezer: 4 = Quota limit exceeded, 700 = Service busy
+RETRYABLE_CODES = {4, 700}
+# Deezer: 801 = la canción ya está en la playlist
+ALREADY_IN_PLAYLIST = 801
+
+
+def hash_token(access_token: str) -> str:
+    """Huella del token: cachés y trabajos nunca guardan ni indexan el token en claro"""
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+class DeezerAPIError(Exception):
+    """
+    Error de la API de Deezer: HTTP != 2xx o {"error": {...}} con HTTP 200.
+    
+    ambiguous: la petición pudo llegar a Deezer y aplicarse (timeout de
+    lectura, conexión cortada, 5xx). Reintentar una escritura no idempotente
+    como crear una playlist podría duplicarla.
+    """
+    
+    def __init__(self, message: str, code: Optional[int] = None, status: Optional[int] = None,
+                 retry_after: Optional[float] = None, ambiguous: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.retry_after = retry_after
+        self.ambiguous = ambiguous
+    
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUS or self.code in RETRYABLE_CODES
+
 
 class DeezerAuthService:
     """Servicio para OAuth y gestión de playlists en Deezer"""
@@ -26,18 +74,51 @@ class DeezerAuthService:
         self.secret_key = os.getenv("DEEZER_SECRET_KEY")
         self.redirect_uri = os.getenv("DEEZER_REDIRECT_URI", "http://localhost:8000/auth/deezer/callback")
         
-        self.oauth_url = "https://connect.deezer.com/oauth"
-        self.api_url = "https://api.deezer.com"
+        # Sobrescribibles para pruebas de carga contra el emulador local
+        self.oauth_url = os.getenv("DEEZER_OAUTH_BASE_URL", "https://connect.deezer.com/oauth").rstrip("/")
+        self.api_url = os.getenv("DEEZER_API_BASE_URL", "https://api.deezer.com").rstrip("/")
+        
+        # Cliente asíncrono para crear playlists sin bloquear el event loop
+        self.timeout = float(os.getenv("DEEZER_AUTH_TIMEOUT", "10.0"))
+        self.max_retries = int(os.getenv("DEEZER_AUTH_MAX_RETRIES", "3"))
+        self.add_chunk_size = int(os.getenv("PLAYLIST_ADD_CHUNK_SIZE", "25"))
+        self.add_concurrency = int(os.getenv("PLAYLIST_ADD_CONCURRENCY", "3"))
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Mismo token bucket que las búsquedas: la cuota de Deezer es por app
+        self.scheduler = deezer_scheduler
+        
+        # Perfiles de /user/me keyed por sha256 del token (TTL = vida de la cookie)
+        self.user_cache = TTLCache(
+            maxsize=int(os.getenv("DEEZER_USER_CACHE_SIZE", "2048")),
+            ttl=float(os.getenv("DEEZER_USER_CACHE_TTL", "3600"))
+        )
         
         if not self.app_id or not self.secret_key:
-            print("⚠️ WARNING: DEEZER_APP_ID or DEEZER_SECRET_KEY not configured")
-            print("   OAuth features will be disabled")
-            print("   Get credentials from: https://developers.deezer.com/myapps")
+            log.warning("⚠️ DEEZER_APP_ID or DEEZER_SECRET_KEY not configured, OAuth features will be disabled",
+                        help="https://developers.deezer.com/myapps")
     
     def is_configured(self) -> bool:
         """Verifica si el servicio OAuth está configurado"""
         return bool(self.app_id and self.secret_key)
     
+    def start(self):
+        """Crea el cliente HTTP compartido. Se llama desde el lifespan de la app."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=5.0), verify=shared_ssl_context())
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # Fallback para scripts/tests que no pasan por el lifespan de FastAPI
+        if self._client is None:
+            self.start()
+        return self._client
+    
     def get_auth_url(self, state: Optional[str] = None) -> str:
         """
         Genera URL de autenticación OAuth para redirigir al usuario.
@@ -58,7 +139,7 @@ class DeezerAuthService:
             params["state"] = state
         
         auth_url = f"{self.oauth_url}/auth.php?{urlencode(params)}"
-        print(f"🔐 OAuth URL generated: {auth_url}")
+        log.debug("🔐 OAuth URL generated")
         return auth_url
     
     def exchange_code_for_token(self, code: str) -> Optional[Dict]:
@@ -80,7 +161,7 @@ class DeezerAuthService:
             }
             
             url = f"{self.oauth_url}/access_token.php"
-            print(f"🔄 Exchanging code for token...")
+            log.debug("🔄 Exchanging code for token")
             
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
@@ -88,19 +169,49 @@ class DeezerAuthService:
             data = response.json()
             
             if "access_token" in data:
-                print(f"✅ Access token obtained (expires in {data.get('expires', 'N/A')}s)")
+                log.info("✅ Access token obtained", expires=data.get("expires"))
                 return data
             else:
-                print(f"❌ No access_token in response: {data}")
+                log.error("❌ No access_token in response", response=data)
                 return None
-                
+        
+        except Exception as e:
+            log.error("❌ Error exchanging code", error=str(e))
+            return None
+    
+    async def exchange_code_for_token_async(self, code: str) -> Optional[Dict]:
+        """
+        Versión asíncrona de exchange_code_for_token sobre el cliente httpx
+        compartido (no bloquea el event loop en el callback de OAuth).
+        
+        Returns:
+            {"access_token": "...", "expires": 3600} o None si falla
+        """
+        params = {"app_id": self.app_id, "secret": self.secret_key, "code": code, "output": "json"}
+        log.debug("🔄 Exchanging code for token")
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(f"{self.oauth_url}/access_token.php", params=params)
+            response.raise_for_status()
+            data = response.json()
         except Exception as e:
-            print(f"❌ Error exchanging code: {e}")
+            OUTBOUND_REQUESTS.labels(service="deezer_auth", outcome="error").inc()
+            log.error("❌ Error exchanging code", error=str(e))
             return None
+        finally:
+            OUTBOUND_SECONDS.labels(service="deezer_auth").observe(time.perf_counter() - start)
+        OUTBOUND_REQUESTS.labels(service="deezer_auth", outcome="ok").inc()
+        
+        if isinstance(data, dict) and "access_token" in data:
+            log.info("✅ Access token obtained", expires=data.get("expires"))
+            return data
+        log.error("❌ No access_token in response", response=data)
+        return None
     
     def get_user_info(self, access_token: str) -> Optional[Dict]:
         """
         Obtiene información del usuario autenticado.
+        Los perfiles se cachean en memoria (ver get_user_info_async).
         
         Args:
             access_token: Token de acceso
@@ -108,21 +219,61 @@ class DeezerAuthService:
         Returns:
             {"id": 123, "name": "User", ...} o None si falla
         """
+        token_hash = hash_token(access_token)
+        cached = self.user_cache.get(token_hash)
+        if cached is not None:
+            return cached
+        
         try:
             url = f"{self.api_url}/user/me"
             params = {"access_token": access_token}
             
+            self.scheduler.acquire_sync(Priority.INTERACTIVE)
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
             
             user_data = response.json()
-            print(f"👤 User info: {user_data.get('name', 'Unknown')} (ID: {user_data.get('id')})")
+            if "error" in user_data:
+                log.warning("❌ Error getting user info", error=user_data["error"])
+                return None
+            log.debug("👤 User info", user_id=user_data.get("id"))
+            self.user_cache.set(token_hash, user_data)
             return user_data
-            
+        
         except Exception as e:
-            print(f"❌ Error getting user info: {e}")
+            log.warning("❌ Error getting user info", error=str(e))
             return None
     
+    async def get_user_info_async(self, access_token: str) -> Optional[Dict]:
+        """
+        Versión asíncrona de get_user_info con caché TTL.
+        
+        El caché está keyed por sha256 del token (nunca el token en claro) y
+        solo guarda respuestas válidas: un hit responde sin ir a Deezer
+        durante la vida del token. forget_user() lo invalida en el logout.
+        
+        Returns:
+            {"id": 123, "name": "User", ...} o None si falla
+        """
+        token_hash = hash_token(access_token)
+        cached = self.user_cache.get(token_hash)
+        if cached is not None:
+            return cached
+        
+        try:
+            user_data = await self._api_call("GET", "/user/me", {"access_token": access_token})
+            log.debug("👤 User info", user_id=user_data.get("id"))
+        except Exception as e:
+            log.warning("❌ Error getting user info", error=str(e))
+            return None
+        
+        self.user_cache.set(token_hash, user_data)
+        return user_data
+    
+    def forget_user(self, access_token: str):
+        """Elimina el perfil cacheado de un token (logout)"""
+        self.user_cache.delete(hash_token(access_token))
+    
     def create_playlist(
         self,
         access_token: str,
@@ -151,11 +302,12 @@ class DeezerAuthService:
             
             if description:
                 params["description"] = description
-                
+            
             # Deezer API no soporta parámetro 'public' directamente,
             # todas las playlists creadas vía API son públicas por defecto
             
-            print(f"📝 Creating playlist: '{title}'")
+            log.debug("📝 Creating playlist", title=title)
+            self.scheduler.acquire_sync(Priority.USER_WRITE)
             response = requests.post(url, params=params, timeout=10)
             response.raise_for_status()
             
@@ -164,18 +316,18 @@ class DeezerAuthService:
             
             if isinstance(data, dict) and "id" in data:
                 playlist_id = data["id"]
-                print(f"✅ Playlist created: ID {playlist_id}")
+                log.info("✅ Playlist created", playlist_id=playlist_id)
                 return {"id": str(playlist_id)}
             elif isinstance(data, bool) and data:
                 # Algunas versiones de API retornan solo true
-                print(f"✅ Playlist created (no ID returned)")
+                log.warning("✅ Playlist created (no ID returned)")
                 return {"id": "unknown"}
             else:
-                print(f"❌ Unexpected response: {data}")
+                log.error("❌ Unexpected response", response=data)
                 return None
-                
+        
         except Exception as e:
-            print(f"❌ Error creating playlist: {e}")
+            log.error("❌ Error creating playlist", error=str(e))
             return None
     
     def add_tracks_to_playlist(
@@ -197,7 +349,7 @@ class DeezerAuthService:
         """
         try:
             if not track_ids:
-                print("⚠️ No tracks to add")
+                log.warning("⚠️ No tracks to add")
                 return False
             
             url = f"{self.api_url}/playlist/{playlist_id}/tracks"
@@ -210,7 +362,8 @@ class DeezerAuthService:
                 "songs": songs_param
             }
             
-            print(f"📥 Adding {len(track_ids)} tracks to playlist {playlist_id}")
+            log.debug("📥 Adding tracks", playlist_id=playlist_id, tracks=len(track_ids))
+            self.scheduler.acquire_sync(Priority.USER_WRITE)
             response = requests.post(url, params=params, timeout=10)
             response.raise_for_status()
             
@@ -218,14 +371,14 @@ class DeezerAuthService:
             
             # Response es simple: true o false
             if data is True or data == "true":
-                print(f"✅ Tracks added successfully")
+                log.debug("✅ Tracks added successfully")
                 return True
             else:
-                print(f"❌ Failed to add tracks: {data}")
+                log.error("❌ Failed to add tracks", response=data)
                 return False
-                
+        
         except Exception as e:
-            print(f"❌ Error adding tracks: {e}")
+            log.error("❌ Error adding tracks", error=str(e))
             return False
     
     def create_mood_playlist(
@@ -257,18 +410,8 @@ class DeezerAuthService:
             }
         """
         try:
-            # 1. Formatear título descriptivo
-            title = f"Mood: {mood_name}"
-            
-            # 2. Formatear descripción
-            description_parts = ["Generado por Asistente Musical AI"]
-            if genres:
-                description_parts.append(f"Géneros: {', '.join(genres[:3])}")
-            if energy:
-                energy_emoji = {"low": "🌙", "medium": "☀️", "high": "⚡"}.get(energy, "")
-                description_parts.append(f"Energía: {energy} {energy_emoji}")
-            
-            description = " | ".join(description_parts)
+            # 1-2. Formatear título y descripción
+            title, description = self._mood_playlist_text(mood_name, genres, energy)
             
             # 3. Crear playlist
             playlist_data = self.create_playlist(
@@ -278,7 +421,7 @@ class DeezerAuthService:
             )
             
             if not playlist_data or "id" not in playlist_data:
-                print("❌ Failed to create playlist")
+                log.error("❌ Failed to create playlist")
                 return None
             
             playlist_id = playlist_data["id"]
@@ -291,7 +434,7 @@ class DeezerAuthService:
             )
             
             if not success:
-                print("⚠️ Playlist created but failed to add tracks")
+                log.warning("⚠️ Playlist created but failed to add tracks")
             
             # 5. Construir respuesta con URLs
             result = {
@@ -303,15 +446,228 @@ class DeezerAuthService:
                 "tracks_count": len(track_ids) if success else 0
             }
             
-            print(f"🎉 Mood playlist created successfully!")
-            print(f"   URL: {result['url']}")
+            log.info("🎉 Mood playlist created", url=result["url"])
             
             return result
-            
+        
         except Exception as e:
-            print(f"❌ Error creating mood playlist: {e}")
+            log.error("❌ Error creating mood playlist", error=str(e))
             return None
+    
+    
+    @staticmethod
+    def _mood_playlist_text(mood_name: str, genres: Optional[List[str]], energy: Optional[str]):
+        """Título y descripción de una playlist de mood"""
+        title = f"Mood: {mood_name}"
+        
+        description_parts = ["Generado por Asistente Musical AI"]
+        if genres:
+            description_parts.append(f"Géneros: {', '.join(genres[:3])}")
+        if energy:
+            energy_emoji = {"low": "🌙", "medium": "☀️", "high": "⚡"}.get(energy, "")
+            description_parts.append(f"Energía: {energy} {energy_emoji}")
+        
+        return title, " | ".join(description_parts)
+    
+    # ============================================
+    # VERSIONES ASÍNCRONAS (httpx)
+    # ============================================
+    
+    async def _api_call(self, method: str, path: str, params: Dict, idempotent: bool = True):
+        """
+        Llamada a la API de Deezer con reintentos para 429/5xx y errores de
+        cuota (backoff exponencial, respetando Retry-After).
+        
+        Args:
+            idempotent: False para escrituras que no se pueden repetir (crear
+                playlist): solo se reintentan los fallos en los que Deezer no
+                llegó a procesar la petición (error al conectar, 429, cuota)
+        
+        Raises:
+            DeezerAPIError: si Deezer devuelve un error o se agotan los reintentos
+        """
+        # Las escrituras del usuario nunca se descartan; las lecturas esperan como INTERACTIVE
+        priority = Priority.INTERACTIVE if method == "GET" else Priority.USER_WRITE
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.scheduler.acquire(priority)
+            start = time.perf_counter()
+            try:
+                try:
+                    response = await self.client.request(method, f"{self.api_url}{path}", params=params)
+                except httpx.HTTPError as e:
+                    # Si no se llegó a conectar la petición no salió: no es ambiguo
+                    sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                    raise DeezerAPIError(f"{type(e).__name__}: {e}", status=503, ambiguous=sent)
+                if response.status_code >= 400:
+                    retry_after = response.headers.get("Retry-After")
+                    if response.status_code == 429:
+                        self.scheduler.report_quota_exceeded(float(retry_after) if retry_after and retry_after.isdigit() else None)
+                    raise DeezerAPIError(
+                        f"HTTP {response.status_code}",
+                        status=response.status_code,
+                        retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+                        ambiguous=response.status_code >= 500
+                    )
+                data = response.json()
+                if isinstance(data, dict) and "error" in data:
+                    error = data["error"] if isinstance(data["error"], dict) else {"message": str(data["error"])}
+                    if error.get("code") == 4:
+                        self.scheduler.report_quota_exceeded()
+                    raise DeezerAPIError(error.get("message", "Deezer error"), code=error.get("code"))
+            except DeezerAPIError as e:
+                OUTBOUND_REQUESTS.labels(service="deezer_auth", outcome="error").inc()
+                if not e.retryable or attempt > self.max_retries or (e.ambiguous and not idempotent):
+                    raise
+                delay = e.retry_after if e.retry_after is not None else min(0.25 * 2 ** (attempt - 1), 5.0)
+                log.warning("🔁 Deezer call failed, retrying", method=method, path=path, error=str(e), attempt=attempt, max_retries=self.max_retries, delay=round(delay, 2))
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                OUTBOUND_SECONDS.labels(service="deezer_auth").observe(time.perf_counter() - start)
+            OUTBOUND_REQUESTS.labels(service="deezer_auth", outcome="ok").inc()
+            return data
+    
+    async def create_playlist_async(self, access_token: str, title: str, description: str = "") -> str:
+        """
+        Crea una playlist (versión asíncrona de create_playlist).
+        
+        No se reintenta si la petición pudo llegar a Deezer (DeezerAPIError
+        con ambiguous=True): un segundo POST crearía otra playlist.
+        
+        Returns:
+            ID de la playlist
+        """
+        params = {"access_token": access_token, "title": title}
+        if description:
+            params["description"] = description
+        data = await self._api_call("POST", "/user/me/playlists", params, idempotent=False)
+        if isinstance(data, dict) and "id" in data:
+            return str(data["id"])
+        raise DeezerAPIError(f"Unexpected response: {data}")
+    
+    async def get_playlist_track_ids_async(self, access_token: str, playlist_id: str) -> Set[str]:
+        """IDs de los tracks que ya están en la playlist"""
+        data = await self._api_call(
+            "GET", f"/playlist/{playlist_id}/tracks", {"access_token": access_token, "limit": 2000}
+        )
+        return {str(track["id"]) for track in data.get("data", [])}
+    
+    async def add_tracks_async(self, access_token: str, playlist_id: str, track_ids: List[str]) -> int:
+        """
+        Añade un lote de tracks a la playlist de forma idempotente.
+        
+        Si un reintento encuentra tracks ya añadidos (error 801, p.ej. porque
+        la llamada anterior sí llegó a Deezer), consulta la playlist y envía
+        solo los que faltan.
+        
+        Returns:
+            Número de tracks del lote que están en la playlist al terminar
+        """
+        pending = list(track_ids)
+        for _ in range(2):
+            if not pending:
+                return len(track_ids)
+            try:
+                data = await self._api_call(
+                    "POST", f"/playlist/{playlist_id}/tracks",
+                    {"access_token": access_token, "songs": ",".join(pending)}
+                )
+            except DeezerAPIError as e:
+                if e.code != ALREADY_IN_PLAYLIST:
+                    raise
+                existing = await self.get_playlist_track_ids_async(access_token, playlist_id)
+                pending = [track_id for track_id in pending if track_id not in existing]
+                continue
+            if data is True or data == "true":
+                return len(track_ids)
+            raise DeezerAPIError(f"Failed to add tracks: {data}")
+        if pending:
+            raise DeezerAPIError(f"Could not add {len(pending)} tracks", code=ALREADY_IN_PLAYLIST)
+        return len(track_ids)
+    
+    async def create_mood_playlist_async(
+        self,
+        access_token: str,
+        mood_name: str,
+        track_ids: List[str],
+        genres: List[str] = None,
+        energy: str = "medium",
+        playlist_id: Optional[str] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None,
+        partial: bool = False
+    ) -> Dict:
+        """
+        Versión asíncrona de create_mood_playlist.
+        
+        Los tracks se añaden en lotes de PLAYLIST_ADD_CHUNK_SIZE, con hasta
+        PLAYLIST_ADD_CONCURRENCY llamadas a la vez. Es seguro reintentarla:
+        pasando el playlist_id de un intento anterior no se crea otra
+        playlist y los tracks ya añadidos no se duplican.
+        
+        Args:
+            playlist_id: Playlist ya creada en un intento anterior (opcional)
+            on_progress: Callback(playlist_id, tracks añadidos hasta ahora)
+            partial: Si falla un lote, devolver la playlist con los tracks
+                añadidos hasta entonces en vez de lanzar (la playlist ya
+                existe: un reintento del usuario crearía otra)
+        
+        Returns:
+            Mismo formato que create_mood_playlist, más "error" (None si
+            se añadieron todos los lotes)
+        
+        Raises:
+            DeezerAPIError: si falla la creación o, sin partial, algún lote
+        """
+        title, description = self._mood_playlist_text(mood_name, genres, energy)
+        
+        if playlist_id is None:
+            log.debug("📝 Creating playlist", title=title)
+            playlist_id = await self.create_playlist_async(access_token, title, description)
+        if on_progress:
+            on_progress(playlist_id, 0)
+        
+        # Sin duplicados, manteniendo el orden
+        track_ids = list(dict.fromkeys(str(t) for t in track_ids))
+        chunks = [track_ids[i:i + self.add_chunk_size] for i in range(0, len(track_ids), self.add_chunk_size)]
+        semaphore = asyncio.Semaphore(self.add_concurrency)
+        added = 0
+        
+        async def add_chunk(chunk: List[str]):
+            nonlocal added
+            async with semaphore:
+                count = await self.add_tracks_async(access_token, playlist_id, chunk)
+            added += count
+            if on_progress:
+                on_progress(playlist_id, added)
+        
+        log.debug("📥 Adding tracks", playlist_id=playlist_id, tracks=len(track_ids), chunks=len(chunks))
+        tasks = [asyncio.ensure_future(add_chunk(chunk)) for chunk in chunks]
+        error = None
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            # gather no cancela el resto de lotes: se paran aquí
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not partial:
+                raise
+            error = str(e)
+            log.warning("⚠️ Playlist created but failed to add tracks", playlist_id=playlist_id,
+                        added=added, total=len(track_ids), error=error)
+        
+        return {
+            "id": playlist_id,
+            "url": f"https://www.deezer.com/playlist/{playlist_id}",
+            "app_url": f"deezer://playlist/{playlist_id}",
+            "title": title,
+            "description": description,
+            "tracks_count": added,
+            "error": error
+        }
 
 
-# Singleton instance
-deezer_auth_service = DeezerAuthService()
+# Singleton instance (se construye en el primer uso, no al importar)
+deezer_auth_service = lazy_instance(DeezerAuthService)
@@ -0,0 +1,236 @@
+"""
+Deezer Scheduler
+Token bucket compartido para todas las llamadas salientes a la API de Deezer.
+
+Deezer limita cada app a ~50 requests cada 5 segundos. En vez de gastar
+cuota en requests que van a fallar, cada llamada pide un token con una
+prioridad; si no hay tokens espera en una cola por prioridad, y el trabajo
+de baja prioridad se descarta (shed) cuando no puede esperar más:
+
+    USER_WRITE   escrituras de playlist del usuario   → espera siempre
+    INTERACTIVE  primera estrategia, perfil /user/me  → espera hasta 5s
+    FALLBACK     estrategias de respaldo               → espera hasta 1s
+    BACKGROUND   refrescos stale, top-up del catálogo  → solo si hay token libre
+    WARMUP       precarga de queries semilla al arrancar → espera siempre, detrás de todo
+
+El bucket tiene capacidad `burst` y se rellena a (limit - burst) / window
+tokens por segundo, así que en cualquier ventana de `window` segundos no
+salen más de `limit` requests. Si Deezer responde igualmente con un error
+de cuota, report_quota_exceeded() vacía el bucket y pausa el reparto.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from services.metrics_service import DEEZER_SCHEDULER_SHED, DEEZER_SCHEDULER_WAIT_SECONDS
+
+
+class Priority(IntEnum):
+    USER_WRITE = 0
+    INTERACTIVE = 1
+    FALLBACK = 2
+    BACKGROUND = 3
+    WARMUP = 4
+
+
+DEFAULT_MAX_WAIT: Dict[Priority, Optional[float]] = {
+    Priority.USER_WRITE: None,
+    Priority.INTERACTIVE: 5.0,
+    Priority.FALLBACK: 1.0,
+    Priority.BACKGROUND: 0.0,
+    Priority.WARMUP: None,
+}
+
+_DEFAULT = object()
+
+
+class DeezerRateLimited(Exception):
+    """La llamada se descartó para no superar la cuota de Deezer"""
+    
+    def __init__(self, priority: Priority, waited: float):
+        super().__init__(f"Deezer rate limit: {priority.name.lower()} request shed after {waited:.2f}s")
+        self.priority = priority
+        self.waited = waited
+
+
+class DeezerScheduler:
+    """Token bucket con cola por prioridad, compartido por DeezerService y DeezerAuthService"""
+    
+    def __init__(
+        self,
+        limit: int = 50,
+        window: float = 5.0,
+        burst: int = 5,
+        max_wait: Optional[Dict[Priority, Optional[float]]] = None
+    ):
+        """
+        Args:
+            limit: Requests permitidas por ventana
+            window: Duración de la ventana en segundos
+            burst: Capacidad del bucket (requests seguidas sin esperar)
+            max_wait: Espera máxima por prioridad (None = sin límite)
+        """
+        self.limit = limit
+        self.window = window
+        self.burst = max(1, min(burst, limit))
+        self.rate = max(limit - self.burst, 1) / window
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+        
+        # Estado del bucket; lo usan el event loop y las llamadas síncronas
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        
+        self.granted: Counter = Counter()
+        self.shed: Counter = Counter()
+        self.quota_errors = 0
+    
+    # ============================================
+    # BUCKET
+    # ============================================
+    
+    def _refill(self, now: float):
+        # _updated puede estar en el futuro mientras dura una pausa por cuota
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+    
+    def _try_take(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+    
+    def _delay_until_token(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                return 0.0
+            return max(self._updated - now, 0.0) + (1 - self._tokens) / self.rate
+    
+    def report_quota_exceeded(self, retry_after: Optional[float] = None):
+        """
+        Deezer respondió con error de cuota (código 4 o HTTP 429): vacía el
+        bucket y no reparte tokens hasta que pase retry_after (o una ventana).
+        """
+        with self._lock:
+            self.quota_errors += 1
+            self._tokens = 0.0
+            self._updated = max(self._updated, time.monotonic() + (retry_after or self.window))
+    
+    # ============================================
+    # ADQUIRIR
+    # ============================================
+    
+    def _record(self, priority: Priority, waited: float):
+        self.granted[priority.name.lower()] += 1
+        DEEZER_SCHEDULER_WAIT_SECONDS.labels(priority=priority.name.lower()).observe(waited)
+    
+    def _shed(self, priority: Priority, waited: float) -> DeezerRateLimited:
+        self.shed[priority.name.lower()] += 1
+        DEEZER_SCHEDULER_SHED.labels(priority=priority.name.lower()).inc()
+        return DeezerRateLimited(priority, waited)
+    
+    async def acquire(self, priority: Priority, max_wait=_DEFAULT):
+        """
+        Espera un token respetando la prioridad.
+        
+        Raises:
+            DeezerRateLimited: si no hay token antes de max_wait
+        """
+        limit = self.max_wait[priority] if max_wait is _DEFAULT else max_wait
+        start = time.perf_counter()
+        
+        if not self._has_waiters() and self._try_take():
+            self._record(priority, 0.0)
+            return
+        if limit is not None and limit <= 0:
+            raise self._shed(priority, 0.0)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._ensure_dispatcher(loop)
+        
+        try:
+            await asyncio.wait_for(future, limit)
+        except asyncio.TimeoutError:
+            raise self._shed(priority, time.perf_counter() - start)
+        self._record(priority, time.perf_counter() - start)
+    
+    def acquire_sync(self, priority: Priority, max_wait=_DEFAULT):
+        """
+        Versión bloqueante para los caminos síncronos (requests).
+        Comparte el bucket pero no la cola por prioridad.
+        """
+        limit = self.max_wait[priority] if max_wait is _DEFAULT else max_wait
+        start = time.perf_counter()
+        while not self._try_take():
+            delay = self._delay_until_token()
+            waited = time.perf_counter() - start
+            if limit is not None and waited + delay > limit:
+                raise self._shed(priority, waited)
+            time.sleep(delay)
+        self._record(priority, time.perf_counter() - start)
+    
+    def _has_waiters(self) -> bool:
+        return any(not future.done() for _, _, future in self._waiters)
+    
+    def _ensure_dispatcher(self, loop: asyncio.AbstractEventLoop):
+        dispatcher = self._dispatcher
+        if dispatcher is None or dispatcher.done() or dispatcher.get_loop() is not loop:
+            self._dispatcher = loop.create_task(self._dispatch(loop))
+    
+    async def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        """Reparte tokens a los waiters en orden de prioridad (y de llegada)"""
+        try:
+            while True:
+                # Descartar waiters que ya no esperan (timeout) o de otro event loop
+                while self._waiters and (self._waiters[0][2].done() or self._waiters[0][2].get_loop() is not loop):
+                    heapq.heappop(self._waiters)
+                if not self._waiters:
+                    break
+                if self._try_take():
+                    _, _, future = heapq.heappop(self._waiters)
+                    future.set_result(None)
+                    continue
+                await asyncio.sleep(self._delay_until_token())
+        finally:
+            if self._dispatcher is asyncio.current_task():
+                self._dispatcher = None
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            tokens = self._tokens
+        return {
+            "limit": self.limit,
+            "window": self.window,
+            "tokens": round(tokens, 2),
+            "queued": sum(1 for _, _, future in self._waiters if not future.done()),
+            "granted": dict(self.granted),
+            "shed": dict(self.shed),
+            "quota_errors": self.quota_errors
+        }
+
+
+# Singleton instance
+deezer_scheduler = DeezerScheduler(
+    limit=int(os.getenv("DEEZER_RATE_LIMIT", "50")),
+    window=float(os.getenv("DEEZER_RATE_WINDOW", "5.0")),
+    burst=int(os.getenv("DEEZER_RATE_BURST", "5"))
+)
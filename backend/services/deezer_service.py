@@ -1,60 +1,232 @@
-import requests
-from typing import Dict, List
+import os
+import time
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from services.ttl_cache import TTLCache, STALE
+from services.metrics_service import DEEZER_STRATEGY_SECONDS, OUTBOUND_REQUESTS, OUTBOUND_SECONDS
+from services.track_catalog_service import TrackCatalogService, track_catalog
+from services.deezer_scheduler import DeezerRateLimited, DeezerScheduler, Priority, deezer_scheduler
+from services.deezer_auth_service import DeezerAPIError
+from services.logging_service import get_logger
+from services.lazy_import import lazy_module
+from services.ssl_context import shared_ssl_context
+
+log = get_logger(__name__)
+
+# Solo lo usan los métodos síncronos: no se importa hasta la primera llamada
+requests = lazy_module("requests")
+# Se importa al crear el cliente (warm-up o primer request), no con la app
+httpx = lazy_module("httpx")
+
+
+@dataclass(slots=True, frozen=True)
+class DeezerTrack:
+    """
+    Track ya en el formato de la API, construido una sola vez a partir del
+    JSON de Deezer. Se serializa directamente (json_codec.dumps) sin
+    copias intermedias ni validación de pydantic.
+    """
+    id: str
+    title: str
+    artist: str
+    album: str
+    preview_url: Optional[str]
+    deezer_link: str
+    cover_image: Optional[str]
+    duration: int
+    
+    @classmethod
+    def from_deezer(cls, item: Dict) -> "DeezerTrack":
+        album = item["album"]
+        return cls(
+            id=str(item["id"]),
+            title=item["title"],
+            artist=item["artist"]["name"] or "Unknown",
+            album=album["title"],
+            preview_url=item.get("preview"),
+            deezer_link=item["link"],
+            cover_image=album.get("cover_medium"),
+            duration=item["duration"]
+        )
+
 
 class DeezerService:
-    def __init__(self):
-        self.api_base_url = "https://api.deezer.com"
+    def __init__(self, catalog: Optional[TrackCatalogService] = None, scheduler: Optional[DeezerScheduler] = None):
+        # Sobrescribible para apuntar a un emulador local (benchmarks/deezer_emulator.py)
+        self.api_base_url = os.getenv("DEEZER_API_BASE_URL", "https://api.deezer.com").rstrip("/")
+        
+        # Configuración del cliente HTTP asíncrono (pool compartido keep-alive)
+        self.timeout = float(os.getenv("DEEZER_TIMEOUT", "5.0"))
+        self.max_connections = int(os.getenv("DEEZER_MAX_CONNECTIONS", "20"))
+        self.max_keepalive = int(os.getenv("DEEZER_MAX_KEEPALIVE", "10"))
+        
+        # Modo de búsqueda: "sequential" (una estrategia tras otra) o "parallel" (fan-out)
+        self.search_mode = os.getenv("DEEZER_SEARCH_MODE", "sequential").lower()
+        self.strategy_timeout = float(os.getenv("DEEZER_STRATEGY_TIMEOUT", "2.5"))
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Caché de resultados de /search keyed por (query normalizada, limit)
+        self.search_cache = TTLCache(
+            maxsize=int(os.getenv("DEEZER_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("DEEZER_CACHE_TTL", "3600")),
+            stale_ttl=float(os.getenv("DEEZER_CACHE_STALE_TTL", "86400"))
+        )
+        self._refreshing: Dict[Tuple[str, int], asyncio.Task] = {}
+        
+        # Catálogo local de tracks: ingiere cada búsqueda y puede responder sin Deezer
+        self.catalog = catalog
+        self._topping_up: Dict[str, asyncio.Task] = {}
+        
+        # Token bucket compartido con DeezerAuthService (cuota de la app en Deezer)
+        self.scheduler = scheduler or deezer_scheduler
+    
+    def start(self):
+        """Crea el cliente HTTP compartido. Se llama desde el lifespan de la app."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 3.0)),
+                verify=shared_ssl_context()
+            )
+    
+    async def aclose(self):
+        """Cierra el cliente HTTP compartido (lifespan shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # Fallback para scripts/tests que no pasan por el lifespan de FastAPI
+        if self._client is None:
+            self.start()
+        return self._client
+    
+    def _build_strategies(self, genres: List[str], energy: str) -> List[str]:
+        search_strategies = []
+        
+        # Strategy 1: Just use genres (most reliable)
+        if genres:
+            search_strategies.append(" ".join(genres[:2]))
+        
+        # Strategy 2: Single genre
+        if genres and len(genres) > 0:
+            search_strategies.append(genres[0])
+        
+        # Strategy 3: Energy-based search
+        energy_genres = {
+            "low": "chill ambient",
+            "medium": "pop rock",
+            "high": "dance electronic"
+        }
+        search_strategies.append(energy_genres.get(energy.lower(), "pop"))
+        return search_strategies
+    
+    def _parse_tracks(
+        self,
+        items: List[Dict],
+        seen_ids: Optional[set] = None,
+        artist_counts: Optional[Counter] = None
+    ) -> List[DeezerTrack]:
+        """
+        Convierte tracks de Deezer a DeezerTrack: sin duplicados, máximo
+        2 tracks por artista, ordenados por rank. seen_ids/artist_counts
+        permiten mantener ese estado entre varias llamadas (streaming).
+        
+        Se ordena antes de aplicar el límite por artista: se quedan sus 2
+        tracks con más rank, no los 2 primeros que llegaron (a igual rank,
+        el orden de entrada, es decir, la estrategia más específica).
+        """
+        kept = []
+        seen_ids = set() if seen_ids is None else seen_ids
+        artist_counts = Counter() if artist_counts is None else artist_counts
+        # Se ordena sobre el JSON crudo para no arrastrar rank en DeezerTrack
+        for track in sorted(items, key=lambda x: x.get("rank", 0), reverse=True):
+            if track["id"] in seen_ids:
+                continue
+            artist_name = track["artist"]["name"]
+            if artist_counts[artist_name] >= 2:
+                continue
+            artist_counts[artist_name] += 1
+            kept.append(track)
+            seen_ids.add(track["id"])
+        return [DeezerTrack.from_deezer(track) for track in kept]
+    
+    @staticmethod
+    def _cache_key(search_query: str, limit: int) -> Tuple[str, int]:
+        return " ".join(search_query.lower().split()), limit
+    
+    def _ingest(self, search_query: str, items: List[Dict], genres: Optional[List[str]], energy: str):
+        """
+        Guarda en el catálogo los tracks de una búsqueda a Deezer, etiquetados
+        con los géneros de la estrategia que se lanzó y la energía del análisis.
+        
+        Solo la estrategia por géneros (o la de un género) marca la cobertura
+        de su combinación; la de energía ("chill ambient") se etiqueta con sus
+        propias palabras y no cubre los géneros del análisis.
+        """
+        if self.catalog is None or not items or genres is None:
+            return
+        query, _ = self._cache_key(search_query, 0)
+        for strategy_genres in (genres[:2], genres[:1]):
+            if strategy_genres and query == self._cache_key(" ".join(strategy_genres), 0)[0]:
+                coverage_key = self.catalog.coverage_key(strategy_genres, energy)
+                self.catalog.ingest(items, strategy_genres, energy, coverage_key)
+                return
+        self.catalog.ingest(items, query.split(), energy)
+    
+    def _check_response(self, response) -> List[Dict]:
+        """
+        Extrae los tracks de una respuesta de /search (requests o httpx).
+        
+        Los errores de cuota (HTTP 429 o código 4 con HTTP 200) pausan el
+        scheduler y se propagan en vez de parecer "sin resultados". El 429 se
+        mira antes de parsear: un proxy o CDN suele devolverlo sin cuerpo JSON.
+        """
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            self.scheduler.report_quota_exceeded(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise DeezerAPIError("HTTP 429", status=429)
+        response.raise_for_status()
+        try:
+            body = response.json()
+        except ValueError:
+            raise DeezerAPIError("Invalid JSON from Deezer", status=response.status_code)
+        if not isinstance(body, dict):
+            raise DeezerAPIError(f"Unexpected response: {body!r}"[:200], status=response.status_code)
+        if "error" in body:
+            error = body["error"] if isinstance(body["error"], dict) else {"message": str(body["error"])}
+            if error.get("code") == 4:
+                self.scheduler.report_quota_exceeded()
+            raise DeezerAPIError(error.get("message", "Deezer error"), code=error.get("code"))
+        return body.get("data", [])
     
     def search_tracks(self, mood_tags: List[str], genres: List[str], energy: str = "medium", limit: int = 25) -> Dict:
         try:
             # Try different search strategies
-            search_strategies = []
-            
-            # Strategy 1: Just use genres (most reliable)
-            if genres:
-                search_strategies.append(" ".join(genres[:2]))
-            
-            # Strategy 2: Single genre
-            if genres and len(genres) > 0:
-                search_strategies.append(genres[0])
-            
-            # Strategy 3: Energy-based search
-            energy_genres = {
-                "low": "chill ambient",
-                "medium": "pop rock",
-                "high": "dance electronic"
-            }
-            search_strategies.append(energy_genres.get(energy.lower(), "pop"))
+            search_strategies = self._build_strategies(genres, energy)
             
             # Try each strategy until we get results
-            for search_query in search_strategies:
-                params = {"q": search_query, "limit": limit, "strict": "off"}
-                response = requests.get(f"{self.api_base_url}/search", params=params)
-                response.raise_for_status()
-                data = response.json()
+            for position, search_query in enumerate(search_strategies, 1):
+                cache_key = self._cache_key(search_query, limit)
+                items = self.search_cache.get(cache_key)
+                if items is None:
+                    self.scheduler.acquire_sync(Priority.INTERACTIVE if position == 1 else Priority.FALLBACK)
+                    params = {"q": search_query, "limit": limit, "strict": "off"}
+                    response = requests.get(f"{self.api_base_url}/search", params=params, timeout=self.timeout)
+                    items = self._check_response(response)
+                    self.search_cache.set(cache_key, items)
+                    self._ingest(search_query, items, genres, energy)
                 
-                if len(data.get("data", [])) > 0:
+                if len(items) > 0:
                     # Found results, process them
-                    tracks = []
-                    for track in data.get("data", []):
-                        artist_name = track["artist"]["name"]
-                        artist_count = sum(1 for t in tracks if artist_name in t["artists"])
-                        if artist_count >= 2:
-                            continue
-                        
-                        tracks.append({
-                            "id": track["id"],
-                            "name": track["title"],
-                            "artists": [artist_name],
-                            "album": track["album"]["title"],
-                            "preview_url": track.get("preview"),
-                            "external_url": track["link"],
-                            "image_url": track["album"].get("cover_medium"),
-                            "duration_ms": track["duration"] * 1000,
-                            "rank": track.get("rank", 0)
-                        })
-                    
-                    tracks.sort(key=lambda x: x["rank"], reverse=True)
+                    tracks = self._parse_tracks(items)
                     return {"success": True, "tracks": tracks, "total": len(tracks), "query_used": search_query}
             
             # No results with any strategy
@@ -62,6 +234,330 @@ class DeezerService:
         except Exception as e:
             return {"success": False, "error": str(e), "tracks": []}
     
+    async def _request_search(
+        self,
+        search_query: str,
+        limit: int,
+        genres: Optional[List[str]] = None,
+        energy: str = "",
+        priority: Priority = Priority.INTERACTIVE
+    ) -> List[Dict]:
+        # Puede esperar o lanzar DeezerRateLimited (shed) antes de gastar cuota
+        await self.scheduler.acquire(priority)
+        
+        params = {"q": search_query, "limit": limit, "strict": "off"}
+        start = time.perf_counter()
+        try:
+            response = await self.client.get("/search", params=params)
+            items = self._check_response(response)
+        except Exception:
+            OUTBOUND_REQUESTS.labels(service="deezer", outcome="error").inc()
+            raise
+        finally:
+            OUTBOUND_SECONDS.labels(service="deezer").observe(time.perf_counter() - start)
+        OUTBOUND_REQUESTS.labels(service="deezer", outcome="ok").inc()
+        self.search_cache.set(self._cache_key(search_query, limit), items)
+        self._ingest(search_query, items, genres, energy)
+        return items
+    
+    async def _refresh(self, search_query: str, limit: int, genres: Optional[List[str]] = None, energy: str = ""):
+        """Revalida en background una entrada stale del caché"""
+        cache_key = self._cache_key(search_query, limit)
+        try:
+            await self._request_search(search_query, limit, genres, energy, Priority.BACKGROUND)
+        except DeezerRateLimited:
+            # Sin cuota libre: se sigue sirviendo la entrada stale
+            pass
+        except Exception as e:
+            log.warning("⚠️ Background refresh failed", query=search_query, error=str(e))
+        finally:
+            self._refreshing.pop(cache_key, None)
+    
+    async def _fetch_strategy(
+        self,
+        search_query: str,
+        limit: int,
+        strategy: int = 1,
+        genres: Optional[List[str]] = None,
+        energy: str = ""
+    ) -> List[Dict]:
+        """
+        /search con caché TTL + LRU delante.
+        Las entradas stale se sirven al momento y se refrescan en background.
+        
+        Args:
+            strategy: posición de la estrategia (1 = más específica), para métricas
+                y prioridad en el scheduler (la 1 es INTERACTIVE, el resto FALLBACK)
+            genres, energy: contexto de la búsqueda, para el catálogo local
+        """
+        cache_key = self._cache_key(search_query, limit)
+        items, state = self.search_cache.lookup(cache_key)
+        
+        if state is None:
+            start = time.perf_counter()
+            priority = Priority.INTERACTIVE if strategy == 1 else Priority.FALLBACK
+            items = await self._request_search(search_query, limit, genres, energy, priority)
+            DEEZER_STRATEGY_SECONDS.labels(strategy=strategy).observe(time.perf_counter() - start)
+            return items
+        
+        if state == STALE and cache_key not in self._refreshing:
+            self._refreshing[cache_key] = asyncio.create_task(self._refresh(search_query, limit, genres, energy))
+        
+        return items
+    
+    async def search_tracks_async(self, mood_tags: List[str], genres: List[str], energy: str = "medium", limit: int = 25, mode: Optional[str] = None) -> Dict:
+        """
+        Versión asíncrona de search_tracks sobre el cliente httpx compartido.
+        No bloquea el event loop: un worker puede atender muchos discovers a la vez.
+        
+        Args:
+            mode: "sequential" o "parallel" (por defecto DEEZER_SEARCH_MODE)
+        """
+        if (mode or self.search_mode) == "parallel":
+            return await self.search_tracks_parallel(mood_tags, genres, energy, limit)
+        
+        try:
+            search_strategies = self._build_strategies(genres, energy)
+            
+            for position, search_query in enumerate(search_strategies, 1):
+                try:
+                    items = await self._fetch_strategy(search_query, limit, position, genres, energy)
+                except DeezerRateLimited:
+                    # Sin cuota para más estrategias de respaldo: sin resultados
+                    if position == 1:
+                        raise
+                    break
+                
+                if len(items) > 0:
+                    tracks = self._parse_tracks(items)
+                    return {"success": True, "tracks": tracks, "total": len(tracks), "query_used": search_query}
+            
+            return {"success": True, "tracks": [], "total": 0, "query_used": search_strategies[0] if search_strategies else "pop"}
+        except Exception as e:
+            return {"success": False, "error": str(e), "tracks": []}
+    
+    async def search_tracks_parallel(
+        self,
+        mood_tags: List[str],
+        genres: List[str],
+        energy: str = "medium",
+        limit: int = 25,
+        strategy_timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Lanza todas las estrategias a la vez y mezcla los resultados.
+        
+        Cada estrategia tiene su propio deadline: si una tarda demasiado se
+        descarta y se responde con las demás. Los tracks se deduplican por id,
+        se aplica el límite de 2 tracks por artista y se ordenan por rank.
+        
+        Returns:
+            Mismo formato que search_tracks, más "queries_used" con las
+            estrategias que devolvieron resultados
+        """
+        # Sin duplicados: con un solo género las estrategias 1 y 2 coinciden
+        search_strategies = list(dict.fromkeys(self._build_strategies(genres, energy)))
+        timeout = strategy_timeout if strategy_timeout is not None else self.strategy_timeout
+        
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._fetch_strategy(q, limit, i, genres, energy), timeout) for i, q in enumerate(search_strategies, 1)),
+            return_exceptions=True
+        )
+        
+        # Las estrategias más específicas van primero (ganan los empates de rank)
+        merged = []
+        queries_used = []
+        errors = []
+        for search_query, result in zip(search_strategies, results):
+            if isinstance(result, BaseException):
+                errors.append(f"{search_query}: {type(result).__name__} {result}".strip())
+                continue
+            if result:
+                queries_used.append(search_query)
+                merged.extend(result)
+        
+        if errors and len(errors) == len(search_strategies):
+            return {"success": False, "error": "; ".join(errors), "tracks": []}
+        
+        tracks = self._parse_tracks(merged)[:limit]
+        return {
+            "success": True,
+            "tracks": tracks,
+            "total": len(tracks),
+            "query_used": queries_used[0] if queries_used else (search_strategies[0] if search_strategies else "pop"),
+            "queries_used": queries_used
+        }
+    
+    async def iter_tracks(
+        self,
+        mood_tags: List[str],
+        genres: List[str],
+        energy: str = "medium",
+        limit: int = 25,
+        strategy_timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """
+        Versión por lotes de discover_tracks (para respuestas en streaming).
+        
+        Si el catálogo local cubre los géneros se entrega en un solo lote.
+        Si no, las estrategias se entregan en orden de prioridad, como en
+        search_tracks_async: primero la más específica, y solo si se queda
+        corta se lanzan a la vez las de respaldo. El lote de una estrategia
+        se retiene hasta que las anteriores hayan respondido o agotado su
+        timeout, así los primeros tracks son los mismos que en /api/discover.
+        
+        Dedupe por id y límite por artista se aplican entre estrategias;
+        dentro de cada lote los tracks van ordenados por rank.
+        
+        Errores: como en search_tracks_async, sin cuota para la primera
+        estrategia se propaga DeezerRateLimited y, sin cuota para las de
+        respaldo, se termina con lo que haya. Si fallan todas las estrategias
+        lanzadas se propaga el primer error (el stream emite "error", no un
+        "done" vacío).
+        
+        Yields:
+            (query de la estrategia, lista de tracks nuevos)
+        
+        Raises:
+            DeezerRateLimited, o el error de la primera estrategia si no
+            respondió ninguna
+        """
+        catalog_tracks = self._catalog_tracks(genres, energy, limit)
+        if catalog_tracks:
+            yield " ".join(genres[:2]), catalog_tracks
+            return
+        
+        search_strategies = list(dict.fromkeys(self._build_strategies(genres, energy)))
+        timeout = strategy_timeout if strategy_timeout is not None else self.strategy_timeout
+        
+        def start(position: int) -> asyncio.Task:
+            search_query = search_strategies[position - 1]
+            return asyncio.create_task(asyncio.wait_for(
+                self._fetch_strategy(search_query, limit, position, genres, energy), timeout
+            ))
+        
+        tasks = [start(1)]
+        seen_ids: set = set()
+        artist_counts: Counter = Counter()
+        emitted = 0
+        first_error: Optional[Exception] = None
+        answered = False
+        try:
+            for position, search_query in enumerate(search_strategies, 1):
+                try:
+                    items = await tasks[position - 1]
+                    answered = True
+                except DeezerRateLimited:
+                    # Sin cuota para más estrategias de respaldo: se termina aquí
+                    if position == 1:
+                        raise
+                    break
+                except Exception as e:
+                    log.warning("⚠️ Search strategy failed", query=search_query, error=f"{type(e).__name__} {e}")
+                    first_error = first_error or e
+                    items = []
+                
+                batch = self._parse_tracks(items, seen_ids, artist_counts)[:limit - emitted]
+                if batch:
+                    emitted += len(batch)
+                    yield search_query, batch
+                if emitted >= limit:
+                    break
+                # Corta: se lanzan todas las de respaldo y se entregan en orden
+                if len(tasks) == 1:
+                    tasks.extend(start(i) for i in range(2, len(search_strategies) + 1))
+            if not answered and first_error is not None:
+                raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _catalog_tracks(self, genres: List[str], energy: str, limit: int) -> Optional[List[DeezerTrack]]:
+        """
+        Tracks del catálogo local si tiene al menos min(limit, catalog.min_tracks)
+        para los géneros; si la combinación está desactualizada la refresca en
+        background. None si hay que ir a Deezer.
+        """
+        if self.catalog is None or not genres:
+            return None
+        try:
+            items, needs_refresh = self.catalog.find(genres, energy, limit)
+        except Exception as e:
+            log.warning("⚠️ Track catalog lookup failed", error=str(e))
+            return None
+        
+        if len(items) < min(limit, self.catalog.min_tracks):
+            return None
+        if needs_refresh:
+            self._schedule_top_up(genres, energy, limit)
+        return self._parse_tracks(items)
+    
+    async def discover_tracks(self, mood_tags: List[str], genres: List[str], energy: str = "medium", limit: int = 25) -> Dict:
+        """
+        Tracks para un análisis de mood, desde el catálogo local si lo cubre.
+        
+        Si el catálogo tiene al menos min(limit, catalog.min_tracks) tracks
+        para los géneros, responde sin llamar a Deezer y, si la combinación
+        está desactualizada, la refresca en background. Si no, busca en
+        Deezer (search_tracks_async), que a su vez alimenta el catálogo.
+        
+        Returns:
+            Mismo formato que search_tracks, con "source": "catalog" o "deezer"
+        """
+        tracks = self._catalog_tracks(genres, energy, limit)
+        if tracks:
+            return {
+                "success": True,
+                "tracks": tracks,
+                "total": len(tracks),
+                "query_used": " ".join(genres[:2]),
+                "source": "catalog"
+            }
+        
+        result = await self.search_tracks_async(mood_tags, genres, energy, limit)
+        result["source"] = "deezer"
+        return result
+    
+    async def prefetch(self, genres: List[str], energy: str = "medium", limit: int = 10) -> int:
+        """
+        Precarga el caché de búsquedas (y el catálogo) para un análisis de mood.
+        
+        Sigue el orden de search_tracks_async (para en la primera estrategia
+        con resultados) y pide tokens con prioridad WARMUP: nunca se descarta,
+        pero solo consume cuota que no quiere nadie más.
+        
+        Returns:
+            Requests hechas a Deezer (0 si ya estaba todo en caché)
+        """
+        requests_made = 0
+        for search_query in self._build_strategies(genres, energy):
+            items, state = self.search_cache.lookup(self._cache_key(search_query, limit), count=False)
+            if state is None:
+                items = await self._request_search(search_query, limit, genres, energy, Priority.WARMUP)
+                requests_made += 1
+            if items:
+                break
+        return requests_made
+    
+    def _schedule_top_up(self, genres: List[str], energy: str, limit: int):
+        """Refresca en background (sin pasar por el caché) la estrategia principal"""
+        key = self.catalog.coverage_key(genres[:2], energy)
+        if key in self._topping_up:
+            return
+        search_query = self._build_strategies(genres, energy)[0]
+        
+        async def top_up():
+            try:
+                await self._request_search(search_query, limit, genres, energy, Priority.BACKGROUND)
+            except DeezerRateLimited:
+                pass
+            except Exception as e:
+                log.warning("⚠️ Catalog top-up failed", query=search_query, error=str(e))
+            finally:
+                self._topping_up.pop(key, None)
+        
+        self._topping_up[key] = asyncio.create_task(top_up())
+    
     def _map_mood_to_keywords(self, mood_tags: List[str], energy: str) -> List[str]:
         keywords = []
         mood_map = {
@@ -78,4 +574,4 @@ class DeezerService:
         keywords.extend(energy_map.get(energy.lower(), [])[:1])
         return keywords
 
-deezer_service = DeezerService()
+deezer_service = DeezerService(catalog=track_catalog)
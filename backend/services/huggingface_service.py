@@ -1,11 +1,101 @@
 import os
-from huggingface_hub import InferenceClient
+import time
+from typing import List, Optional
 from dotenv import load_dotenv
 import json
 import re
+from services.metrics_service import OUTBOUND_REQUESTS, OUTBOUND_SECONDS
+from services.logging_service import get_logger
+from services.lazy_import import lazy_module
+from services.ssl_context import shared_ssl_context
+
+log = get_logger(__name__)
+
+# Se importa al crear el cliente (warm-up o primer análisis), no con la app
+httpx = lazy_module("httpx")
 
 load_dotenv()
 
+HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+
+
+class HuggingFaceClient:
+    """
+    Cliente asíncrono de larga vida para la Inference API de Hugging Face.
+    
+    Usa un httpx.AsyncClient compartido (conexiones keep-alive) con timeout
+    explícito, así el event loop sigue atendiendo otras requests mientras
+    hay análisis en curso. Se crea en el lifespan de la app.
+    """
+    
+    def __init__(self):
+        self.base_url = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co")
+        self.timeout = float(os.getenv("HF_TIMEOUT", "20.0"))
+        self.max_connections = int(os.getenv("HF_MAX_CONNECTIONS", "10"))
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                verify=shared_ssl_context()
+            )
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # Fallback para scripts/tests que no pasan por el lifespan de FastAPI
+        if self._client is None:
+            self.start()
+        return self._client
+    
+    async def chat_completion(
+        self,
+        messages: List[dict],
+        token: str,
+        model: str = HF_MODEL,
+        max_tokens: int = 250,
+        temperature: float = 0.5
+    ) -> str:
+        """
+        POST /models/{model}/v1/chat/completions (API compatible con OpenAI)
+        
+        Returns:
+            Contenido del primer choice
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(
+                f"/models/{model}/v1/chat/completions",
+                headers={"Authorization": f"Bearer {token}"},
+                json={
+                    "model": model,
+                    "messages": messages,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature
+                }
+            )
+            response.raise_for_status()
+        except Exception:
+            OUTBOUND_REQUESTS.labels(service="huggingface", outcome="error").inc()
+            raise
+        finally:
+            OUTBOUND_SECONDS.labels(service="huggingface").observe(time.perf_counter() - start)
+        OUTBOUND_REQUESTS.labels(service="huggingface", outcome="ok").inc()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+hf_client = HuggingFaceClient()
+
 async def analyze_with_huggingface(query: str, language: str = "en") -> dict:
     """
     Analiza el mood musical de una query usando Hugging Face.
@@ -24,8 +114,6 @@ async def analyze_with_huggingface(query: str, language: str = "en") -> dict:
         raise ValueError("HUGGINGFACE_TOKEN not found")
     
     try:
-        client = InferenceClient(token=token)
-        
         # System message: Prompt mejorado con detección de idioma y priorización de hits actuales
         system_msg = """You are an expert music mood analyzer. 
 
@@ -56,7 +144,7 @@ Input: "studying late at night"
 
 Input: "working out at gym"
 {"mood_tags": ["motivated", "intense"], "energy": "high", "genres": ["hip-hop", "electronic"], "search_query": "workout gym 2026 top"}"""
-
+        
         # User message con instrucciones claras sobre idioma
         user_msg = f"""Analyze: "{query}"
 
@@ -66,24 +154,22 @@ IMPORTANT:
 - Always include "2026" or "top" in search_query
 
 Return ONLY JSON, nothing else."""
-
+        
         messages = [
             {"role": "system", "content": system_msg},
             {"role": "user", "content": user_msg}
         ]
         
         # Chat completion con max_tokens aumentado para respuestas más completas
-        response = client.chat_completion(
+        content = await hf_client.chat_completion(
             messages=messages,
-            model="mistralai/Mistral-7B-Instruct-v0.2",
+            token=token,
+            model=HF_MODEL,
             max_tokens=250,  # Aumentado de 200 a 250 para respuestas completas
             temperature=0.5
         )
         
-        # Extract the response content
-        content = response.choices[0].message.content
-        
-        print(f"📝 Hugging Face raw response: {content[:300]}...")
+        log.debug("📝 Hugging Face raw response", content=content[:300])
         
         # Clean response: Remove markdown code blocks
         cleaned = content.strip()
@@ -121,13 +207,13 @@ Return ONLY JSON, nothing else."""
                 else:
                     result["search_query"] = f"{search_q} 2026".strip()
             
-            print(f"✅ Parsed successfully: {result}")
+            log.debug("✅ Parsed successfully", result=result)
             return result
         else:
             missing = [f for f in required_fields if f not in result]
-            print(f"❌ Missing required fields: {missing}")
+            log.warning("❌ Missing required fields", missing=missing)
             return None
-            
+    
     except Exception as e:
-        print(f"❌ Error in Hugging Face analysis: {e}")
+        log.error("❌ Error in Hugging Face analysis", error=str(e))
         return None
@@ -0,0 +1,52 @@
+"""
+JSON Codec
+Serialización rápida para las respuestas de la API.
+
+Usa orjson si está instalado (serializa dataclasses con __slots__ de forma
+nativa, sin pasar por dicts intermedios) y, si no, cae a json de la
+librería estándar con la misma salida. FastJSONResponse permite devolver
+el resultado sin que FastAPI lo vuelva a validar contra el response_model.
+"""
+
+import dataclasses
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def _default(obj: Any):
+    if dataclasses.is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _dumps_stdlib(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa a bytes UTF-8 compactos (dicts, listas y dataclasses)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _dumps_stdlib(obj)
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON serializada con dumps().
+    
+    Acepta también bytes ya serializados (p.ej. desde un caché de
+    respuestas), que se envían tal cual.
+    """
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,82 @@
+"""
+Lazy Import
+Importa un módulo pesado en el primer acceso a un atributo, no al importar
+el servicio que lo usa. Reduce el arranque en frío (Render free tier) para
+dependencias que solo usan caminos poco frecuentes, como `requests` en las
+versiones síncronas de DeezerService y DeezerAuthService.
+
+    requests = lazy_module("requests")
+    requests.get(...)   # aquí se importa de verdad
+
+lazy_instance hace lo mismo con un singleton cuyo constructor no hace
+falta en el arranque (p. ej. DeezerAuthService).
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Callable, Optional
+
+
+class LazyModule:
+    """Proxy de un módulo que se importa en el primer getattr"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+    
+    def load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+    
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+class LazyInstance:
+    """Proxy de un objeto que se construye en el primer acceso a un atributo"""
+    
+    def __init__(self, factory: Callable[[], object]):
+        # object.__setattr__: el __setattr__ de abajo reenvía al objeto real
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+    
+    @property
+    def loaded(self) -> bool:
+        return self._lazy_instance is not None
+    
+    def load(self):
+        if self._lazy_instance is None:
+            with self._lazy_lock:
+                if self._lazy_instance is None:
+                    object.__setattr__(self, "_lazy_instance", self._lazy_factory())
+        return self._lazy_instance
+    
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+    
+    def __setattr__(self, attr: str, value):
+        setattr(self.load(), attr, value)
+    
+    def __repr__(self) -> str:
+        return f"<lazy {getattr(self._lazy_factory, '__name__', 'instance')} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_instance(factory: Callable[[], object]) -> LazyInstance:
+    return LazyInstance(factory)
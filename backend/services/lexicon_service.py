@@ -0,0 +1,403 @@
+"""
+Lexicon Mood Analyzer
+Analizador de mood local (sin red) basado en un léxico EN/ES.
+
+Recorre la query una sola vez con un autómata Aho-Corasick compilado sobre
+todos los términos del léxico, puntúa cada categoría de mood y devuelve el
+mismo formato que Hugging Face (mood_tags, energy, genres, search_query)
+junto con un score de confianza. Las queries con confianza alta no
+necesitan el LLM; las ambiguas siguen yendo a Hugging Face.
+
+Las categorías parten de la tabla de DeezerService._map_mood_to_keywords y
+de los ejemplos del prompt de huggingface_service.
+"""
+
+import datetime
+import os
+import re
+import unicodedata
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin acentos ("Después" → "despues")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class AhoCorasick:
+    """Autómata Aho-Corasick: encuentra todos los patrones en una pasada O(n + matches)"""
+    
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, object]]] = [[]]
+        self._built = False
+    
+    def add(self, pattern: str, payload: object):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append((len(pattern), payload))
+        self._built = False
+    
+    def build(self):
+        """Calcula los enlaces de fallo (BFS)"""
+        pending = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            pending.append(nxt)
+        
+        while pending:
+            node = pending.popleft()
+            for char, nxt in self._goto[node].items():
+                pending.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yields (start, end, payload) de cada patrón encontrado en text"""
+        if not self._built:
+            self.build()
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, payload in self._output[node]:
+                yield i - length + 1, i + 1, payload
+
+
+# ============================================
+# LÉXICO EN/ES
+# ============================================
+# Cada categoría: términos por idioma, tags y géneros por idioma, energía
+# y la base de la search_query. Los términos se comparan sin acentos y
+# respetando límites de palabra.
+
+MOOD_LEXICON: Dict[str, dict] = {
+    "focused": {
+        "energy": "low",
+        "terms": {
+            "en": ["study", "studying", "focus", "focused", "concentrate", "concentration", "exam", "homework",
+                   "reading", "coding", "programming", "work from home", "deep work", "productive"],
+            "es": ["estudiar", "estudiando", "estudio", "concentrado", "concentrada", "concentracion", "examen",
+                   "deberes", "tarea", "leyendo", "lectura", "programando", "trabajando", "productivo",
+                   "enfocado"],
+        },
+        "mood_tags": {"en": ["focused", "calm"], "es": ["concentrado", "tranquilo"]},
+        "genres": {"en": ["lo-fi", "ambient"], "es": ["lo-fi", "ambiental"]},
+        "search_query": {"en": "lofi study", "es": "lofi estudio"},
+    },
+    "sad": {
+        "energy": "low",
+        "terms": {
+            "en": ["sad", "sadness", "crying", "cry", "breakup", "break up", "heartbroken", "heartbreak", "lonely",
+                   "depressed", "down", "blue", "miss you", "missing someone", "grief"],
+            "es": ["triste", "tristeza", "llorando", "llorar", "ruptura", "desamor", "corazon roto", "sola",
+                   "deprimido", "deprimida", "bajon", "extrano", "melancolico", "melancolica", "duelo"],
+        },
+        "mood_tags": {"en": ["sad", "melancholic"], "es": ["triste", "melancólico"]},
+        "genres": {"en": ["ballad", "indie"], "es": ["balada", "indie"]},
+        "search_query": {"en": "sad songs", "es": "balada triste"},
+    },
+    "happy": {
+        "energy": "medium",
+        "terms": {
+            "en": ["happy", "joy", "joyful", "cheerful", "good mood", "sunny", "smile", "celebrate", "great day"],
+            "es": ["feliz", "alegre", "alegria", "contento", "contenta", "buen humor", "sonriendo", "celebrar",
+                   "buen dia"],
+        },
+        "mood_tags": {"en": ["happy", "upbeat"], "es": ["feliz", "alegre"]},
+        "genres": {"en": ["pop", "indie pop"], "es": ["pop", "pop latino"]},
+        "search_query": {"en": "happy pop hits", "es": "pop alegre hits"},
+    },
+    "party": {
+        "energy": "high",
+        "terms": {
+            "en": ["party", "partying", "dance", "dancing", "club", "clubbing", "night out", "pregame", "beach party",
+                   "celebration"],
+            "es": ["fiesta", "bailar", "bailando", "discoteca", "perreo", "salir de fiesta", "playa", "botellon",
+                   "celebracion", "juerga"],
+        },
+        "mood_tags": {"en": ["party", "energetic"], "es": ["fiesta", "energético"]},
+        "genres": {"en": ["dance", "reggaeton"], "es": ["reggaeton", "dance"]},
+        "search_query": {"en": "party hits top", "es": "fiesta hits top"},
+    },
+    "workout": {
+        "energy": "high",
+        "terms": {
+            "en": ["workout", "working out", "gym", "running", "run", "training", "lifting", "cardio", "exercise",
+                   "crossfit", "motivation", "motivated", "pump up"],
+            "es": ["gimnasio", "gym", "entrenando", "entrenar", "entrenamiento", "correr", "corriendo", "ejercicio",
+                   "pesas", "cardio", "motivacion", "motivado", "motivada"],
+        },
+        "mood_tags": {"en": ["motivated", "intense"], "es": ["motivado", "intenso"]},
+        "genres": {"en": ["hip-hop", "electronic"], "es": ["hip-hop", "electrónica"]},
+        "search_query": {"en": "workout gym top", "es": "gym motivacion top"},
+    },
+    "calm": {
+        "energy": "low",
+        "terms": {
+            "en": ["relax", "relaxing", "relaxed", "chill", "calm", "peaceful", "unwind", "rain", "rainy", "cozy",
+                   "lazy sunday", "meditate", "meditation", "yoga", "spa"],
+            "es": ["relajarme", "relajandome", "relajando", "relajado", "relajada", "relax", "tranquilo",
+                   "tranquila", "calma", "lluvia", "lluvioso", "lloviendo", "acogedor", "descansar", "meditar",
+                   "meditacion", "yoga", "domingo"],
+        },
+        "mood_tags": {"en": ["calm", "relaxed"], "es": ["tranquilo", "relajado"]},
+        "genres": {"en": ["chill", "acoustic"], "es": ["chill", "acústico"]},
+        "search_query": {"en": "chill relax", "es": "chill relax"},
+    },
+    "sleep": {
+        "energy": "low",
+        "terms": {
+            "en": ["sleep", "sleeping", "fall asleep", "bedtime", "insomnia", "can't sleep", "lullaby"],
+            "es": ["dormir", "durmiendo", "insomnio", "no puedo dormir", "antes de dormir", "nana"],
+        },
+        "mood_tags": {"en": ["sleepy", "peaceful"], "es": ["somnoliento", "sereno"]},
+        "genres": {"en": ["ambient", "piano"], "es": ["ambiental", "piano"]},
+        "search_query": {"en": "sleep piano ambient", "es": "piano para dormir"},
+    },
+    "romantic": {
+        "energy": "low",
+        "terms": {
+            "en": ["romantic", "romance", "love", "in love", "date", "date night", "dinner", "anniversary",
+                   "candlelight", "crush"],
+            "es": ["romantico", "romantica", "romance", "amor", "enamorado", "enamorada", "cita", "cena",
+                   "aniversario", "velas"],
+        },
+        "mood_tags": {"en": ["romantic", "warm"], "es": ["romántico", "cálido"]},
+        "genres": {"en": ["r&b", "soul"], "es": ["r&b", "bolero"]},
+        "search_query": {"en": "romantic love songs", "es": "canciones romanticas"},
+    },
+    "angry": {
+        "energy": "high",
+        "terms": {
+            "en": ["angry", "anger", "furious", "rage", "mad", "frustrated", "pissed off"],
+            "es": ["enfadado", "enfadada", "enojado", "enojada", "rabia", "furioso", "furiosa", "frustrado",
+                   "frustrada", "cabreado"],
+        },
+        "mood_tags": {"en": ["angry", "intense"], "es": ["enfadado", "intenso"]},
+        "genres": {"en": ["rock", "metal"], "es": ["rock", "metal"]},
+        "search_query": {"en": "angry rock", "es": "rock rabia"},
+    },
+    "nostalgic": {
+        "energy": "low",
+        "terms": {
+            "en": ["nostalgic", "nostalgia", "memories", "old times", "throwback", "childhood", "remember"],
+            "es": ["nostalgico", "nostalgica", "nostalgia", "recuerdos", "infancia", "viejos tiempos", "recordar"],
+        },
+        "mood_tags": {"en": ["nostalgic", "sentimental"], "es": ["nostálgico", "sentimental"]},
+        "genres": {"en": ["indie", "soft rock"], "es": ["indie", "pop rock"]},
+        "search_query": {"en": "nostalgic throwback", "es": "nostalgia clasicos"},
+    },
+    "road_trip": {
+        "energy": "medium",
+        "terms": {
+            "en": ["driving", "drive", "road trip", "roadtrip", "highway", "car ride"],
+            "es": ["conduciendo", "conducir", "manejando", "viaje en coche", "carretera", "roadtrip"],
+        },
+        "mood_tags": {"en": ["free", "adventurous"], "es": ["libre", "aventurero"]},
+        "genres": {"en": ["rock", "indie"], "es": ["rock", "indie"]},
+        "search_query": {"en": "road trip hits", "es": "viaje carretera hits"},
+    },
+}
+
+# Términos que modulan la energía sin definir una categoría
+ENERGY_MODIFIERS: Dict[str, Dict[str, List[str]]] = {
+    "high": {
+        "en": ["energetic", "energy", "hype", "excited", "intense", "powerful", "upbeat", "fast", "loud"],
+        "es": ["energia", "energetico", "energetica", "emocionado", "emocionada", "intenso", "intensa",
+               "potente", "rapido", "animado", "a tope"],
+    },
+    "low": {
+        "en": ["tired", "sleepy", "slow", "soft", "quiet", "mellow"],
+        "es": ["cansado", "cansada", "lento", "suave", "tranquilito", "sin prisa"],
+    },
+}
+
+# Géneros que el usuario puede pedir explícitamente ("heavy metal workout").
+# Si la query pide uno que la categoría no da, el léxico no debe responder
+GENRE_TERMS: List[str] = [
+    "rock", "metal", "heavy metal", "punk", "grunge", "jazz", "blues", "soul", "funk", "disco", "r&b",
+    "hip hop", "hip-hop", "rap", "trap", "reggaeton", "salsa", "bachata", "cumbia", "flamenco", "bolero",
+    "balada", "pop", "k-pop", "kpop", "indie", "folk", "country", "techno", "house", "edm", "electronic",
+    "electronica", "dance", "lofi", "lo-fi", "ambient", "ambiental", "classical", "clasica", "piano",
+    "acoustic", "acustico", "opera",
+]
+
+# Marcadores de idioma que no son términos de mood
+LANGUAGE_HINTS: Dict[str, List[str]] = {
+    "en": ["the", "with", "after", "before", "at", "for", "my", "and", "need", "feeling", "want", "some"],
+    "es": ["el", "la", "los", "las", "con", "despues", "antes", "para", "mi", "y", "necesito", "quiero",
+           "algo", "estoy", "una", "un", "de", "en"],
+}
+
+
+# Peso de las palabras sin match en la confianza: con la mitad de las
+# palabras de contenido sin reconocer, la confianza baja un 15%
+UNMATCHED_PENALTY = 0.3
+# Factor para las queries que piden un género que la categoría no da
+GENRE_CONFLICT_FACTOR = 0.5
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _genre_key(genre: str) -> str:
+    """Clave comparable de un género ("Hip-Hop" → "hiphop", "electrónica" → "electronica")"""
+    return "".join(c for c in fold(genre) if c.isalnum())
+
+
+class LexiconMoodAnalyzer:
+    """Analizador de mood sin red: Aho-Corasick sobre el léxico EN/ES"""
+    
+    def __init__(self, lexicon: Dict[str, dict] = None):
+        self.lexicon = lexicon or MOOD_LEXICON
+        self.matcher = AhoCorasick()
+        
+        # Un término por (texto, categoría): "gym" está en EN y ES pero no
+        # puede contar dos veces. Si es de los dos idiomas no vota idioma.
+        langs: Dict[Tuple[str, str, str], set] = defaultdict(set)
+        for category, entry in self.lexicon.items():
+            for lang, terms in entry["terms"].items():
+                for term in terms:
+                    langs[(fold(term), "mood", category)].add(lang)
+        for energy, by_lang in ENERGY_MODIFIERS.items():
+            for lang, terms in by_lang.items():
+                for term in terms:
+                    langs[(fold(term), "energy", energy)].add(lang)
+        for (term, kind, value), term_langs in langs.items():
+            lang = next(iter(term_langs)) if len(term_langs) == 1 else None
+            self.matcher.add(term, (kind, value, lang))
+        for genre in GENRE_TERMS:
+            self.matcher.add(fold(genre), ("genre", _genre_key(genre), None))
+        for lang, terms in LANGUAGE_HINTS.items():
+            for term in terms:
+                self.matcher.add(term, ("lang", None, lang))
+        
+        self.matcher.build()
+    
+    @staticmethod
+    def _is_word(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not before.isalnum() and not after.isalnum()
+    
+    def analyze(self, query: str, language: str = "en") -> Tuple[Optional[dict], float]:
+        """
+        Analiza la query con el léxico.
+
+        Args:
+            query: Texto del usuario
+            language: Idioma preferido (desempata si la query no tiene marcadores claros)
+
+        Returns:
+            (resultado con mood_tags/energy/genres/search_query, confianza 0-1).
+            Resultado None si no hay ningún término de mood.
+        """
+        text = fold(query)
+        
+        mood_scores: Dict[str, float] = defaultdict(float)
+        energy_votes: Dict[str, int] = defaultdict(int)
+        lang_votes: Dict[str, float] = defaultdict(float)
+        requested_genres = set()
+        covered = [False] * len(text)
+        known = [False] * len(text)
+        
+        for start, end, (kind, value, lang) in self.matcher.iter_matches(text):
+            if not self._is_word(text, start, end):
+                continue
+            for i in range(start, end):
+                known[i] = True
+            if kind == "lang":
+                lang_votes[lang] += 0.5
+                continue
+            if kind == "genre":
+                requested_genres.add(value)
+                continue
+            
+            # Términos multi-palabra pesan más (son menos ambiguos)
+            weight = 1.0 + 0.5 * text.count(" ", start, end)
+            lang_votes[lang] += weight
+            for i in range(start, end):
+                covered[i] = True
+            
+            if kind == "mood":
+                mood_scores[value] += weight
+            else:
+                energy_votes[value] += 1
+        
+        if not mood_scores:
+            return None, 0.0
+        
+        ranked = sorted(mood_scores.items(), key=lambda item: item[1], reverse=True)
+        top_category, top_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        
+        detected_lang = language if language in ("en", "es") else "en"
+        if lang_votes.get("es", 0) != lang_votes.get("en", 0):
+            detected_lang = "es" if lang_votes.get("es", 0) > lang_votes.get("en", 0) else "en"
+        
+        entry = self.lexicon[top_category]
+        energy = entry["energy"]
+        if energy_votes:
+            energy = max(energy_votes.items(), key=lambda item: item[1])[0]
+        
+        # Confianza: dominancia de la categoría ganadora × evidencia acumulada
+        dominance = top_score / (top_score + second_score)
+        evidence = min(1.0, top_score / 2.0)
+        letters = sum(1 for c in text if c.isalnum())
+        coverage = sum(1 for i, c in enumerate(text) if covered[i] and c.isalnum()) / max(letters, 1)
+        confidence = dominance * (0.6 + 0.25 * evidence + 0.15 * min(1.0, coverage * 3))
+        
+        # Palabras de contenido que el léxico no reconoce ("late", "work",
+        # "session"): cuantas más, menos sabemos de la query
+        matched_words = unmatched_words = 0
+        for word in _WORD.finditer(text):
+            if len(word.group()) < 2:
+                continue
+            if covered[word.start()]:
+                matched_words += 1
+            elif not known[word.start()]:
+                unmatched_words += 1
+        if unmatched_words:
+            confidence *= 1 - UNMATCHED_PENALTY * unmatched_words / (matched_words + unmatched_words)
+        
+        mood_tags = list(entry["mood_tags"][detected_lang])
+        genres = list(entry["genres"][detected_lang])
+        if len(ranked) > 1 and second_score >= top_score / 2:
+            second = self.lexicon[ranked[1][0]]
+            mood_tags.append(second["mood_tags"][detected_lang][0])
+            genres.append(second["genres"][detected_lang][0])
+        
+        # Si pide un género, alguno tiene que coincidir con los de la categoría
+        if requested_genres and not requested_genres & {_genre_key(genre) for genre in genres}:
+            confidence *= GENRE_CONFLICT_FACTOR
+        
+        result = {
+            "mood_tags": mood_tags,
+            "energy": energy,
+            "genres": list(dict.fromkeys(genres)),
+            "search_query": f"{entry['search_query'][detected_lang]} {datetime.date.today().year}"
+        }
+        return result, round(confidence, 3)
+
+
+# Umbral a partir del cual no se llama al LLM
+LEXICON_CONFIDENCE_THRESHOLD = float(os.getenv("LEXICON_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Singleton instance
+lexicon_analyzer = LexiconMoodAnalyzer()
@@ -1,45 +1,140 @@
+import asyncio
+import datetime
+import time
+from difflib import SequenceMatcher
+from typing import Dict, Optional
 from services.huggingface_service import analyze_with_huggingface
 from services.mood_cache_service import mood_cache
+from services.lexicon_service import lexicon_analyzer, LEXICON_CONFIDENCE_THRESHOLD
+from services.metrics_service import DISCOVER_STAGE_SECONDS, MOOD_ANALYSIS_SOURCE
+from services.logging_service import get_logger
 
-async def analyze_mood(query: str, language: str = "en") -> dict:
-    """
-    Analiza el mood del usuario usando:
-    1. Caché inteligente (instantáneo si hay match)
-    2. Hugging Face API (si no hay caché)
-    
-    Auto-guarda resultados nuevos en caché para futuras búsquedas.
-    """
-    print(f"🔄 Analyzing mood for: '{query[:50]}...'")
-    
-    # PASO 1: Intentar caché primero (mucho más rápido)
-    cached_result = mood_cache.get_similar(query, threshold=0.75)
-    if cached_result:
-        print(f"⚡ Using cached result (instant response!)")
-        return cached_result
+log = get_logger(__name__)
+
+_STAGE_CACHE = DISCOVER_STAGE_SECONDS.labels(stage="cache_lookup")
+_STAGE_LEXICON = DISCOVER_STAGE_SECONDS.labels(stage="lexicon")
+_STAGE_HF = DISCOVER_STAGE_SECONDS.labels(stage="hf_call")
+
+# Análisis en curso por cache key: los waiters concurrentes comparten la misma tarea
+_in_flight: Dict[str, asyncio.Task] = {}
+
+def _find_in_flight(cache_key: str, threshold: float) -> Optional[asyncio.Task]:
+    """Busca un análisis en curso para la misma key o una casi idéntica"""
+    task = _in_flight.get(cache_key)
+    if task is not None:
+        return task
     
+    # Pocas entradas en vuelo: comparar con todas es barato
+    for key, task in _in_flight.items():
+        if SequenceMatcher(None, cache_key, key).ratio() >= threshold:
+            return task
+    return None
+
+async def _analyze_and_cache(query: str, language: str) -> dict:
     # PASO 2: Si no hay caché, usar Hugging Face
-    print(f"🤖 No cache found, calling Hugging Face API...")
+    log.debug("🤖 No cache found, calling Hugging Face API")
+    start = time.perf_counter()
     result = await analyze_with_huggingface(query, language)
+    _STAGE_HF.observe(time.perf_counter() - start)
     
     if result:
-        print(f"✅ Hugging Face analysis successful")
+        log.debug("✅ Hugging Face analysis successful")
+        MOOD_ANALYSIS_SOURCE.labels(source="huggingface").inc()
         
         # PASO 3: Guardar en caché para futuras búsquedas similares
         mood_cache.add(query, result)
         
         return result
+    
+    # Si el LLM falla, el léxico (aunque tenga baja confianza) es mejor que el default
+    lexicon_result, confidence = lexicon_analyzer.analyze(query, language)
+    if lexicon_result:
+        log.warning("📖 Hugging Face analysis failed, using lexicon result", confidence=round(confidence, 2))
+        MOOD_ANALYSIS_SOURCE.labels(source="lexicon_fallback").inc()
+        mood_cache.add(query, lexicon_result, fallback=True)
+        return lexicon_result
     else:
-        print(f"❌ Hugging Face analysis failed, using defaults")
+        log.warning("❌ Hugging Face analysis failed, using defaults")
+        MOOD_ANALYSIS_SOURCE.labels(source="default").inc()
         
         # Resultado por defecto
         default_result = {
             "mood_tags": ["neutral"], 
             "energy": "medium", 
             "genres": ["pop"], 
-            "search_query": f"{query} 2026 top"
+            "search_query": f"{query} {datetime.date.today().year} top"
         }
         
-        # Guardar el default también (evita llamadas innecesarias)
-        mood_cache.add(query, default_result)
+        # Guardar el default también (evita llamadas innecesarias), con TTL corto
+        # para reintentar el LLM cuando se recupere
+        mood_cache.add(query, default_result, fallback=True)
         
         return default_result
+
+async def analyze_mood(query: str, language: str = "en") -> dict:
+    """
+    Analiza el mood del usuario usando:
+    1. Caché inteligente (instantáneo si hay match)
+    2. Léxico local EN/ES (microsegundos, si la confianza es alta)
+    3. Hugging Face API (solo para queries ambiguas)
+    
+    Auto-guarda resultados nuevos en caché para futuras búsquedas.
+    Las llamadas concurrentes con la misma query (o casi idéntica) comparten
+    un único análisis en curso: una ráfaga cuesta una llamada al LLM, no N.
+    """
+    log.debug("🔄 Analyzing mood", query=query[:50])
+    
+    threshold = 0.75
+    
+    # PASO 1: Intentar caché primero (mucho más rápido)
+    start = time.perf_counter()
+    cached_result = mood_cache.get_similar(query, threshold=threshold)
+    _STAGE_CACHE.observe(time.perf_counter() - start)
+    if cached_result:
+        MOOD_ANALYSIS_SOURCE.labels(source="cache").inc()
+        log.debug("⚡ Using cached result")
+        return cached_result
+    
+    # PASO 1b: Analizador léxico local, sin red
+    start = time.perf_counter()
+    lexicon_result, confidence = lexicon_analyzer.analyze(query, language)
+    _STAGE_LEXICON.observe(time.perf_counter() - start)
+    if lexicon_result and confidence >= LEXICON_CONFIDENCE_THRESHOLD:
+        MOOD_ANALYSIS_SOURCE.labels(source="lexicon").inc()
+        log.debug("📖 Lexicon analysis, skipping Hugging Face", confidence=round(confidence, 2))
+        mood_cache.add(query, lexicon_result)
+        return lexicon_result
+    
+    # Single-flight: reutilizar un análisis en curso si existe
+    cache_key = mood_cache.make_key(query)
+    task = _find_in_flight(cache_key, threshold)
+    
+    if task is None:
+        task = asyncio.ensure_future(_analyze_and_cache(query, language))
+        _in_flight[cache_key] = task
+        task.add_done_callback(
+            lambda done: _in_flight.pop(cache_key) if _in_flight.get(cache_key) is done else None
+        )
+    else:
+        log.debug("🔗 Joining in-flight analysis")
+        MOOD_ANALYSIS_SOURCE.labels(source="coalesced").inc()
+    
+    # shield: si un waiter se cancela, el análisis sigue para los demás
+    return await asyncio.shield(task)
+
+def analyze_mood_local(query: str, language: str = "en") -> Optional[dict]:
+    """
+    Como analyze_mood pero sin red: mood cache y léxico (si la confianza es
+    alta, y entonces se guarda en caché). None si haría falta Hugging Face.
+    Lo usa el warm-up de arranque para no competir con el tráfico real por el LLM.
+    """
+    cached_result = mood_cache.get_similar(query, threshold=0.75)
+    if cached_result:
+        return cached_result
+    
+    lexicon_result, confidence = lexicon_analyzer.analyze(query, language)
+    if lexicon_result and confidence >= LEXICON_CONFIDENCE_THRESHOLD:
+        MOOD_ANALYSIS_SOURCE.labels(source="lexicon").inc()
+        mood_cache.add(query, lexicon_result)
+        return lexicon_result
+    return None
@@ -0,0 +1,159 @@
+"""
+Logging Service
+Logging asíncrono y por niveles para los servicios (sustituye a print()).
+
+Los servicios solo encolan el LogRecord (QueueHandler sobre una
+SimpleQueue); un hilo QueueListener los formatea y escribe a stdout. Así
+escribir un log no bloquea el event loop aunque stdout vaya lento.
+
+    log = get_logger(__name__)
+    log.info("✅ Playlist created", playlist_id=playlist_id, tracks=10)
+    log.debug("💾 Added to cache", query=query)
+
+- LOG_LEVEL (DEBUG/INFO/WARNING/ERROR) decide qué se registra; por debajo
+  del nivel la llamada apenas cuesta (no se crea el record)
+- Los kwargs son campos estructurados: key=value en texto, o claves del
+  objeto con LOG_FORMAT=json
+- LOG_DEBUG_SAMPLE=N deja pasar 1 de cada N líneas DEBUG por punto de
+  llamada (1 = todas), para las que salen varias veces por request
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import queue
+import sys
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from services.json_codec import dumps
+
+# LOG_LEVEL puede venir del .env: el primer get_logger ocurre al importar los servicios
+load_dotenv()
+
+ROOT_LOGGER = "moodtune"
+
+_setup_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+class DebugSampler(logging.Filter):
+    """Deja pasar 1 de cada `every` records DEBUG por (fichero, línea)"""
+    
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Counter = Counter()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno != logging.DEBUG:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._seen[site]
+        self._seen[site] = count + 1
+        return count % self.every == 0
+
+
+class _Handler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Misma cola en el mismo proceso: no hace falta formatear (ni
+        # serializar) en el hilo que loguea, lo hace el listener
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatea el mensaje más los campos estructurados, en texto o JSON"""
+    
+    def __init__(self, json_output: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+        self.json_output = json_output
+    
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if self.json_output:
+            payload = {
+                "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return dumps(payload).decode()
+        
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" if isinstance(value, str) else f"{key}={value}"
+                                   for key, value in fields.items())
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger que acepta campos estructurados como kwargs"""
+    
+    _RESERVED = ("exc_info", "stack_info", "stacklevel", "extra")
+    
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in self._RESERVED}
+        if fields:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "fields": fields}
+        return msg, kwargs
+
+
+def setup_logging(level: Optional[str] = None, json_output: Optional[bool] = None,
+                  debug_sample: Optional[int] = None):
+    """
+    Configura el logger "moodtune" con el pipeline asíncrono (idempotente).
+    
+    Args:
+        level: Nivel mínimo (por defecto LOG_LEVEL o INFO)
+        json_output: Una línea JSON por record (por defecto LOG_FORMAT=json)
+        debug_sample: 1 de cada N líneas DEBUG por punto de llamada (LOG_DEBUG_SAMPLE)
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        if json_output is None:
+            json_output = os.getenv("LOG_FORMAT", "text").lower() == "json"
+        if debug_sample is None:
+            debug_sample = int(os.getenv("LOG_DEBUG_SAMPLE", "10"))
+        
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(StructuredFormatter(json_output))
+        
+        log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        handler = _Handler(log_queue)
+        handler.addFilter(DebugSampler(debug_sample))
+        
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(getattr(logging, level, logging.INFO))
+        logger.handlers[:] = [handler]
+        logger.propagate = False
+        
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Vacía la cola y para el hilo listener"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger de un módulo, bajo "moodtune" (services.llm_service → moodtune.llm_service)"""
+    setup_logging()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}"), {})
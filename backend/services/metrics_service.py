@@ -0,0 +1,270 @@
+"""
+Metrics Service
+Registro de métricas en proceso (counters, gauges, histogramas) con
+exportación en formato de texto de Prometheus para /metrics.
+
+Pensado para el hot path: observar un valor es un bisect sobre los buckets
+y unas pocas sumas, sin locks ni asignaciones. Los hijos por combinación de
+labels se crean una vez y se reutilizan.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Buckets por defecto (segundos): de 0.1ms a 30s, cubre desde un hit del caché hasta el LLM
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        # Valor calculado en el momento del scrape (p.ej. tamaño de un caché)
+        self.function = function
+    
+    def labels(self, *values: str, **kwargs: str):
+        """Devuelve (y cachea) el hijo para una combinación de labels"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._new_child()
+            self._children[values] = child
+        return child
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+    
+    def render(self) -> List[str]:
+        if self.function is not None:
+            try:
+                self.labels().value = float(self.function())
+            except Exception:
+                pass
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+    
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default().observe(value)
+    
+    def time(self):
+        return self._default().time()
+    
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Colección de métricas con render en formato Prometheus"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                function: Optional[Callable[[], float]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+registry = MetricsRegistry()
+
+# ============================================
+# MÉTRICAS DEL PIPELINE DE DISCOVER
+# ============================================
+
+DISCOVER_STAGE_SECONDS = registry.histogram(
+    "moodtune_discover_stage_seconds",
+    "Latency of each stage of the discover pipeline",
+    ["stage"]
+)
+MOOD_CACHE_LOOKUPS = registry.counter(
+    "moodtune_mood_cache_lookups_total",
+    "Mood cache lookups by result (exact, similar, miss)",
+    ["result"]
+)
+MOOD_CACHE_EVICTIONS = registry.counter(
+    "moodtune_mood_cache_evictions_total",
+    "Mood cache entries dropped by reason (size, expired, rejected by admission)",
+    ["reason"]
+)
+MOOD_ANALYSIS_SOURCE = registry.counter(
+    "moodtune_mood_analysis_total",
+    "Mood analyses by source (cache, lexicon, huggingface, fallback, coalesced)",
+    ["source"]
+)
+DEEZER_STRATEGY_SECONDS = registry.histogram(
+    "moodtune_deezer_strategy_seconds",
+    "Latency of each Deezer search strategy (1 = most specific)",
+    ["strategy"]
+)
+OUTBOUND_REQUESTS = registry.counter(
+    "moodtune_outbound_requests_total",
+    "Outbound HTTP requests by service and outcome",
+    ["service", "outcome"]
+)
+OUTBOUND_SECONDS = registry.histogram(
+    "moodtune_outbound_request_seconds",
+    "Latency of outbound HTTP requests",
+    ["service"]
+)
+DEEZER_SCHEDULER_WAIT_SECONDS = registry.histogram(
+    "moodtune_deezer_scheduler_wait_seconds",
+    "Time outbound Deezer calls waited for a rate-limit token, by priority",
+    ["priority"]
+)
+DEEZER_SCHEDULER_SHED = registry.counter(
+    "moodtune_deezer_scheduler_shed_total",
+    "Outbound Deezer calls shed by the rate-limit scheduler, by priority",
+    ["priority"]
+)
+RATE_LIMITED = registry.counter(
+    "moodtune_rate_limited_total",
+    "Inbound requests rejected with 429 by the per-client rate limiter, by route",
+    ["route"]
+)
@@ -1,32 +1,466 @@
+import atexit
 import json
 import os
-from typing import Optional
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, Optional, Set
 from difflib import SequenceMatcher
+from services.bounded_cache import BoundedCache, NEVER
+from services.metrics_service import MOOD_CACHE_LOOKUPS, MOOD_CACHE_EVICTIONS
+from services.logging_service import get_logger
+from services.query_canonicalizer import query_canonicalizer
+
+log = get_logger(__name__)
+
+_LOOKUP_EXACT = MOOD_CACHE_LOOKUPS.labels(result="exact")
+_LOOKUP_SIMILAR = MOOD_CACHE_LOOKUPS.labels(result="similar")
+_LOOKUP_MISS = MOOD_CACHE_LOOKUPS.labels(result="miss")
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigramas de caracteres con padding (para que queries cortas también indexen)"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas para búsqueda aproximada.
+    
+    En vez de comparar la query contra todo el caché con SequenceMatcher,
+    genera candidatos que comparten trigramas, poda por longitud y por
+    solapamiento, y verifica solo los mejores con SequenceMatcher.
+    
+    El match es aproximado: el solapamiento de trigramas no acota el ratio de
+    SequenceMatcher, así que el mejor match del scan lineal puede quedar fuera
+    de los max_candidates. En el seed set coinciden siempre; en sets densos
+    difieren en <1% de las búsquedas y por muy poca similitud (ver
+    test_similarity_index.py).
+    """
+    
+    def __init__(self, max_candidates: int = 64):
+        self.max_candidates = max_candidates
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._grams: Dict[str, Set[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._seq = 0
+    
+    def __len__(self) -> int:
+        return len(self._grams)
+    
+    def add(self, key: str):
+        if key in self._grams:
+            return
+        grams = _trigrams(key)
+        self._grams[key] = grams
+        self._order[key] = self._seq
+        self._seq += 1
+        for gram in grams:
+            self._postings[gram].add(key)
+    
+    def remove(self, key: str):
+        grams = self._grams.pop(key, None)
+        if grams is None:
+            return
+        self._order.pop(key, None)
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+    
+    def best_match(self, query: str, threshold: float):
+        """
+        Busca la key más similar a `query` con ratio >= threshold (entre los
+        candidatos, ver la docstring de la clase).
+        
+        Returns:
+            (key, similarity) del mejor match, o (None, mejor similitud vista)
+        """
+        query_grams = _trigrams(query)
+        query_len = len(query)
+        
+        # Contar trigramas compartidos por cada candidato (Counter cuenta en C)
+        overlap = Counter(chain.from_iterable(
+            self._postings[gram] for gram in query_grams if gram in self._postings
+        ))
+        
+        # Poda por longitud: ratio <= 2*min(la, lb) / (la + lb)
+        candidates = []
+        for key, shared in overlap.most_common(self.max_candidates * 4):
+            key_len = len(key)
+            if 2.0 * min(query_len, key_len) / (query_len + key_len) < threshold:
+                continue
+            dice = 2.0 * shared / (len(query_grams) + len(self._grams[key]))
+            candidates.append((-dice, self._order[key], key))
+        
+        candidates.sort()
+        
+        matcher = SequenceMatcher(None, query)
+        best_key = None
+        best_similarity = 0.0
+        best_order = None
+        best_seen = 0.0
+        
+        for _, order, key in candidates[:self.max_candidates]:
+            matcher.set_seq2(key)
+            # Cotas superiores baratas antes del cálculo completo
+            floor = max(threshold, best_similarity)
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            similarity = matcher.ratio()
+            best_seen = max(best_seen, similarity)
+            if similarity < threshold:
+                continue
+            # Empates: gana la entrada más antigua (mismo orden que el scan lineal)
+            if (best_key is None or similarity > best_similarity
+                    or (similarity == best_similarity and order < best_order)):
+                best_key = key
+                best_similarity = similarity
+                best_order = order
+        
+        return best_key, best_similarity if best_key is not None else best_seen
+
+
+# Marca de parada para el hilo writer del journal
+_STOP = object()
+
 
 class MoodCacheService:
-    def __init__(self, cache_file: str = "datasets/mood_cache.json"):
+    """
+    Caché de análisis de mood con persistencia en dos ficheros:
+    
+    - Snapshot (cache_file): estado completo, reescrito solo al compactar
+    - Journal (<cache_file>.journal.jsonl): una línea JSON por entrada nueva
+    
+    Si el snapshot aún no existe se parte de import_file (el dataset
+    versionado datasets/mood_cache.json), que nunca se reescribe.
+    
+    add() solo encola la entrada; un hilo writer la añade al journal fuera del
+    request path, con fsync agrupado (debounce) y compactación periódica del
+    journal en un nuevo snapshot. En el primer uso (o en el warm-up del
+    lifespan) se carga el snapshot y se reproduce el journal, ignorando una
+    última línea truncada por un crash; importar el módulo no lee disco.
+    
+    En memoria las entradas viven en un BoundedCache: tope de entradas y de
+    MB, política LRU o W-TinyLFU, y TTL por entrada (más corto para los
+    resultados de fallback, que no vienen del LLM). Las expiraciones se
+    guardan en el journal y, al compactar, en <cache_file>.expiry.json.
+    
+    En memoria la key es la forma canónica de la query, pero en disco cada
+    entrada guarda la query original: las keys se recalculan al cargar, así
+    que cambiar MOOD_CACHE_CANONICALIZE no pierde ni mezcla entradas.
+    """
+    
+    def __init__(
+        self,
+        cache_file: str = "datasets/mood_cache.local.json",
+        import_file: Optional[str] = None,
+        fsync_interval: float = 1.0,
+        compact_every: int = 500,
+        max_entries: int = 10000,
+        max_mb: float = 64.0,
+        policy: str = "lru",
+        ttl: float = 30 * 86400,
+        fallback_ttl: float = 900.0
+    ):
+        """
+        Args:
+            cache_file: Snapshot propio del proceso (se crea al compactar)
+            import_file: Snapshot de solo lectura con el que se parte si
+                cache_file no existe (None = caché vacío)
+            max_entries: Máximo de entradas en memoria (0 = sin tope)
+            max_mb: Máximo de memoria estimada en MB (0 = sin tope)
+            policy: Política de expulsión, "lru" o "tinylfu"
+            ttl: TTL de las entradas normales en segundos (0 = no expiran)
+            fallback_ttl: TTL de los resultados de fallback (léxico o default)
+        """
         self.cache_file = cache_file
-        self.cache = self._load_cache()
+        self.import_file = import_file
+        self.journal_file = f"{os.path.splitext(cache_file)[0]}.journal.jsonl"
+        self.expiry_file = f"{os.path.splitext(cache_file)[0]}.expiry.json"
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.max_entries = max_entries
+        self.max_mb = max_mb
+        self.policy = policy
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        
+        self._journal_entries = 0
+        self._cache: Optional[BoundedCache] = None
+        self._index: Optional[TrigramIndex] = None
+        # key canónica → query original (la que se persiste)
+        self._queries: Dict[str, str] = {}
+        self._load_lock = threading.Lock()
+        
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        atexit.register(self.close)
+    
+    @property
+    def loaded(self) -> bool:
+        return self._cache is not None
     
-    def _load_cache(self) -> dict:
-        """Carga el caché desde el archivo JSON"""
+    @property
+    def cache(self) -> BoundedCache:
+        if self._cache is None:
+            self.load()
+        return self._cache
+    
+    @property
+    def index(self) -> TrigramIndex:
+        if self._cache is None:
+            self.load()
+        return self._index
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def load(self):
+        """Carga snapshot + journal y construye el índice (solo la primera vez)"""
+        with self._load_lock:
+            if self._cache is not None:
+                return
+            entries, expiry = self._load_cache()
+            # El índice va primero: las expulsiones durante la carga lo actualizan
+            self._index = TrigramIndex()
+            cache = BoundedCache(
+                max_entries=self.max_entries,
+                max_bytes=int(self.max_mb * 1024 * 1024),
+                policy=self.policy,
+                ttl=self.ttl,
+                on_evict=self._on_evict
+            )
+            for cached_query, result in entries.items():
+                # En disco está la query original: la key se calcula ahora
+                key = self.make_key(cached_query)
+                self._queries[key] = cached_query
+                self._index.add(key)
+                cache.set(key, result, expires_at=expiry.get(cached_query))
+            cache.purge_expired()
+            self._cache = cache
+    
+    def _on_evict(self, key: str, reason: str):
+        self._index.remove(key)
+        self._queries.pop(key, None)
+        MOOD_CACHE_EVICTIONS.labels(reason=reason).inc()
+    
+    def _load_cache(self):
+        """
+        Carga el snapshot JSON (o import_file si aún no hay snapshot), sus
+        expiraciones y reproduce el journal encima.
+        
+        Returns:
+            (entradas, expiraciones); las entradas sin expiración guardada
+            (snapshots anteriores) reciben el TTL por defecto al cargar
+        """
+        cache = {}
+        expiry = {}
         if os.path.exists(self.cache_file):
             try:
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    cache = json.load(f)
+                if os.path.exists(self.expiry_file):
+                    with open(self.expiry_file, 'r', encoding='utf-8') as f:
+                        expiry = json.load(f)
+            except Exception as e:
+                log.warning("⚠️ Error loading cache", error=str(e))
+                cache = {}
+        elif self.import_file and os.path.exists(self.import_file):
+            try:
+                with open(self.import_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                log.info("📥 Loaded mood cache seed", entries=len(cache), import_file=self.import_file)
             except Exception as e:
-                print(f"⚠️ Error loading cache: {e}")
-                return {}
-        return {}
+                log.warning("⚠️ Error loading cache seed", error=str(e))
+                cache = {}
+        
+        self._replay_journal(cache, expiry)
+        return cache, expiry
+    
+    def _replay_journal(self, cache: dict, expiry: dict):
+        """
+        Aplica las entradas del journal sobre el snapshot.
+        Si la última línea quedó a medias (crash durante el append), se trunca
+        el journal hasta la última entrada válida.
+        """
+        if not os.path.exists(self.journal_file):
+            return
+        
+        valid_offset = 0
+        replayed = 0
+        try:
+            with open(self.journal_file, 'rb') as f:
+                for raw_line in f:
+                    try:
+                        if not raw_line.endswith(b"\n"):
+                            raise ValueError("incomplete line")
+                        record = json.loads(raw_line)
+                        # Al final: si dos queries comparten key, gana la más reciente
+                        cache.pop(record["q"], None)
+                        cache[record["q"]] = record["r"]
+                        if "x" in record:
+                            expiry[record["q"]] = record["x"]
+                        else:
+                            expiry.pop(record["q"], None)
+                    except Exception:
+                        log.warning("⚠️ Corrupt journal entry, truncating", offset=valid_offset)
+                        break
+                    valid_offset += len(raw_line)
+                    replayed += 1
+            
+            if valid_offset < os.path.getsize(self.journal_file):
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(valid_offset)
+        except Exception as e:
+            log.warning("⚠️ Error replaying cache journal", error=str(e))
+        
+        self._journal_entries = replayed
+        if replayed:
+            log.info("📜 Replayed journal entries", entries=replayed)
     
-    def _save_cache(self):
-        """Guarda el caché en el archivo JSON"""
+    def _snapshot(self):
+        """Entradas vivas y expiraciones keyed por la query original"""
+        values, expiry = self.cache.snapshot()
+        queries = self._queries
+        return (
+            {queries.get(key, key): value for key, value in values.items()},
+            {queries.get(key, key): expires_at for key, expires_at in expiry.items()}
+        )
+    
+    def _save_cache(self, snapshot: Optional[dict] = None, expiry: Optional[dict] = None):
+        """Escribe el snapshot y sus expiraciones de forma atómica (tmp + fsync + rename)"""
+        if snapshot is None:
+            snapshot, expiry = self._snapshot()
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Primero las expiraciones: si el proceso muere entre los dos
+            # renames, las keys sobrantes se ignoran al cargar
+            for path, data, indent in ((self.expiry_file, expiry or {}, None), (self.cache_file, snapshot, 2)):
+                tmp_file = f"{path}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=indent)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, path)
+            return True
+        except Exception as e:
+            log.error("⚠️ Error saving cache", error=str(e))
+            return False
+    
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, name="mood-cache-journal", daemon=True)
+                self._writer.start()
+    
+    def _writer_loop(self):
+        """Hilo writer: append al journal, fsync con debounce y compactación"""
+        directory = os.path.dirname(self.journal_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        journal = open(self.journal_file, 'a', encoding='utf-8')
+        dirty = False
+        last_fsync = time.monotonic()
+        
         try:
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            while True:
+                timeout = None
+                if dirty:
+                    timeout = max(0.0, self.fsync_interval - (time.monotonic() - last_fsync))
+                
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                
+                if isinstance(item, threading.Event):
+                    # flush(): persistir todo lo anterior y avisar
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    dirty = False
+                    last_fsync = time.monotonic()
+                    item.set()
+                    continue
+                
+                if item is not None and item is not _STOP:
+                    record = {"q": item[0], "r": item[1]}
+                    if item[2] != NEVER:
+                        record["x"] = item[2]
+                    journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    self._journal_entries += 1
+                    dirty = True
+                    if self._journal_entries >= self.compact_every:
+                        journal = self._compact(journal)
+                        dirty = False
+                        last_fsync = time.monotonic()
+                    # Agrupar todo lo que ya esté en cola antes del fsync
+                    if not self._queue.empty():
+                        continue
+                
+                if dirty and (item is None or item is _STOP
+                              or time.monotonic() - last_fsync >= self.fsync_interval):
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    dirty = False
+                    last_fsync = time.monotonic()
+                
+                if item is _STOP:
+                    if self._journal_entries:
+                        journal = self._compact(journal)
+                    break
         except Exception as e:
-            print(f"⚠️ Error saving cache: {e}")
+            log.error("⚠️ Cache journal writer stopped", error=str(e))
+        finally:
+            journal.close()
+    
+    def _compact(self, journal):
+        """Vuelca el caché a un snapshot nuevo y vacía el journal"""
+        journal.flush()
+        os.fsync(journal.fileno())
+        # Todo lo escrito en el journal ya está en self.cache; lo que siga en
+        # cola se escribirá en el journal nuevo (reaplicarlo es idempotente).
+        # Lo expulsado o expirado no pasa al snapshot.
+        if not self._save_cache(*self._snapshot()):
+            return journal
+        journal.close()
+        journal = open(self.journal_file, 'w', encoding='utf-8')
+        journal.flush()
+        os.fsync(journal.fileno())
+        self._journal_entries = 0
+        log.info("🗜️ Cache journal compacted", cache_file=self.cache_file)
+        return journal
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que el writer persista (con fsync) todo lo encolado"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        """Persiste lo pendiente, compacta y para el writer (shutdown)"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10)
+        self._writer = None
+    
+    @staticmethod
+    def make_key(query: str) -> str:
+        """Normaliza una query a la key usada en el caché (forma canónica)"""
+        return query_canonicalizer.canonicalize(query)
     
     def get_similar(self, query: str, threshold: float = 0.75) -> Optional[dict]:
         """
@@ -39,51 +473,103 @@ class MoodCacheService:
         Returns:
             Resultado cacheado si encuentra match, None si no
         """
-        query_lower = query.lower().strip()
+        query_lower = self.make_key(query)
         
         # Búsqueda exacta primero (más rápida)
-        if query_lower in self.cache:
-            print(f"✅ Exact cache hit!")
-            return self.cache[query_lower]
-        
-        # Búsqueda por similitud
-        best_match = None
-        best_similarity = 0.0
-        
-        for cached_query, result in self.cache.items():
-            similarity = SequenceMatcher(None, query_lower, cached_query.lower()).ratio()
-            
-            if similarity > best_similarity and similarity >= threshold:
-                best_similarity = similarity
-                best_match = result
+        result = self.cache.get(query_lower)
+        if result is not None:
+            _LOOKUP_EXACT.inc()
+            log.debug("✅ Exact cache hit")
+            return result
         
-        if best_match:
-            print(f"✅ Similar cache hit! Similarity: {best_similarity:.2%}")
-            return best_match
+        # Búsqueda por similitud usando el índice de trigramas
+        while True:
+            best_key, best_similarity = self.index.best_match(query_lower, threshold)
+            if best_key is None:
+                break
+            result = self.cache.get(best_key)
+            if result is not None:
+                _LOOKUP_SIMILAR.inc()
+                log.debug("✅ Similar cache hit", similarity=round(best_similarity, 3))
+                return result
+            # Había expirado: get() ya la sacó del índice, probar con la siguiente
+            self.index.remove(best_key)
         
-        print(f"❌ No cache hit (best similarity: {best_similarity:.2%})")
+        _LOOKUP_MISS.inc()
+        log.debug("❌ No cache hit", best_similarity=round(best_similarity, 3))
         return None
     
-    def add(self, query: str, result: dict):
+    def add(self, query: str, result: dict, fallback: bool = False):
         """
         Añade un resultado al caché
         
+        La persistencia es asíncrona: la entrada se encola para el journal.
+        
         Args:
             query: Query original del usuario
             result: Resultado del análisis de mood
+            fallback: Resultado de fallback (HF falló): usa fallback_ttl
         """
-        query_lower = query.lower().strip()
-        self.cache[query_lower] = result
-        self._save_cache()
-        print(f"💾 Added to cache: '{query_lower}'")
+        query_lower = self.make_key(query)
+        original = " ".join(query.split())
+        # Índice antes que caché: si la propia entrada se expulsa, on_evict la quita
+        self.index.add(query_lower)
+        self._queries[query_lower] = original
+        self.cache.set(query_lower, result, ttl=self.fallback_ttl if fallback else self.ttl)
+        expires_at = self.cache.expires_at(query_lower)
+        if expires_at is None:
+            # No cabe (más grande que max_mb): no se persiste
+            return
+        self._ensure_writer()
+        self._queue.put((original, result, expires_at))
+        log.debug("💾 Added to cache", query=query_lower)
     
     def get_stats(self) -> dict:
         """Retorna estadísticas del caché"""
         return {
             "total_entries": len(self.cache),
+            "indexed_entries": len(self.index),
+            "limits": self.cache.get_stats(),
             "cache_file": self.cache_file,
-            "file_exists": os.path.exists(self.cache_file)
+            "file_exists": os.path.exists(self.cache_file),
+            "journal_file": self.journal_file,
+            "journal_entries": self._journal_entries,
+            "pending_writes": self._queue.qsize()
         }
 
+
+def _mood_cache_from_env():
+    """
+    MOOD_CACHE_BACKEND=json (por defecto): dict + snapshot/journal por proceso.
+    MOOD_CACHE_BACKEND=sqlite: base WAL compartida por todos los workers de
+    uvicorn, con un hot tier en memoria por proceso.
+    """
+    limits = {
+        "max_entries": int(os.getenv("MOOD_CACHE_MAX_ENTRIES", "10000")),
+        "ttl": float(os.getenv("MOOD_CACHE_TTL", str(30 * 86400))),
+        "fallback_ttl": float(os.getenv("MOOD_CACHE_FALLBACK_TTL", "900"))
+    }
+    # Dataset versionado: solo se lee, nunca se reescribe
+    seed_file = os.getenv("MOOD_CACHE_SEED_FILE", "datasets/mood_cache.json") or None
+    if os.getenv("MOOD_CACHE_BACKEND", "json").lower() == "sqlite":
+        # Import local: sqlite_mood_cache importa este módulo
+        from services.sqlite_mood_cache import SQLiteMoodCacheService
+        return SQLiteMoodCacheService(
+            db_file=os.getenv("MOOD_CACHE_DB", "datasets/mood_cache.db"),
+            import_file=seed_file,
+            hot_size=int(os.getenv("MOOD_CACHE_HOT_SIZE", "512")),
+            hot_ttl=float(os.getenv("MOOD_CACHE_HOT_TTL", "60")),
+            sync_interval=float(os.getenv("MOOD_CACHE_SYNC_INTERVAL", "1.0")),
+            **limits
+        )
+    return MoodCacheService(
+        cache_file=os.getenv("MOOD_CACHE_FILE", "datasets/mood_cache.local.json"),
+        import_file=seed_file,
+        max_mb=float(os.getenv("MOOD_CACHE_MAX_MB", "64")),
+        policy=os.getenv("MOOD_CACHE_POLICY", "lru").lower(),
+        **limits
+    )
+
+
 # Singleton instance
-mood_cache = MoodCacheService()
+mood_cache = _mood_cache_from_env()
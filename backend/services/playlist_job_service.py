@@ -0,0 +1,251 @@
+"""
+Playlist Job Service
+Cola de trabajos en proceso para crear playlists en Deezer sin bloquear la
+request HTTP.
+
+POST /api/playlist/create?mode=job valida la request, encola un trabajo y
+responde al momento con su id; un pool de workers asyncio lo ejecuta
+(crear playlist + añadir tracks por lotes en paralelo) y el cliente
+consulta el estado en GET /api/playlist/jobs/{job_id}.
+
+Los reintentos son idempotentes: el trabajo guarda el playlist_id en
+cuanto Deezer lo devuelve, así que un reintento no crea otra playlist, y
+los tracks ya añadidos no se vuelven a añadir. Si la creación falla de
+forma ambigua (timeout o 5xx: Deezer pudo crearla sin que nos llegara el
+id) el trabajo falla en vez de reintentar. Un Idempotency-Key repetido
+devuelve el mismo trabajo en vez de crear otro.
+
+Limitación: los trabajos viven en memoria del proceso. Con varios workers
+de uvicorn, GET /api/playlist/jobs/{job_id} solo funciona si llega al
+mismo proceso que lo encoló (devuelve 404 en los demás); con más de un
+worker hace falta afinidad de sesión o no usar mode=job.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from services.deezer_auth_service import DeezerAPIError, deezer_auth_service, hash_token
+from services.logging_service import get_logger
+
+log = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class PlaylistJob:
+    id: str
+    owner: str
+    mood_name: str
+    track_ids: List[str]
+    genres: List[str]
+    energy: str
+    idempotency_key: Optional[str] = None
+    status: str = QUEUED
+    attempts: int = 0
+    playlist_id: Optional[str] = None
+    tracks_added: int = 0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Solo mientras el trabajo está pendiente; se borra al terminar
+    access_token: Optional[str] = field(default=None, repr=False)
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+    
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "playlist_id": self.playlist_id,
+            "tracks_added": self.tracks_added,
+            "tracks_total": len(self.track_ids),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class PlaylistJobService:
+    """Pool de workers asyncio que ejecuta trabajos de creación de playlists"""
+    
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 1000,
+        max_attempts: int = 3,
+        job_ttl: float = 3600.0
+    ):
+        """
+        Args:
+            workers: Trabajos que se ejecutan a la vez
+            max_queue: Trabajos pendientes antes de rechazar nuevos
+            max_attempts: Intentos por trabajo ante errores transitorios de Deezer
+            job_ttl: Segundos que se conserva un trabajo terminado para consultarlo
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.job_ttl = job_ttl
+        self.auth = deezer_auth_service
+        
+        self.jobs: Dict[str, PlaylistJob] = {}
+        self._by_idempotency_key: Dict[tuple, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self):
+        """Arranca los workers en el event loop actual (lifespan de la app)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"playlist-job-worker-{i}") for i in range(self.workers)
+        ]
+    
+    async def aclose(self):
+        """Para los workers; los trabajos en curso se cancelan"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+    
+    def submit(
+        self,
+        access_token: str,
+        mood_name: str,
+        track_ids: List[str],
+        genres: Optional[List[str]] = None,
+        energy: str = "medium",
+        idempotency_key: Optional[str] = None
+    ) -> PlaylistJob:
+        """
+        Encola un trabajo y lo devuelve sin esperar a Deezer.
+        
+        Raises:
+            RuntimeError: si el pool no está arrancado o la cola está llena
+        """
+        if self._queue is None:
+            raise RuntimeError("Playlist job workers are not running")
+        self._sweep()
+        
+        owner = hash_token(access_token)
+        if idempotency_key:
+            existing = self.jobs.get(self._by_idempotency_key.get((owner, idempotency_key), ""))
+            if existing is not None:
+                return existing
+        
+        if self._queue.qsize() >= self.max_queue:
+            raise RuntimeError("Playlist job queue is full")
+        
+        job = PlaylistJob(
+            id=uuid.uuid4().hex,
+            owner=owner,
+            mood_name=mood_name,
+            track_ids=list(track_ids),
+            genres=list(genres or []),
+            energy=energy or "medium",
+            idempotency_key=idempotency_key,
+            access_token=access_token
+        )
+        self.jobs[job.id] = job
+        if idempotency_key:
+            self._by_idempotency_key[(owner, idempotency_key)] = job.id
+        self._queue.put_nowait(job.id)
+        log.info("🗂️ Playlist job queued", job_id=job.id, tracks=len(job.track_ids))
+        return job
+    
+    def get(self, job_id: str, access_token: str) -> Optional[PlaylistJob]:
+        """Devuelve el trabajo solo si pertenece al mismo token"""
+        job = self.jobs.get(job_id)
+        if job is None or job.owner != hash_token(access_token):
+            return None
+        return job
+    
+    def _sweep(self):
+        """Olvida los trabajos terminados hace más de job_ttl"""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            job = self.jobs.pop(job_id)
+            if job.idempotency_key:
+                self._by_idempotency_key.pop((job.owner, job.idempotency_key), None)
+    
+    async def _worker(self):
+        job_queue = self._queue
+        while True:
+            job_id = await job_queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("❌ Playlist job worker error")
+            finally:
+                job_queue.task_done()
+    
+    async def _run(self, job: PlaylistJob):
+        job.status = RUNNING
+        
+        def on_progress(playlist_id: str, added: int):
+            job.playlist_id = playlist_id
+            job.tracks_added = added
+            job.updated_at = time.time()
+        
+        while True:
+            job.attempts += 1
+            job.updated_at = time.time()
+            try:
+                job.result = await self.auth.create_mood_playlist_async(
+                    access_token=job.access_token,
+                    mood_name=job.mood_name,
+                    track_ids=job.track_ids,
+                    genres=job.genres,
+                    energy=job.energy,
+                    playlist_id=job.playlist_id,
+                    on_progress=on_progress
+                )
+                job.tracks_added = job.result["tracks_count"]
+                job.status = SUCCEEDED
+                log.info("🎉 Playlist job done", job_id=job.id, playlist_id=job.playlist_id)
+                break
+            except Exception as e:
+                retryable = isinstance(e, DeezerAPIError) and e.retryable
+                # Sin playlist_id, un fallo ambiguo pudo crear ya la playlist
+                if retryable and job.playlist_id is None and e.ambiguous:
+                    retryable = False
+                if retryable and job.attempts < self.max_attempts:
+                    log.warning("🔁 Playlist job attempt failed", job_id=job.id, attempt=job.attempts, error=str(e))
+                    await asyncio.sleep(min(2 ** job.attempts, 30))
+                    continue
+                job.status = FAILED
+                job.error = f"Error creating playlist: {e}"
+                log.error("❌ Playlist job failed", job_id=job.id, error=str(e))
+                break
+        
+        job.access_token = None
+        job.updated_at = time.time()
+
+
+# Singleton instance
+playlist_jobs = PlaylistJobService(
+    workers=int(os.getenv("PLAYLIST_JOB_WORKERS", "4")),
+    max_queue=int(os.getenv("PLAYLIST_JOB_MAX_QUEUE", "1000")),
+    max_attempts=int(os.getenv("PLAYLIST_JOB_MAX_ATTEMPTS", "3")),
+    job_ttl=float(os.getenv("PLAYLIST_JOB_TTL", "3600"))
+)
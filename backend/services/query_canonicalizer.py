@@ -0,0 +1,86 @@
+"""
+Query Canonicalizer
+Forma canónica de las queries para las keys del mood cache.
+
+Con `query.lower().strip()` como key, "Studying late night, need focus!!"
+y "studying late night need focus" son entradas distintas: la segunda ya
+no es un hit exacto (O(1)) sino que pasa por la búsqueda aproximada, o
+falla. La forma canónica:
+
+1. minúsculas y sin acentos ("Después" → "despues")
+2. sin apóstrofes ("don't" → "dont") y el resto de puntuación y emojis
+   como separadores; espacios colapsados
+3. sin stopwords EN/ES (artículos, preposiciones, pronombres y palabras
+   como "music"/"canciones" que no cambian el mood). Las negaciones
+   ("no", "sin", "not", "dont"...) no se quitan: "sad" ≠ "not sad"
+4. tokens sin repetir y ordenados ("night late studying" = "studying late night")
+
+Si todo son stopwords se conservan los tokens; si no queda ninguno (solo
+emojis o puntuación) se usa lower().strip() para no juntar queries así en
+una sola key. La forma canónica es determinista (no depende de hash(), que
+cambia entre procesos) y key_hash() da un digest corto y estable de ella.
+"""
+
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from services.lexicon_service import fold
+
+_TOKEN = re.compile(r"[^\W_]+")
+_APOSTROPHES = re.compile(r"['’`´]")
+
+STOPWORDS_EN = frozenset("""
+a an the and or but of to in on at for with from by about as into onto over
+is are am be been being was were it its this that these those
+i im ive me my mine we our us you your he him his she her they them their
+some any just so while when what
+music song songs playlist tracks
+""".split())
+
+STOPWORDS_ES = frozenset("""
+el la lo los las un una unos unas y e o u de del al a en con para por que
+como mi mis tu tus su sus me te se le les nos
+es son soy estoy esta estan este esto estos esa ese esos esas
+algo mientras cuando
+musica cancion canciones playlist
+""".split())
+
+STOPWORDS = STOPWORDS_EN | STOPWORDS_ES
+
+
+class QueryCanonicalizer:
+    """Normaliza queries a su forma canónica (key del mood cache)"""
+    
+    def __init__(self, enabled: bool = True, stopwords: frozenset = STOPWORDS, cache_size: int = 4096):
+        """
+        Args:
+            enabled: Si es False se usa la key original (lower + strip)
+            stopwords: Palabras (sin acentos) que no forman parte de la key
+            cache_size: Queries recientes memorizadas (se canonicaliza varias veces por request)
+        """
+        self.enabled = enabled
+        self.stopwords = stopwords
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+    
+    def _canonicalize(self, query: str) -> str:
+        if not self.enabled:
+            return query.lower().strip()
+        
+        tokens = _TOKEN.findall(_APOSTROPHES.sub("", fold(query)))
+        if not tokens:
+            return query.lower().strip()
+        
+        kept = [token for token in tokens if token not in self.stopwords]
+        return " ".join(sorted(set(kept or tokens)))
+    
+    def key_hash(self, query: str) -> str:
+        """Digest estable (16 hex) de la forma canónica, para keys de tamaño fijo"""
+        return hashlib.blake2b(self.canonicalize(query).encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Singleton instance (MOOD_CACHE_CANONICALIZE=false vuelve a lower + strip)
+query_canonicalizer = QueryCanonicalizer(
+    enabled=os.getenv("MOOD_CACHE_CANONICALIZE", "true").lower() == "true"
+)
@@ -0,0 +1,130 @@
+"""
+Rate Limit Service
+Límite de peticiones por cliente para /api/discover y /api/playlist/create.
+
+Usa GCRA (Generic Cell Rate Algorithm): por cliente solo se guarda un float,
+el "theoretical arrival time" (TAT). Cada petición lo adelanta en
+period / limit segundos por unidad de coste; se rechaza si el TAT quedaría
+más de `burst` intervalos por delante de ahora. Equivale a un token bucket
+de capacidad `burst` que se rellena a `limit` por `period`, con O(1) por
+petición y sin listas de timestamps.
+
+Los clientes cuyo TAT ya pasó están en reposo (bucket lleno) y se pueden
+olvidar sin cambiar el resultado: un barrido periódico los elimina, y
+max_clients acota la memoria aunque lleguen muchas IPs distintas.
+"""
+
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+
+class RateLimiter:
+    """Rate limiter GCRA keyed por cliente, con memoria acotada"""
+    
+    def __init__(
+        self,
+        limit: int = 100,
+        period: float = 3600.0,
+        burst: Optional[int] = None,
+        max_clients: int = 100_000,
+        sweep_interval: float = 60.0
+    ):
+        """
+        Args:
+            limit: Peticiones permitidas por periodo (0 = sin límite)
+            period: Duración del periodo en segundos
+            burst: Peticiones seguidas permitidas a un cliente en reposo (por defecto = limit)
+            max_clients: Clientes que se recuerdan a la vez
+            sweep_interval: Segundos entre barridos de clientes en reposo
+        """
+        self.limit = limit
+        self.period = period
+        self.burst = max(1, burst if burst is not None else limit)
+        self.interval = period / limit if limit > 0 else 0.0
+        self.max_clients = max_clients
+        self.sweep_interval = sweep_interval
+        
+        self._tat: Dict[str, float] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+        
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+    
+    def __len__(self) -> int:
+        return len(self._tat)
+    
+    def check(self, client: str, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Consume `cost` unidades del cupo del cliente si caben.
+        
+        Un coste mayor que burst se recorta a burst: una petición grande
+        (p. ej. un batch) pasa con el cupo lleno en vez de no pasar nunca.
+        
+        Returns:
+            (permitida, segundos hasta que lo estaría)
+        """
+        if not self.enabled:
+            return True, 0.0
+        
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        
+        tat = max(self._tat.get(client, now), now)
+        new_tat = tat + self.interval * min(max(cost, 1), self.burst)
+        wait = new_tat - now - self.interval * self.burst
+        # Tolerancia para el redondeo de floats (now es monotonic, puede ser grande)
+        if wait > 1e-6:
+            self.rejected += 1
+            return False, wait
+        
+        if client not in self._tat and len(self._tat) >= self.max_clients:
+            # El más antiguo en entrar; olvidarlo solo le devuelve el cupo entero
+            del self._tat[next(iter(self._tat))]
+            self.evictions += 1
+        self._tat[client] = new_tat
+        self.allowed += 1
+        return True, 0.0
+    
+    def _sweep(self, now: float):
+        """Olvida los clientes en reposo (TAT en el pasado = cupo lleno)"""
+        idle = [client for client, tat in self._tat.items() if tat <= now]
+        for client in idle:
+            del self._tat[client]
+        self._next_sweep = now + self.sweep_interval
+    
+    def clear(self):
+        self._tat.clear()
+    
+    @staticmethod
+    def retry_after(wait: float) -> str:
+        """Valor de la cabecera Retry-After (segundos enteros, al alza)"""
+        return str(max(1, math.ceil(wait)))
+    
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "period": self.period,
+            "burst": self.burst,
+            "clients": len(self._tat),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions
+        }
+
+
+# Singleton instance (RATE_LIMIT_PER_HOUR=0 lo desactiva)
+rate_limiter = RateLimiter(
+    limit=int(os.getenv("RATE_LIMIT_PER_HOUR", "100")),
+    period=3600.0,
+    burst=int(os.getenv("RATE_LIMIT_BURST")) if os.getenv("RATE_LIMIT_BURST") else None,
+    max_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000")),
+    sweep_interval=float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL", "60"))
+)
@@ -0,0 +1,394 @@
+"""
+SQLite Mood Cache
+Backend del mood cache compartido entre procesos (uvicorn --workers N).
+
+Con el backend JSON cada worker tiene su propio dict: falla por separado,
+paga su propia llamada al LLM y, al compactar, pisa el snapshot de los
+demás. Aquí todos los workers leen y escriben la misma base SQLite en modo
+WAL (lecturas concurrentes con un único writer a la vez):
+
+    mood_cache (id, key, query, result, updated_at)   key UNIQUE, id creciente
+
+Por proceso quedan dos estructuras pequeñas:
+- hot tier: TTLCache LRU con los resultados más usados (lookup en memoria)
+- índice de trigramas de las keys, que se sincroniza de forma incremental
+  (`id > último visto`) como mucho cada sync_interval segundos, así las
+  entradas que añade otro worker también cuentan para get_similar()
+
+Las escrituras se encolan y las hace un hilo writer (igual que el catálogo
+de tracks). La primera vez que se abre una base vacía se importa el
+snapshot JSON existente (datasets/mood_cache.json), que solo se lee.
+
+Cada fila guarda también la query original: si cambia la forma de las keys
+(MOOD_CACHE_CANONICALIZE), load() las recalcula a partir de ella.
+
+Cada fila lleva su expiración (expires_at, NULL = no expira). El writer
+borra periódicamente las expiradas y, por encima de max_entries, las
+escritas hace más tiempo: registrar cada lectura convertiría las lecturas
+de todos los workers en escrituras.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from services.logging_service import get_logger
+from services.mood_cache_service import (
+    TrigramIndex, MoodCacheService, _LOOKUP_EXACT, _LOOKUP_SIMILAR, _LOOKUP_MISS
+)
+from services.metrics_service import MOOD_CACHE_EVICTIONS
+from services.ttl_cache import TTLCache
+
+log = get_logger(__name__)
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    query TEXT,
+    result TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+"""
+
+
+class SQLiteMoodCacheService:
+    """Mood cache en SQLite (WAL) compartido por todos los workers, con hot tier por proceso"""
+    
+    make_key = staticmethod(MoodCacheService.make_key)
+    
+    def __init__(
+        self,
+        db_file: str = "datasets/mood_cache.db",
+        import_file: Optional[str] = "datasets/mood_cache.json",
+        hot_size: int = 512,
+        hot_ttl: float = 60.0,
+        sync_interval: float = 1.0,
+        max_entries: int = 10000,
+        ttl: float = 30 * 86400,
+        fallback_ttl: float = 900.0,
+        prune_interval: float = 60.0
+    ):
+        """
+        Args:
+            db_file: Fichero SQLite compartido (se crea al primer uso)
+            import_file: Snapshot JSON que se importa si la base está vacía
+            hot_size: Entradas del hot tier de cada proceso
+            hot_ttl: Segundos que una entrada vive en el hot tier (cota de
+                cuánto tarda en verse aquí una actualización de otro worker)
+            sync_interval: Segundos mínimos entre sincronizaciones del índice
+            max_entries: Máximo de filas en la base (0 = sin tope)
+            ttl: TTL de las entradas normales en segundos (0 = no expiran)
+            fallback_ttl: TTL de los resultados de fallback (léxico o default)
+            prune_interval: Segundos mínimos entre podas de la base
+        """
+        self.db_file = db_file
+        self.import_file = import_file
+        self.sync_interval = sync_interval
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.prune_interval = prune_interval
+        self.hot = TTLCache(maxsize=hot_size, ttl=hot_ttl)
+        
+        self._index: Optional[TrigramIndex] = None
+        self._last_id = 0
+        self._last_sync = 0.0
+        self._load_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._local = threading.local()
+        
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        atexit.register(self.close)
+    
+    # ============================================
+    # CONEXIONES Y CARGA
+    # ============================================
+    
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Conexión de lectura del hilo actual (WAL: no bloquea al writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+    
+    @property
+    def index(self) -> TrigramIndex:
+        return self._ensure_index()
+    
+    def _ensure_index(self) -> TrigramIndex:
+        """Carga la base y construye el índice en el primer uso"""
+        if self._index is None:
+            self.load()
+        return self._index
+    
+    def __len__(self) -> int:
+        """
+        Entradas vivas en la base (las escrituras encoladas cuentan tras el
+        flush). El índice puede tener keys ya expiradas o podadas.
+        """
+        self._ensure_index()
+        return self._reader().execute(
+            "SELECT COUNT(*) FROM mood_cache WHERE expires_at IS NULL OR expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+    
+    def load(self):
+        """Crea el esquema, importa el snapshot JSON si la base está vacía, recalcula keys y construye el índice"""
+        with self._load_lock:
+            if self._index is not None:
+                return
+            conn = self._connect()
+            try:
+                conn.executescript(SCHEMA)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(mood_cache)")}
+                if "expires_at" not in columns:
+                    conn.execute("ALTER TABLE mood_cache ADD COLUMN expires_at REAL")
+                if "query" not in columns:
+                    conn.execute("ALTER TABLE mood_cache ADD COLUMN query TEXT")
+                self._import_snapshot(conn)
+                self._rekey(conn)
+            finally:
+                conn.close()
+            self._index = TrigramIndex()
+        self._sync_index(force=True)
+    
+    def _import_snapshot(self, conn: sqlite3.Connection):
+        if not self.import_file or not os.path.exists(self.import_file):
+            return
+        # BEGIN IMMEDIATE: si varios workers arrancan a la vez, solo uno importa
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM mood_cache LIMIT 1").fetchone() is None:
+                with open(self.import_file, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                now = time.time()
+                expires_at = self._expires_at(now, self.ttl)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO mood_cache (key, query, result, updated_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(self.make_key(query), query, json.dumps(result, ensure_ascii=False), now, expires_at)
+                     for query, result in snapshot.items()]
+                )
+                log.info("📥 Imported mood cache snapshot", entries=len(snapshot), import_file=self.import_file)
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            log.warning("⚠️ Error importing mood cache snapshot", error=str(e))
+    
+    def _rekey(self, conn: sqlite3.Connection):
+        """Recalcula las keys de las filas cuya query original ya no da la misma key"""
+        rows = conn.execute("SELECT key, query FROM mood_cache WHERE query IS NOT NULL").fetchall()
+        stale = [(new_key, key) for key, new_key in ((key, self.make_key(query)) for key, query in rows) if new_key != key]
+        if not stale:
+            return
+        try:
+            with conn:
+                # OR REPLACE: si dos queries pasan a compartir key, queda una fila
+                conn.executemany("UPDATE OR REPLACE mood_cache SET key = ? WHERE key = ?", stale)
+            log.info("🔑 Re-keyed mood cache rows", rows=len(stale))
+        except sqlite3.Error as e:
+            log.warning("⚠️ Error re-keying mood cache", error=str(e))
+    
+    @staticmethod
+    def _expires_at(now: float, ttl: float) -> Optional[float]:
+        return now + ttl if ttl else None
+    
+    def _sync_index(self, force: bool = False):
+        """Añade al índice las keys nuevas de otros workers (id > último visto)"""
+        index = self._ensure_index()
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._sync_lock:
+            rows = self._reader().execute(
+                "SELECT id, key FROM mood_cache WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+            for row_id, key in rows:
+                index.add(key)
+                self._last_id = row_id
+            self._last_sync = now
+    
+    # ============================================
+    # ESCRITURA (hilo writer)
+    # ============================================
+    
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, name="mood-cache-sqlite", daemon=True)
+                self._writer.start()
+    
+    def _writer_loop(self):
+        """Hilo writer: agrupa todo lo encolado en una sola transacción"""
+        try:
+            conn = self._connect()
+        except Exception as e:
+            log.error("⚠️ Mood cache database unavailable", error=str(e))
+            return
+        
+        last_prune = 0.0
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                pending = [b for b in batch if isinstance(b, tuple)]
+                if pending:
+                    now = time.time()
+                    try:
+                        with conn:
+                            conn.executemany(
+                                "INSERT INTO mood_cache (key, query, result, updated_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+                                "ON CONFLICT(key) DO UPDATE SET query=excluded.query, result=excluded.result, "
+                                "updated_at=excluded.updated_at, expires_at=excluded.expires_at",
+                                [(key, query, result, now, expires_at) for key, query, result, expires_at in pending]
+                            )
+                            if now - last_prune >= self.prune_interval:
+                                last_prune = now
+                                self._prune(conn, now)
+                    except Exception as e:
+                        log.error("⚠️ Error writing to mood cache database", error=str(e))
+                
+                for b in batch:
+                    if isinstance(b, threading.Event):
+                        b.set()
+                if any(b is _STOP for b in batch):
+                    break
+        finally:
+            conn.close()
+    
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Borra las filas expiradas y, por encima de max_entries, las más antiguas"""
+        expired = conn.execute(
+            "DELETE FROM mood_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).rowcount
+        trimmed = 0
+        if self.max_entries:
+            trimmed = conn.execute(
+                "DELETE FROM mood_cache WHERE id IN "
+                "(SELECT id FROM mood_cache ORDER BY updated_at DESC, id DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        if expired:
+            MOOD_CACHE_EVICTIONS.labels(reason="expired").inc(expired)
+        if trimmed:
+            MOOD_CACHE_EVICTIONS.labels(reason="size").inc(trimmed)
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que el writer haya guardado todo lo encolado"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        """Escribe lo pendiente y para el writer (shutdown)"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10)
+        self._writer = None
+    
+    # ============================================
+    # API (la misma que MoodCacheService)
+    # ============================================
+    
+    def _get(self, key: str) -> Optional[dict]:
+        entry = self.hot.get(key)
+        if entry is None:
+            row = self._reader().execute(
+                "SELECT result, expires_at FROM mood_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (json.loads(row[0]), row[1])
+            self.hot.set(key, entry)
+        result, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self.hot.delete(key)
+            return None
+        return result
+    
+    def get_similar(self, query: str, threshold: float = 0.75) -> Optional[dict]:
+        """
+        Busca la query (o una similar) en el caché compartido.
+        
+        Orden: hot tier → fila exacta en SQLite → índice de trigramas local
+        (sincronizado con las keys de los demás workers).
+        """
+        query_lower = self.make_key(query)
+        self._ensure_index()
+        
+        result = self._get(query_lower)
+        if result is not None:
+            _LOOKUP_EXACT.inc()
+            log.debug("✅ Exact cache hit")
+            return result
+        
+        self._sync_index()
+        while True:
+            best_key, best_similarity = self.index.best_match(query_lower, threshold)
+            if best_key is None:
+                break
+            result = self._get(best_key)
+            if result is not None:
+                _LOOKUP_SIMILAR.inc()
+                log.debug("✅ Similar cache hit", similarity=round(best_similarity, 3))
+                return result
+            # Expirada o podada (quizá por otro worker): fuera del índice local
+            self.index.remove(best_key)
+        
+        _LOOKUP_MISS.inc()
+        log.debug("❌ No cache hit", best_similarity=round(best_similarity, 3))
+        return None
+    
+    def add(self, query: str, result: dict, fallback: bool = False):
+        """Guarda el resultado en el hot tier y encola la escritura en SQLite"""
+        query_lower = self.make_key(query)
+        expires_at = self._expires_at(time.time(), self.fallback_ttl if fallback else self.ttl)
+        self.hot.set(query_lower, (result, expires_at))
+        self.index.add(query_lower)
+        self._ensure_writer()
+        self._queue.put((query_lower, " ".join(query.split()), json.dumps(result, ensure_ascii=False), expires_at))
+        log.debug("💾 Added to cache", query=query_lower)
+    
+    def get_stats(self) -> dict:
+        """Retorna estadísticas del caché"""
+        return {
+            "backend": "sqlite",
+            "total_entries": len(self),
+            "indexed_entries": len(self.index),
+            "hot_tier": self.hot.get_stats(),
+            "db_file": self.db_file,
+            "max_entries": self.max_entries,
+            "pending_writes": self._queue.qsize()
+        }
@@ -0,0 +1,28 @@
+"""
+SSL context compartido por los clientes httpx (Deezer, Deezer OAuth, Hugging Face).
+
+Cada httpx.AsyncClient crea por defecto su propio SSLContext y carga el
+bundle de certifi (~40ms cada uno); con uno compartido esa carga se paga
+una sola vez en el arranque.
+"""
+
+import ssl
+import threading
+from typing import Optional
+
+from services.lazy_import import lazy_module
+
+# ~160ms de import: solo hace falta al crear el primer cliente
+httpx = lazy_module("httpx")
+
+_lock = threading.Lock()
+_context: Optional[ssl.SSLContext] = None
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    global _context
+    if _context is None:
+        with _lock:
+            if _context is None:
+                _context = httpx.create_ssl_context()
+    return _context
@@ -0,0 +1,348 @@
+"""
+Track Catalog Service
+Catálogo local y persistente de los tracks que ya nos ha devuelto Deezer.
+
+SQLite en modo WAL (lecturas concurrentes con un único writer) con dos
+índices invertidos, WITHOUT ROWID:
+
+    track_genres (genre, track_id)   → tracks por género
+    track_energy (energy, track_id)  → tracks por nivel de energía
+
+Cada búsqueda de DeezerService se ingiere junto con los géneros y la
+energía que la originaron. /api/discover puede responder desde el catálogo
+cuando hay suficientes tracks para esa combinación, y solo llamar a Deezer
+para completar o refrescar en background.
+
+Las escrituras se encolan y las hace un hilo writer (igual que el journal
+del mood cache); las lecturas usan una conexión por hilo.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.logging_service import get_logger
+
+log = get_logger(__name__)
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    album TEXT NOT NULL,
+    rank INTEGER NOT NULL DEFAULT 0,
+    duration INTEGER NOT NULL DEFAULT 0,
+    preview TEXT,
+    cover TEXT,
+    link TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS track_genres (
+    genre TEXT NOT NULL,
+    track_id INTEGER NOT NULL,
+    PRIMARY KEY (genre, track_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS track_energy (
+    energy TEXT NOT NULL,
+    track_id INTEGER NOT NULL,
+    PRIMARY KEY (energy, track_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    key TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _normalize(values: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(" ".join(v.lower().split()) for v in values if v and v.strip()))
+
+
+class TrackCatalogService:
+    """Catálogo SQLite (WAL) de tracks con índices por género y energía"""
+    
+    def __init__(
+        self,
+        db_file: str = "datasets/track_catalog.db",
+        min_tracks: int = 10,
+        refresh_after: float = 86400.0
+    ):
+        """
+        Args:
+            db_file: Fichero SQLite (se crea al primer uso)
+            min_tracks: Tracks necesarios para responder desde el catálogo
+            refresh_after: Segundos tras los que una combinación géneros/energía
+                se considera desactualizada y se refresca en background
+        """
+        self.db_file = db_file
+        self.min_tracks = min_tracks
+        self.refresh_after = refresh_after
+        
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.close)
+    
+    # ============================================
+    # CONEXIONES
+    # ============================================
+    
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                conn = self._connect()
+                conn.executescript(SCHEMA)
+                conn.commit()
+                conn.close()
+                self._initialized = True
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Conexión de lectura del hilo actual (WAL: no bloquea al writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_schema()
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    # ============================================
+    # ESCRITURA (hilo writer)
+    # ============================================
+    
+    @staticmethod
+    def coverage_key(genres: List[str], energy: str) -> str:
+        return f"{','.join(sorted(_normalize(genres)))}|{(energy or '').lower()}"
+    
+    def ingest(self, items: List[Dict], genres: List[str], energy: str, coverage_key: Optional[str] = None):
+        """
+        Encola tracks crudos de Deezer (/search) para guardarlos en el catálogo.
+        
+        Args:
+            items: Tracks tal cual los devuelve la API de Deezer
+            genres: Géneros con los que se encontraron
+            energy: Nivel de energía del análisis de mood
+            coverage_key: Combinación que se marca como refrescada ahora
+        """
+        if not items:
+            return
+        self._ensure_writer()
+        self._queue.put((items, _normalize(genres), (energy or "").lower(), coverage_key))
+    
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, name="track-catalog-writer", daemon=True)
+                self._writer.start()
+    
+    def _writer_loop(self):
+        """Hilo writer: agrupa todo lo encolado en una sola transacción"""
+        try:
+            self._ensure_schema()
+            conn = self._connect()
+        except Exception as e:
+            log.error("⚠️ Track catalog unavailable", error=str(e))
+            return
+        
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                pending = [b for b in batch if isinstance(b, tuple)]
+                if pending:
+                    try:
+                        with conn:
+                            for items, genres, energy, coverage_key in pending:
+                                self._write(conn, items, genres, energy, coverage_key)
+                    except Exception as e:
+                        log.error("⚠️ Error writing to track catalog", error=str(e))
+                
+                for b in batch:
+                    if isinstance(b, threading.Event):
+                        b.set()
+                if any(b is _STOP for b in batch):
+                    break
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _write(conn: sqlite3.Connection, items: List[Dict], genres: List[str], energy: str,
+               coverage_key: Optional[str]):
+        now = time.time()
+        conn.executemany(
+            """
+            INSERT INTO tracks (id, title, artist, album, rank, duration, preview, cover, link, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                title=excluded.title, artist=excluded.artist, album=excluded.album, rank=excluded.rank,
+                duration=excluded.duration, preview=excluded.preview, cover=excluded.cover,
+                link=excluded.link, updated_at=excluded.updated_at
+            """,
+            [
+                (
+                    item["id"], item["title"], item["artist"]["name"], item["album"]["title"],
+                    item.get("rank", 0), item.get("duration", 0), item.get("preview"),
+                    item["album"].get("cover_medium"), item["link"], now
+                )
+                for item in items
+            ]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO track_genres (genre, track_id) VALUES (?, ?)",
+            [(genre, item["id"]) for item in items for genre in genres]
+        )
+        if energy:
+            conn.executemany(
+                "INSERT OR IGNORE INTO track_energy (energy, track_id) VALUES (?, ?)",
+                [(energy, item["id"]) for item in items]
+            )
+        if coverage_key:
+            conn.execute(
+                "INSERT INTO coverage (key, refreshed_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET refreshed_at=excluded.refreshed_at",
+                (coverage_key, now)
+            )
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que el writer haya guardado todo lo encolado"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        """Escribe lo pendiente y para el writer (shutdown)"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10)
+        self._writer = None
+    
+    # ============================================
+    # LECTURA
+    # ============================================
+    
+    def find(self, genres: List[str], energy: str, limit: int = 10) -> Tuple[List[Dict], bool]:
+        """
+        Tracks del catálogo para una combinación de géneros y energía.
+        
+        Solo cuentan los tracks etiquetados con todos los géneros pedidos: un
+        track de "lo-fi" no sirve para "lo-fi + ambient" (si la combinación
+        no tiene tracks suficientes, DeezerService va a Deezer). Ordena por
+        coincidencia de energía y por rank, con el mismo límite de 2 tracks
+        por artista que DeezerService.
+        
+        Returns:
+            (tracks en formato crudo de Deezer, True si la combinación necesita refresco)
+        """
+        genres = _normalize(genres)[:2]
+        if not genres:
+            return [], True
+        
+        conn = self._reader()
+        placeholders = ",".join("?" * len(genres))
+        rows = conn.execute(
+            f"""
+            SELECT t.id, t.title, t.artist, t.album, t.rank, t.duration, t.preview, t.cover, t.link,
+                   EXISTS (SELECT 1 FROM track_energy e WHERE e.energy = ? AND e.track_id = t.id) AS energy_match
+            FROM track_genres g JOIN tracks t ON t.id = g.track_id
+            WHERE g.genre IN ({placeholders})
+            GROUP BY t.id
+            HAVING COUNT(*) = ?
+            ORDER BY energy_match DESC, t.rank DESC
+            LIMIT ?
+            """,
+            ((energy or "").lower(), *genres, len(genres), limit * 4)
+        ).fetchall()
+        
+        tracks = []
+        artist_counts: Counter = Counter()
+        for track_id, title, artist, album, rank, duration, preview, cover, link, _ in rows:
+            if artist_counts[artist] >= 2:
+                continue
+            artist_counts[artist] += 1
+            tracks.append({
+                "id": track_id,
+                "title": title,
+                "artist": {"name": artist},
+                "album": {"title": album, "cover_medium": cover},
+                "rank": rank,
+                "duration": duration,
+                "preview": preview,
+                "link": link
+            })
+            if len(tracks) >= limit:
+                break
+        
+        row = conn.execute(
+            "SELECT refreshed_at FROM coverage WHERE key = ?", (self.coverage_key(genres, energy),)
+        ).fetchone()
+        needs_refresh = row is None or time.time() - row[0] >= self.refresh_after
+        
+        if len(tracks) >= min(limit, self.min_tracks):
+            self.hits += 1
+        else:
+            self.misses += 1
+        return tracks, needs_refresh
+    
+    def get_stats(self) -> dict:
+        """Estadísticas del catálogo"""
+        try:
+            conn = self._reader()
+            total_tracks = conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            total_genres = conn.execute("SELECT COUNT(DISTINCT genre) FROM track_genres").fetchone()[0]
+        except sqlite3.Error:
+            total_tracks = total_genres = 0
+        return {
+            "total_tracks": total_tracks,
+            "total_genres": total_genres,
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending_writes": self._queue.qsize(),
+            "db_file": self.db_file
+        }
+
+
+def _catalog_from_env() -> Optional[TrackCatalogService]:
+    if os.getenv("TRACK_CATALOG_ENABLED", "true").lower() != "true":
+        return None
+    return TrackCatalogService(
+        db_file=os.getenv("TRACK_CATALOG_FILE", "datasets/track_catalog.db"),
+        min_tracks=int(os.getenv("TRACK_CATALOG_MIN_TRACKS", "10")),
+        refresh_after=float(os.getenv("TRACK_CATALOG_REFRESH_AFTER", "86400"))
+    )
+
+
+# Singleton instance (None si TRACK_CATALOG_ENABLED=false)
+track_catalog = _catalog_from_env()
@@ -0,0 +1,104 @@
+"""
+TTL + LRU Cache
+Caché en memoria acotado por tamaño, con expiración por tiempo y ventana
+stale-while-revalidate.
+
+Estados de una entrada:
+- fresh: edad < ttl → se sirve directamente
+- stale: ttl <= edad < ttl + stale_ttl → se sirve, pero conviene refrescarla en background
+- expirada: edad >= ttl + stale_ttl → se elimina y cuenta como miss
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class TTLCache:
+    """Caché LRU con TTL y contadores de hit/miss"""
+    
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0, stale_ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key, count=False)[1] is not None
+    
+    def lookup(self, key: Hashable, count: bool = True) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Busca una entrada.
+        
+        Returns:
+            (valor, estado) con estado FRESH/STALE, o (None, None) si no existe o expiró
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None, None
+        
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        
+        if age >= self.ttl + self.stale_ttl:
+            del self._data[key]
+            if count:
+                self.misses += 1
+            return None, None
+        
+        self._data.move_to_end(key)
+        if age < self.ttl:
+            if count:
+                self.hits += 1
+            return value, FRESH
+        
+        if count:
+            self.stale_hits += 1
+        return value, STALE
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Devuelve el valor si no ha expirado (fresh o stale)"""
+        value, state = self.lookup(key)
+        return default if state is None else value
+    
+    def set(self, key: Hashable, value: Any):
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (time.monotonic(), value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, None) is not None
+    
+    def clear(self):
+        self._data.clear()
+    
+    def get_stats(self) -> dict:
+        """Estadísticas para dimensionar el caché"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,209 @@
+"""
+Warm-up Service
+Trabajo de arranque que no tiene por qué bloquear el primer request.
+
+El lifespan de la app lanza este warm-up como tarea en background;
+uvicorn empieza a aceptar conexiones enseguida y /health responde en
+milisegundos aunque el warm-up siga. Cada paso es idempotente: si llega un
+request antes, el servicio correspondiente hace la carga él mismo en el
+primer uso.
+
+Pasos:
+    http_clients   importa httpx y Hugging Face y crea los clientes de Deezer,
+                   Deezer OAuth y Hugging Face (SSL incluido)
+    mood_cache     carga el snapshot + journal y construye el índice de trigramas
+    track_catalog  abre el SQLite y crea el esquema si hace falta
+    seeds          (si hay WARMUP_SEED_FILE) analiza las queries más populares
+                   sin LLM (mood cache o léxico) y precarga sus búsquedas de Deezer
+
+Fichero de semillas: lista JSON ordenada por popularidad (p. ej. el top N
+del access log), en EN y ES:
+
+    [{"query": "studying late night", "language": "en"},
+     {"query": "triste después de ruptura", "language": "es"}, ...]
+
+Las semillas van con concurrencia acotada y pausa entre queries, y las
+búsquedas de Deezer piden tokens con prioridad WARMUP: solo usan la cuota
+que no necesita el tráfico real. Hugging Face no tiene esa prioridad, así
+que el warm-up no lo llama: las semillas que ni el mood cache ni el léxico
+resuelven con confianza se saltan (se analizarán en su primer request).
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.deezer_auth_service import deezer_auth_service
+from services.deezer_service import deezer_service
+from services.lazy_import import lazy_module
+from services.logging_service import get_logger
+from services.mood_cache_service import mood_cache
+from services.track_catalog_service import track_catalog
+
+log = get_logger(__name__)
+
+# El cliente de Hugging Face y el análisis de mood se importan en el propio warm-up
+huggingface_service = lazy_module("services.huggingface_service")
+llm_service = lazy_module("services.llm_service")
+
+
+def analyze_mood_local(query: str, language: str = "en") -> Optional[dict]:
+    return llm_service.analyze_mood_local(query, language)
+
+IDLE = "idle"
+RUNNING = "running"
+DONE = "done"
+DISABLED = "disabled"
+
+# Mismo límite que /api/discover: el caché de búsquedas va keyed por (query, limit)
+DISCOVER_LIMIT = 10
+
+
+def load_seeds(path: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Lee el fichero de semillas.
+    
+    Returns:
+        [(query, idioma)] sin duplicados, en el orden del fichero, hasta `limit`
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    
+    seeds: Dict[Tuple[str, str], None] = {}
+    for entry in entries:
+        query = " ".join(str(entry.get("query", "")).split())
+        language = entry.get("language", "en")
+        if query and language in ("en", "es"):
+            seeds.setdefault((query, language), None)
+    return list(seeds)[:limit]
+
+
+class WarmupService:
+    """Ejecuta los pasos de warm-up en background durante el arranque"""
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        seed_file: Optional[str] = None,
+        seed_limit: int = 50,
+        concurrency: int = 2,
+        interval: float = 0.5
+    ):
+        """
+        Args:
+            enabled: Si False, no se hace nada (todo se carga en el primer uso)
+            seed_file: Fichero JSON de queries semilla (None = sin semillas)
+            seed_limit: Semillas que se precargan (las primeras del fichero)
+            concurrency: Semillas en curso a la vez
+            interval: Pausa de cada worker entre semillas (segundos)
+        """
+        self.enabled = enabled
+        self.seed_file = seed_file
+        self.seed_limit = seed_limit
+        self.concurrency = concurrency
+        self.interval = interval
+        self.status = IDLE if enabled else DISABLED
+        self.steps: Dict[str, dict] = {}
+        self.seeds = {"total": 0, "done": 0, "skipped": 0, "failed": 0, "deezer_requests": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+    
+    def _plan(self) -> List[Tuple[str, Callable[[], Awaitable]]]:
+        plan = [
+            ("http_clients", lambda: asyncio.to_thread(self._start_clients)),
+            ("mood_cache", lambda: asyncio.to_thread(mood_cache.load)),
+        ]
+        if track_catalog is not None:
+            plan.append(("track_catalog", lambda: asyncio.to_thread(track_catalog.get_stats)))
+        if self.seed_file:
+            plan.append(("seeds", self._warm_seeds))
+        return plan
+    
+    @staticmethod
+    def _start_clients():
+        # Si un request llega antes, la property `client` de cada servicio lo crea
+        deezer_service.start()
+        huggingface_service.hf_client.start()
+        deezer_auth_service.start()
+    
+    async def _warm_seeds(self):
+        seeds = await asyncio.to_thread(load_seeds, self.seed_file, self.seed_limit)
+        self.seeds["total"] = len(seeds)
+        log.info("🌱 Warming up seed queries", seeds=len(seeds), seed_file=self.seed_file)
+        
+        pending = iter(seeds)
+        
+        async def worker():
+            # Cada worker toma la siguiente semilla: las más populares van primero
+            for query, language in pending:
+                try:
+                    mood = analyze_mood_local(query, language)
+                    if mood is None:
+                        self.seeds["skipped"] += 1
+                        continue
+                    self.seeds["deezer_requests"] += await deezer_service.prefetch(
+                        mood["genres"], mood["energy"], DISCOVER_LIMIT
+                    )
+                    self.seeds["done"] += 1
+                except Exception as e:
+                    self.seeds["failed"] += 1
+                    log.warning("⚠️ Seed warm-up failed", query=query, error=str(e))
+                await asyncio.sleep(self.interval)
+        
+        await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+    
+    def start(self):
+        """Lanza el warm-up en el event loop actual (lifespan de la app)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="startup-warmup")
+    
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def wait(self):
+        """Espera a que termine el warm-up (tests y scripts)"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+    
+    async def _run(self):
+        self.status = RUNNING
+        self._started_at = time.perf_counter()
+        for name, step in self._plan():
+            start = time.perf_counter()
+            try:
+                await step()
+                self.steps[name] = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1)}
+            except Exception as e:
+                self.steps[name] = {"ok": False, "ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+                log.warning("⚠️ Warm-up step failed", step=name, error=str(e))
+        self._finished_at = time.perf_counter()
+        self.status = DONE
+        log.info("🔥 Startup warm-up done", ms=round((self._finished_at - self._started_at) * 1000, 1))
+    
+    def get_status(self) -> dict:
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = round(((self._finished_at or time.perf_counter()) - self._started_at) * 1000, 1)
+        return {
+            "status": self.status,
+            "elapsed_ms": elapsed,
+            "steps": dict(self.steps),
+            "seeds": dict(self.seeds) if self.seed_file else None
+        }
+
+
+# Singleton instance
+startup_warmup = WarmupService(
+    enabled=os.getenv("STARTUP_WARMUP", "true").lower() == "true",
+    seed_file=os.getenv("WARMUP_SEED_FILE") or None,
+    seed_limit=int(os.getenv("WARMUP_SEED_LIMIT", "50")),
+    concurrency=int(os.getenv("WARMUP_CONCURRENCY", "2")),
+    interval=float(os.getenv("WARMUP_INTERVAL", "0.5"))
+)
@@ -0,0 +1,112 @@
+"""
+Test unitario del mood cache acotado: expulsión LRU / W-TinyLFU, tope en
+MB y TTL por entrada (corto para los resultados de fallback).
+"""
+import os
+import tempfile
+import time
+
+from services.bounded_cache import BoundedCache
+from services.mood_cache_service import MoodCacheService
+
+RESULT = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_lru_bounds_entries_bytes_and_ttl():
+    clock = FakeClock()
+    evicted = []
+    cache = BoundedCache(max_entries=3, max_bytes=0, ttl=10, clock=clock,
+                         on_evict=lambda key, reason: evicted.append((key, reason)))
+    for key in ("a", "b", "c"):
+        cache[key] = RESULT
+    assert cache.get("a") == RESULT  # "b" pasa a ser la menos usada
+    cache["d"] = RESULT
+    assert set(cache) == {"a", "c", "d"} and evicted == [("b", "size")]
+    
+    cache.set("short", RESULT, ttl=1)
+    clock.now += 2
+    assert "short" not in cache and cache.get("short") is None
+    assert evicted[-1] == ("short", "expired")
+    clock.now += 10
+    assert cache.purge_expired() == 2 and len(cache) == 0
+    
+    # Tope en bytes: caben pocas entradas aunque max_entries sea grande
+    by_size = BoundedCache(max_entries=1000, max_bytes=20_000)
+    for i in range(100):
+        by_size[f"query number {i}"] = RESULT
+    assert by_size.bytes <= 20_000 and 0 < len(by_size) < 100
+    assert by_size.evictions["size"] == 100 - len(by_size)
+    print(f"✅ LRU: {by_size.get_stats()}")
+
+
+def test_tinylfu_keeps_popular_entries_under_a_scan():
+    lru = BoundedCache(max_entries=100, max_bytes=0, policy="lru")
+    tinylfu = BoundedCache(max_entries=100, max_bytes=0, policy="tinylfu")
+    popular = [f"popular {i}" for i in range(50)]
+    for cache in (lru, tinylfu):
+        for _ in range(10):
+            for key in popular:
+                if cache.get(key) is None:
+                    cache[key] = RESULT
+        # Ráfaga de queries que solo aparecen una vez
+        for i in range(500):
+            key = f"one-off {i}"
+            if cache.get(key) is None:
+                cache[key] = RESULT
+    
+    kept_lru = sum(key in lru for key in popular)
+    kept_tinylfu = sum(key in tinylfu for key in popular)
+    # El sketch es probabilístico: alguna query única puede colisionar con
+    # contadores de las populares en todas las filas y ganar la admisión
+    assert kept_lru == 0 and kept_tinylfu >= 0.9 * len(popular)
+    assert len(tinylfu) <= 100 and tinylfu.evictions["rejected"] > 0
+    print(f"✅ Popular entries kept: lru={kept_lru} tinylfu={kept_tinylfu}")
+
+
+def test_fallback_entries_expire_and_index_follows_evictions():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        cache = MoodCacheService(cache_file=cache_file, fsync_interval=0.01, max_entries=2,
+                                 fallback_ttl=0.2)
+        cache.add("late night drive", RESULT)
+        cache.add("hf is down right now", {**RESULT, "genres": ["pop"]}, fallback=True)
+        cache.add("gym session", {**RESULT, "energy": "high"})
+        # La más antigua salió del caché y del índice
+        assert len(cache.cache) == 2 and len(cache.index) == 2
+        assert cache.get_similar("late night drives") is None
+        
+        assert cache.get_similar("hf is down right now")["genres"] == ["pop"]
+        assert cache.flush()
+        
+        # La expiración del fallback se persiste en el journal
+        reloaded = MoodCacheService(cache_file=cache_file, max_entries=2, fallback_ttl=0.2)
+        assert set(reloaded.cache) == {cache.make_key("hf is down right now"), cache.make_key("gym session")}
+        time.sleep(0.25)
+        assert reloaded.get_similar("hf is down right now") is None
+        assert reloaded.get_similar("gym session") is not None
+        assert len(reloaded.index) == 1
+        cache.close()
+        
+        # Al compactar, las expiraciones pasan al fichero .expiry.json
+        cache.add("sunday morning", RESULT, fallback=True)
+        cache.close()
+        assert os.path.exists(cache.expiry_file)
+        compacted = MoodCacheService(cache_file=cache_file, fallback_ttl=0.2)
+        assert compacted.make_key("sunday morning") in compacted.cache
+        time.sleep(0.25)
+        assert compacted.make_key("sunday morning") not in compacted.cache
+        print(f"✅ Fallback TTL: {compacted.get_stats()['limits']}")
+
+
+if __name__ == "__main__":
+    test_lru_bounds_entries_bytes_and_ttl()
+    test_tinylfu_keeps_popular_entries_under_a_scan()
+    test_fallback_entries_expire_and_index_follows_evictions()
@@ -51,18 +51,18 @@ async def test_complete_flow():
             print()
             
             for idx, track in enumerate(tracks[:5], 1):
-                artists = ", ".join(track["artists"])
-                duration = track["duration_ms"] // 1000
+                artists = track.artist
+                duration = track.duration
                 minutes = duration // 60
                 seconds = duration % 60
                 
-                print(f"   {idx}. 🎵 {track['name']}")
+                print(f"   {idx}. 🎵 {track.title}")
                 print(f"      👤 {artists}")
-                print(f"      💿 {track['album']}")
+                print(f"      💿 {track.album}")
                 print(f"      ⏱️  {minutes}:{seconds:02d}")
-                print(f"      🔗 {track['external_url']}")
-                if track.get('preview_url'):
-                    print(f"      🎧 Preview: {track['preview_url']}")
+                print(f"      🔗 {track.deezer_link}")
+                if track.preview_url:
+                    print(f"      🎧 Preview: {track.preview_url}")
                 print()
         else:
             print(f"\n❌ Error: {results.get('error')}")
@@ -0,0 +1,129 @@
+"""
+Test del emulador local de Deezer (benchmarks/deezer_emulator.py)
+Lo monta vía httpx.ASGITransport: sin red ni servidor.
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from deezer_emulator import EmulatorConfig, create_app
+from services.deezer_service import DeezerService
+
+
+def make_config(**overrides) -> EmulatorConfig:
+    config = EmulatorConfig(catalog_size=500, search_latency=0, user_latency=0, write_latency=0)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+def make_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://emulator")
+
+
+def test_search_and_deezer_service_against_emulator():
+    app = create_app(make_config())
+    
+    async def run():
+        async with make_client(app) as client:
+            response = await client.get("/search", params={"q": "lo-fi ambient", "limit": 10})
+            body = response.json()
+            assert len(body["data"]) == 10
+            assert body["total"] > 10 and "next" in body
+            
+            service = DeezerService()
+            service._client = make_client(app)
+            result = await service.search_tracks_async(["calm"], ["jazz"], "low", 10)
+            await service.aclose()
+            return result
+    
+    result = asyncio.run(run())
+    assert result["success"] and result["tracks"]
+    assert result["query_used"] == "jazz"
+
+
+def test_oauth_and_playlist_flow():
+    app = create_app(make_config(strict_tokens=True))
+    
+    async def run():
+        async with make_client(app) as client:
+            redirect = await client.get("/oauth/auth.php", params={"redirect_uri": "http://app/cb", "state": "xyz"})
+            assert redirect.status_code in (302, 307)
+            code = httpx.URL(redirect.headers["location"]).params["code"]
+            
+            token = (await client.get("/oauth/access_token.php", params={"code": code, "output": "json"})).json()
+            params = {"access_token": token["access_token"]}
+            assert (await client.get("/oauth/access_token.php", params={"code": code})).text == "wrong code"
+            
+            user = (await client.get("/user/me", params=params)).json()
+            invalid = (await client.get("/user/me", params={"access_token": "nope"})).json()
+            
+            created = (await client.post("/user/me/playlists", params={**params, "title": "Mood"})).json()
+            playlist_id = created["id"]
+            added = (await client.post(f"/playlist/{playlist_id}/tracks", params={**params, "songs": "1000001,1000002"})).json()
+            duplicate = (await client.post(f"/playlist/{playlist_id}/tracks", params={**params, "songs": "1000001"})).json()
+            tracks = (await client.get(f"/playlist/{playlist_id}/tracks")).json()
+            playlists = (await client.get("/user/me/playlists", params=params)).json()
+            return user, invalid, added, duplicate, tracks, playlists
+    
+    user, invalid, added, duplicate, tracks, playlists = asyncio.run(run())
+    assert user["id"]
+    assert invalid["error"]["code"] == 300
+    assert added is True
+    assert duplicate["error"]["code"] == 801
+    assert [t["id"] for t in tracks["data"]] == [1000001, 1000002]
+    assert playlists["data"][0]["nb_tracks"] == 2
+
+
+def test_quota_and_error_injection():
+    app = create_app(make_config(quota_requests=5, quota_window=60))
+    
+    async def run():
+        async with make_client(app) as client:
+            bodies = [(await client.get("/search", params={"q": "pop", "access_token": "t"})).json() for _ in range(7)]
+            # Otro token tiene su propia ventana
+            other = (await client.get("/search", params={"q": "pop", "access_token": "u"})).json()
+            return bodies, other
+    
+    bodies, other = asyncio.run(run())
+    assert all("data" in b for b in bodies[:5])
+    assert all(b["error"]["code"] == 4 and b["error"]["message"] == "Quota limit exceeded" for b in bodies[5:])
+    assert "data" in other
+    
+    app = create_app(make_config(error_rate=1.0, error_statuses=(429,)))
+    
+    async def run_errors():
+        async with make_client(app) as client:
+            return await client.get("/search", params={"q": "pop"})
+    
+    response = asyncio.run(run_errors())
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert app.state.emulator.injected_errors == 1
+
+
+def test_base_url_overrides():
+    from services.deezer_auth_service import DeezerAuthService
+    
+    os.environ["DEEZER_API_BASE_URL"] = "http://localhost:8001/"
+    os.environ["DEEZER_OAUTH_BASE_URL"] = "http://localhost:8001/oauth"
+    try:
+        assert DeezerService().api_base_url == "http://localhost:8001"
+        auth = DeezerAuthService()
+        assert auth.api_url == "http://localhost:8001"
+        assert auth.oauth_url == "http://localhost:8001/oauth"
+    finally:
+        del os.environ["DEEZER_API_BASE_URL"]
+        del os.environ["DEEZER_OAUTH_BASE_URL"]
+
+
+if __name__ == "__main__":
+    test_search_and_deezer_service_against_emulator()
+    test_oauth_and_playlist_flow()
+    test_quota_and_error_injection()
+    test_base_url_overrides()
+    print("✅ Deezer emulator tests passed")
@@ -0,0 +1,111 @@
+"""
+Test unitario del scheduler de llamadas salientes a Deezer.
+Usa httpx.MockTransport en vez de api.deezer.com.
+"""
+import asyncio
+import time
+
+import httpx
+
+from services.deezer_scheduler import DeezerRateLimited, DeezerScheduler, Priority
+from services.deezer_service import DeezerService
+
+
+def test_tokens_are_granted_by_priority_and_background_is_shed():
+    async def run():
+        scheduler = DeezerScheduler(limit=20, window=1.0, burst=1)
+        await scheduler.acquire(Priority.INTERACTIVE)
+        
+        # Bucket vacío: BACKGROUND se descarta sin esperar
+        try:
+            await scheduler.acquire(Priority.BACKGROUND)
+            assert False, "background should be shed"
+        except DeezerRateLimited as e:
+            assert e.priority == Priority.BACKGROUND
+        
+        order = []
+        
+        async def take(priority, **kwargs):
+            await scheduler.acquire(priority, **kwargs)
+            order.append(priority)
+        
+        # Llegan en orden inverso a su prioridad
+        await asyncio.gather(
+            take(Priority.BACKGROUND, max_wait=2.0),
+            take(Priority.FALLBACK),
+            take(Priority.USER_WRITE),
+        )
+        assert order == [Priority.USER_WRITE, Priority.FALLBACK, Priority.BACKGROUND]
+        return scheduler.get_stats()
+    
+    stats = asyncio.run(run())
+    assert stats["shed"] == {"background": 1}
+    print(f"✅ Scheduler: {stats}")
+
+
+def test_window_limit_and_quota_error_pause():
+    async def run():
+        scheduler = DeezerScheduler(limit=10, window=0.5, burst=5)
+        start = time.monotonic()
+        for _ in range(10):
+            await scheduler.acquire(Priority.INTERACTIVE)
+        # 5 de burst + 5 a 10 tokens/s: no más de `limit` por ventana
+        assert time.monotonic() - start >= 0.45
+        
+        scheduler.report_quota_exceeded(retry_after=0.3)
+        start = time.monotonic()
+        await scheduler.acquire(Priority.INTERACTIVE)
+        assert time.monotonic() - start >= 0.3
+        assert scheduler.get_stats()["quota_errors"] == 1
+    
+    asyncio.run(run())
+
+
+def test_quota_error_from_search_pauses_scheduler():
+    def handler(request):
+        return httpx.Response(200, json={"error": {"type": "Exception", "message": "Quota limit exceeded", "code": 4}})
+    
+    async def run():
+        scheduler = DeezerScheduler(limit=50, window=5.0, burst=5)
+        service = DeezerService(scheduler=scheduler)
+        service._client = httpx.AsyncClient(base_url="http://deezer", transport=httpx.MockTransport(handler))
+        try:
+            result = await service.search_tracks_async(["calm"], ["lo-fi", "ambient"], "low", 10, mode="sequential")
+        finally:
+            await service._client.aclose()
+        return result, scheduler.get_stats()
+    
+    result, stats = asyncio.run(run())
+    # La cuota agotada es un error, no "sin resultados"
+    assert result["success"] is False
+    assert stats["quota_errors"] == 1
+    assert stats["tokens"] == 0
+
+
+
+def test_non_json_429_still_backs_off():
+    def handler(request):
+        # Un proxy/CDN delante de Deezer: 429 con HTML y Retry-After
+        return httpx.Response(429, text="<html>Too Many Requests</html>", headers={"Retry-After": "7"})
+    
+    async def run():
+        scheduler = DeezerScheduler(limit=50, window=5.0, burst=5)
+        service = DeezerService(scheduler=scheduler)
+        service._client = httpx.AsyncClient(base_url="http://deezer", transport=httpx.MockTransport(handler))
+        try:
+            result = await service.search_tracks_async(["calm"], ["lo-fi"], "low", 10, mode="sequential")
+        finally:
+            await service._client.aclose()
+        return result, scheduler.get_stats()
+    
+    result, stats = asyncio.run(run())
+    assert result["success"] is False and "429" in result["error"]
+    assert stats["quota_errors"] == 1
+    assert stats["tokens"] == 0
+
+
+if __name__ == "__main__":
+    test_tokens_are_granted_by_priority_and_background_is_shed()
+    test_window_limit_and_quota_error_pause()
+    test_quota_error_from_search_pauses_scheduler()
+    test_non_json_429_still_backs_off()
@@ -0,0 +1,130 @@
+"""
+Test unitario para DeezerService (búsqueda asíncrona)
+Usa httpx.MockTransport en vez de la API real de Deezer.
+"""
+import asyncio
+import time
+
+import httpx
+
+from services.deezer_scheduler import DeezerScheduler
+from services.deezer_service import DeezerService
+
+
+def make_items(base: int, count: int = 8, artists: int = 4):
+    return [
+        {
+            "id": base + i,
+            "title": f"Track {base + i}",
+            "artist": {"name": f"Artist {(base + i) % artists}"},
+            "album": {"title": "Album", "cover_medium": "https://example.com/cover.jpg"},
+            "link": f"https://www.deezer.com/track/{base + i}",
+            "preview": None,
+            "duration": 180,
+            "rank": base + i
+        }
+        for i in range(count)
+    ]
+
+
+def make_service(handler) -> DeezerService:
+    # Scheduler propio: sin compartir la cuota del singleton con otros tests
+    service = DeezerService(scheduler=DeezerScheduler(limit=1000, window=1.0, burst=100))
+    service._client = httpx.AsyncClient(base_url=service.api_base_url, transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_sequential_falls_back_to_next_strategy():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["q"])
+        items = [] if request.url.params["q"] == "lo-fi ambient" else make_items(0)
+        return httpx.Response(200, json={"data": items})
+
+    service = make_service(handler)
+    result = asyncio.run(service.search_tracks_async(["calm"], ["lo-fi", "ambient"], "low", 10, mode="sequential"))
+
+    assert result["success"]
+    assert result["query_used"] == "lo-fi"
+    assert calls == ["lo-fi ambient", "lo-fi"]
+    print(f"✅ Sequential fallback: {calls}")
+
+
+def test_parallel_merges_and_respects_deadline():
+    async def handler(request):
+        query = request.url.params["q"]
+        if query == "chill ambient":
+            await asyncio.sleep(1.0)  # estrategia lenta: debe descartarse
+        base = {"lo-fi ambient": 0, "lo-fi": 4}.get(query, 100)
+        return httpx.Response(200, json={"data": make_items(base)})
+
+    service = make_service(handler)
+    start = time.perf_counter()
+    result = asyncio.run(service.search_tracks_parallel(["calm"], ["lo-fi", "ambient"], "low", 10, strategy_timeout=0.2))
+    elapsed = time.perf_counter() - start
+
+    ids = [int(t.id) for t in result["tracks"]]
+    artists = [t.artist for t in result["tracks"]]
+
+    assert result["success"]
+    assert elapsed < 0.8
+    assert result["queries_used"] == ["lo-fi ambient", "lo-fi"]
+    assert len(ids) == len(set(ids))
+    assert all(artists.count(a) <= 2 for a in artists)
+    # make_items usa rank == id; el límite por artista se queda con los de
+    # más rank aunque vengan de la segunda estrategia
+    assert ids == [11, 10, 9, 8, 7, 6, 5, 4]
+    print(f"✅ Parallel merge in {elapsed:.2f}s: {ids}")
+
+
+def test_parallel_reports_failure_when_all_strategies_fail():
+    def handler(request):
+        return httpx.Response(503)
+
+    service = make_service(handler)
+    result = asyncio.run(service.search_tracks_parallel(["calm"], ["lo-fi"], "low", 10))
+
+    assert not result["success"]
+    assert result["tracks"] == []
+    print(f"✅ All strategies failed: {result['error'][:60]}...")
+
+
+def test_search_cache_hits_and_stale_refresh():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={"data": make_items(len(calls) * 10)})
+
+    service = make_service(handler)
+    service.search_cache.ttl = 0.05
+
+    async def scenario():
+        first = await service.search_tracks_async(["calm"], ["lo-fi"], "low", 10)
+        # Misma búsqueda normalizada → hit sin llamada HTTP
+        second = await service.search_tracks_async(["calm"], ["  Lo-Fi "], "low", 10)
+        assert len(calls) == 1
+        assert first["tracks"] == second["tracks"]
+
+        # Entrada stale → se sirve al momento y se refresca en background
+        await asyncio.sleep(0.06)
+        stale = await service.search_tracks_async(["calm"], ["lo-fi"], "low", 10)
+        assert stale["tracks"] == first["tracks"]
+        await asyncio.sleep(0.01)
+        assert len(calls) == 2
+
+        refreshed = await service.search_tracks_async(["calm"], ["lo-fi"], "low", 10)
+        assert refreshed["tracks"] != first["tracks"]
+
+    asyncio.run(scenario())
+    stats = service.search_cache.get_stats()
+    assert stats["hits"] == 2 and stats["stale_hits"] == 1 and stats["misses"] == 1
+    print(f"✅ Search cache stats: {stats}")
+
+
+if __name__ == "__main__":
+    test_sequential_falls_back_to_next_strategy()
+    test_parallel_merges_and_respects_deadline()
+    test_parallel_reports_failure_when_all_strategies_fail()
+    test_search_cache_hits_and_stale_refresh()
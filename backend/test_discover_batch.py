@@ -0,0 +1,70 @@
+"""
+Test unitario para POST /api/discover/batch.
+Sustituye el análisis de mood y Deezer por fakes locales.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.mood_cache_service import MoodCacheService
+
+CACHED = {"mood_tags": ["sad", "melancholic"], "energy": "low", "genres": ["ballad", "indie"], "search_query": "sad 2026"}
+
+
+def test_batch_dedupes_and_reports_per_item_errors(fake_discover, monkeypatch):
+    analyzed = []
+
+    async def fake_analyze_mood(query, language="en"):
+        analyzed.append(query)
+        await asyncio.sleep(0.01)
+        if "fail" in query:
+            raise RuntimeError("analyzer down")
+        return {"mood_tags": ["focused"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi 2026"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        # Otra forma de la misma query: el hit pasa por la key canónica
+        cache = MoodCacheService(cache_file=cache_file)
+        cache.add("Sad, after a BREAKUP!", CACHED)
+
+        fake_discover(fake_analyze_mood)
+        monkeypatch.setattr(main, "mood_cache", cache)
+        try:
+            with TestClient(main.app) as client:
+                response = client.post("/api/discover/batch", json={"items": [
+                    {"user_query": "studying late at night", "language": "en"},
+                    {"user_query": "Studying late at night ", "language": "en"},
+                    {"user_query": "sad after a breakup", "language": "en"},
+                    {"user_query": "please fail this one", "language": "en"},
+                ]})
+        finally:
+            cache.close()
+
+        # La entrada sembrada se ha persistido como cualquier otra
+        reopened = MoodCacheService(cache_file=cache_file)
+        assert reopened.get_similar("sad after a breakup") == CACHED
+        reopened.close()
+
+    assert response.status_code == 200
+    body = response.json()
+    results = body["results"]
+
+    assert body["unique_queries"] == 3
+    assert body["cache_hits"] == 1
+    assert sorted(analyzed) == ["please fail this one", "studying late at night"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["success"] and results[0]["result"] == results[1]["result"]
+    assert results[2]["result"]["metadata"]["interpreted_mood"] == "sad, melancholic"
+    assert len(results[0]["result"]["tracks"]) == 10
+    assert not results[3]["success"] and "analyzer down" in results[3]["error"]
+    assert body["success"] is False
+    print(f"✅ Batch: {body['unique_queries']} unique queries, {body['cache_hits']} cache hit")
+
+
+if __name__ == "__main__":
+    # Los tests usan fixtures de conftest.py: se ejecutan a través de pytest
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
@@ -0,0 +1,78 @@
+"""
+Test unitario del camino rápido de POST /api/discover:
+tracks construidos una vez, serialización sin re-validar y caché de bytes.
+"""
+import dataclasses
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import deezer_items
+from services import json_codec
+from services.deezer_service import DeezerTrack
+
+MOOD = {"mood_tags": ["focused", "calm"], "energy": "low", "genres": ["lo-fi", "ambient"], "search_query": "lofi 2026"}
+
+
+def test_codec_fallback_matches_fast_path():
+    track = DeezerTrack.from_deezer(deezer_items(title="Canción")[3])
+    payload = {"success": True, "tracks": [track]}
+    assert json_codec._dumps_stdlib(payload) == json_codec.dumps(payload)
+    assert b'"title":"Canci\xc3\xb3n 3"' in json_codec.dumps(payload)
+
+
+def test_track_schema_matches_deezer_track():
+    # La respuesta no se re-valida: el schema publicado tiene que ser el de DeezerTrack
+    assert {f.name: f.type for f in dataclasses.fields(DeezerTrack)} == {
+        name: field.annotation for name, field in main.Track.model_fields.items()
+    }
+    item = deezer_items()[0]
+    del item["album"]["cover_medium"]
+    track = DeezerTrack.from_deezer(item)
+    assert main.Track.model_validate(dataclasses.asdict(track)).cover_image is None
+
+
+def test_discover_serves_cached_bytes_for_repeated_queries(fake_discover):
+    analyzed = []
+
+    async def fake_analyze_mood(query, language="en"):
+        analyzed.append(query)
+        return MOOD
+
+    def deezer_handler(request):
+        return httpx.Response(200, json={"data": deezer_items(title="Canción")})
+
+    fake_discover(fake_analyze_mood, deezer_handler)
+    with TestClient(main.app) as client:
+        first = client.post("/api/discover", json={"user_query": "studying late at night", "language": "en"})
+        second = client.post("/api/discover", json={"user_query": "  Studying late at night", "language": "en"})
+        other_language = client.post("/api/discover", json={"user_query": "studying late at night", "language": "es"})
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/json"
+    assert first.content == second.content
+    assert analyzed == ["studying late at night", "studying late at night"]
+    assert other_language.status_code == 200
+
+    body = first.json()
+    # Mismo contrato que DiscoverResponse
+    main.DiscoverResponse.model_validate(body)
+    assert len(body["tracks"]) == 10
+    assert body["tracks"][0] == {
+        "id": "11",
+        "title": "Canción 11",
+        "artist": "Artist 11",
+        "album": "Album",
+        "preview_url": None,
+        "deezer_link": "https://www.deezer.com/track/11",
+        "cover_image": "https://example.com/c.jpg",
+        "duration": 200
+    }
+    assert main.discover_response_cache.get_stats()["hits"] == 1
+
+
+if __name__ == "__main__":
+    # Los tests usan fixtures de conftest.py: se ejecutan a través de pytest
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
@@ -0,0 +1,102 @@
+"""
+Test unitario para POST /api/discover/stream (NDJSON y SSE).
+Sustituye el análisis de mood y Deezer por fakes locales.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import deezer_items
+
+MOOD = {"mood_tags": ["focused", "calm"], "energy": "low", "genres": ["lo-fi", "ambient"], "search_query": "lofi 2026"}
+
+
+async def deezer_handler(request):
+    query = request.url.params["q"]
+    if query == "chill ambient":
+        await asyncio.sleep(0.05)
+    base = {"lo-fi ambient": 0, "lo-fi": 3, "chill ambient": 100}[query]
+    return httpx.Response(200, json={"data": deezer_items(base, count=6)})
+
+
+def run_stream(fake_discover, headers=None, handler=deezer_handler, cached=None):
+    fake_discover(MOOD, handler)
+    for search_query, items in (cached or {}).items():
+        main.deezer_service.search_cache.set(main.deezer_service._cache_key(search_query, 10), items)
+    with TestClient(main.app) as client:
+        return client.post(
+            "/api/discover/stream",
+            json={"user_query": "studying late at night", "language": "en"},
+            headers=headers or {}
+        )
+
+
+def test_ndjson_stream_sends_metadata_first_then_tracks(fake_discover):
+    response = run_stream(fake_discover)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    types = [e["type"] for e in events]
+
+    assert types[0] == "metadata"
+    assert events[0]["metadata"]["interpreted_mood"] == "focused, calm"
+    assert types[-1] == "done"
+    tracks = [e["track"] for e in events if e["type"] == "track"]
+    assert len(tracks) == events[-1]["total"] == 10
+    assert len({t["id"] for t in tracks}) == 10
+    print(f"✅ NDJSON stream: {len(events)} events")
+
+
+def test_strategies_are_streamed_in_priority_order(fake_discover):
+    calls = []
+
+    async def slow_first_strategy(request):
+        calls.append(request.url.params["q"])
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"data": deezer_items(0, count=6)})
+
+    # La estrategia de respaldo ya está en caché y respondería antes: sus
+    # tracks tienen que ir detrás de los de la estrategia por géneros
+    response = run_stream(fake_discover, handler=slow_first_strategy, cached={"chill ambient": deezer_items(100, count=6)})
+    tracks = [json.loads(line)["track"] for line in response.text.splitlines()[1:-1]]
+    assert [t["id"] for t in tracks[:6]] == ["5", "4", "3", "2", "1", "0"]
+    assert [t["id"] for t in tracks[6:]] == ["105", "104", "103", "102"]
+    assert calls == ["lo-fi ambient", "lo-fi"]
+
+    # Si la primera estrategia llena el límite no se lanzan las demás
+    calls.clear()
+
+    async def full_first_strategy(request):
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={"data": deezer_items(0)})
+
+    response = run_stream(fake_discover, handler=full_first_strategy)
+    assert json.loads(response.text.splitlines()[-1])["total"] == 10
+    assert calls == ["lo-fi ambient"]
+    print("✅ Priority order")
+
+
+def test_failed_search_emits_error_instead_of_empty_done(fake_discover):
+    def unavailable(request):
+        return httpx.Response(503)
+
+    response = run_stream(fake_discover, handler=unavailable)
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["type"] for e in events] == ["metadata", "error"]
+    print(f"✅ Stream error: {events[-1]['error']}")
+
+
+def test_sse_stream(fake_discover):
+    response = run_stream(fake_discover, {"Accept": "text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: metadata\ndata: ")
+    assert "event: done" in response.text
+
+
+if __name__ == "__main__":
+    # Los tests usan fixtures de conftest.py: se ejecutan a través de pytest
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
@@ -0,0 +1,58 @@
+"""
+Test unitario para el cliente asíncrono de Hugging Face.
+Usa httpx.MockTransport en vez de la Inference API real.
+"""
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from services import huggingface_service
+from services.huggingface_service import HuggingFaceClient, analyze_with_huggingface
+
+CONTENT = '```json\n{"mood_tags": ["focused", "calm"], "energy": "Low", "genres": ["lo-fi", "ambient"], "search_query": "lofi study"}\n```'
+
+
+def test_analysis_is_non_blocking_and_reuses_client():
+    requests_seen = []
+
+    async def handler(request):
+        requests_seen.append(request)
+        await asyncio.sleep(0.2)  # latencia simulada del LLM
+        return httpx.Response(200, json={"choices": [{"message": {"content": CONTENT}}]})
+
+    client = HuggingFaceClient()
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    original_client = huggingface_service.hf_client
+    original_token = os.environ.get("HUGGINGFACE_TOKEN")
+    huggingface_service.hf_client = client
+    os.environ["HUGGINGFACE_TOKEN"] = "hf_test"
+
+    try:
+        async def run():
+            start = time.perf_counter()
+            results = await asyncio.gather(*(analyze_with_huggingface(f"studying late {i}") for i in range(5)))
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+    finally:
+        huggingface_service.hf_client = original_client
+        if original_token is None:
+            os.environ.pop("HUGGINGFACE_TOKEN", None)
+        else:
+            os.environ["HUGGINGFACE_TOKEN"] = original_token
+
+    assert elapsed < 0.6, f"analyses were serialized ({elapsed:.2f}s)"
+    assert all(r["energy"] == "low" and "2026" in r["search_query"] for r in results)
+
+    request = requests_seen[0]
+    assert request.url.path == f"/models/{huggingface_service.HF_MODEL}/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer hf_test"
+    assert json.loads(request.content)["max_tokens"] == 250
+    print(f"✅ 5 concurrent analyses in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_analysis_is_non_blocking_and_reuses_client()
@@ -0,0 +1,89 @@
+"""
+Test unitario para el analizador léxico de mood (sin red).
+"""
+import datetime
+import time
+
+from services.lexicon_service import AhoCorasick, lexicon_analyzer
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    matcher = AhoCorasick()
+    for pattern in ["he", "she", "his", "hers"]:
+        matcher.add(pattern, pattern)
+    found = sorted((start, payload) for start, _, payload in matcher.iter_matches("ushers"))
+    assert found == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_confident_queries_in_both_languages():
+    cases = [
+        ("triste después de una ruptura", "es", "low", "balada"),
+        ("working out at the gym", "en", "high", "hip-hop"),
+        ("fiesta en la playa con amigos", "es", "high", "reggaeton"),
+        ("studying late at night, need focus", "en", "low", "lo-fi"),
+    ]
+    for query, _, energy, genre in cases:
+        result, confidence = lexicon_analyzer.analyze(query)
+        print(f"   {confidence:.2f} '{query}' → {result}")
+        assert confidence >= 0.8
+        assert result["energy"] == energy
+        assert genre in result["genres"]
+        assert str(datetime.date.today().year) in result["search_query"]
+
+    result, _ = lexicon_analyzer.analyze("triste después de una ruptura")
+    assert result["mood_tags"][0] == "triste"
+
+
+def test_ambiguous_queries_have_low_confidence():
+    result, confidence = lexicon_analyzer.analyze("something for this evening")
+    assert result is None and confidence == 0.0
+
+    # Dos categorías igual de fuertes → ambiguo, mejor preguntar al LLM
+    _, confidence = lexicon_analyzer.analyze("studying with rain and coffee")
+    assert confidence < 0.8
+
+    # Palabras sin match ("late", "work") o un género que la categoría no da
+    # ("metal" en workout) → no basta el léxico
+    for query in ["running late for work need energy", "heavy metal workout session at the gym"]:
+        _, confidence = lexicon_analyzer.analyze(query)
+        print(f"   {confidence:.2f} '{query}'")
+        assert confidence < 0.8
+    _, confidence = lexicon_analyzer.analyze("hip hop workout")
+    assert confidence >= 0.8
+
+
+def test_terms_shared_by_both_languages_count_once():
+    # "yoga" está en las listas EN y ES de relax, "calm" solo en la EN
+    shared = lexicon_analyzer.analyze("need some yoga tonight")
+    single = lexicon_analyzer.analyze("need some calm tonight")
+    assert shared == single
+    _, confidence = lexicon_analyzer.analyze("gym")
+    assert confidence < 1.0
+    
+    # "solo" (= "just") no es tristeza
+    result, _ = lexicon_analyzer.analyze("solo quiero bailar")
+    assert "triste" not in result["mood_tags"]
+
+
+def test_word_boundaries():
+    # "run" no debe hacer match dentro de "brunch"
+    result, _ = lexicon_analyzer.analyze("brunch on saturday")
+    assert result is None
+
+
+def test_latency_is_microseconds():
+    start = time.perf_counter()
+    for _ in range(1000):
+        lexicon_analyzer.analyze("estudiando para examen final a las 3am con café")
+    per_call_us = (time.perf_counter() - start) * 1000
+    print(f"✅ {per_call_us:.1f}µs per analysis")
+    assert per_call_us < 1000
+
+
+if __name__ == "__main__":
+    test_aho_corasick_finds_overlapping_patterns()
+    test_confident_queries_in_both_languages()
+    test_ambiguous_queries_have_low_confidence()
+    test_terms_shared_by_both_languages_count_once()
+    test_word_boundaries()
+    test_latency_is_microseconds()
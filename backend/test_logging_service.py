@@ -0,0 +1,58 @@
+"""
+Test unitario del pipeline de logging (cola + listener, campos, sampling).
+"""
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from services.logging_service import DebugSampler, StructuredFormatter, StructuredLogger, _Handler
+
+
+def make_logger(name: str, json_output: bool = False, debug_sample: int = 1):
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(StructuredFormatter(json_output))
+    
+    log_queue = queue.SimpleQueue()
+    handler = _Handler(log_queue)
+    handler.addFilter(DebugSampler(debug_sample))
+    logger = logging.getLogger(f"moodtune.test.{name}")
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return StructuredLogger(logger, {}), QueueListener(log_queue, output), stream
+
+
+def test_fields_are_rendered_by_the_listener_thread():
+    log, listener, stream = make_logger("text")
+    log.info("✅ Playlist created", playlist_id="42", tracks=10)
+    # Nada se escribe en el hilo que loguea: solo se encola
+    assert stream.getvalue() == ""
+    
+    listener.start()
+    listener.stop()
+    line = stream.getvalue().strip()
+    assert line.endswith("INFO moodtune.test.text ✅ Playlist created playlist_id='42' tracks=10")
+
+
+def test_json_output_and_debug_sampling():
+    log, listener, stream = make_logger("json", json_output=True, debug_sample=5)
+    listener.start()
+    for i in range(20):
+        log.debug("💾 Added to cache", query=f"q{i}")
+    log.warning("⚠️ Error saving cache", error="disk full")
+    listener.stop()
+    
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    debug = [r for r in records if r["level"] == "DEBUG"]
+    # 1 de cada 5 por punto de llamada; los WARNING no se muestrean
+    assert [r["query"] for r in debug] == ["q0", "q5", "q10", "q15"]
+    assert records[-1]["msg"] == "⚠️ Error saving cache" and records[-1]["error"] == "disk full"
+    assert records[-1]["logger"] == "moodtune.test.json"
+
+
+if __name__ == "__main__":
+    test_fields_are_rendered_by_the_listener_thread()
+    test_json_output_and_debug_sampling()
@@ -0,0 +1,77 @@
+"""
+Test unitario para el registro de métricas y el endpoint /metrics.
+"""
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from services.metrics_service import MetricsRegistry
+from services.mood_cache_service import MoodCacheService
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ["outcome"])
+    latency = registry.histogram("test_latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    registry.gauge("test_entries", "Entries", function=lambda: 42)
+
+    requests.labels(outcome="ok").inc()
+    requests.labels(outcome="ok").inc()
+    requests.labels(outcome="error").inc()
+    latency.labels(stage="cache").observe(0.05)
+    latency.labels(stage="cache").observe(0.5)
+    latency.labels(stage="cache").observe(5)
+
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{outcome="ok"} 2' in text
+    assert 'test_requests_total{outcome="error"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="cache",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="cache",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="cache",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{stage="cache"} 3' in text
+    assert "test_entries 42" in text
+    print("✅ Prometheus text format OK")
+
+
+def test_observe_overhead_is_negligible():
+    registry = MetricsRegistry()
+    child = registry.histogram("test_hot_seconds", "Hot path", ["stage"]).labels(stage="x")
+    start = time.perf_counter()
+    for _ in range(100_000):
+        child.observe(0.003)
+    per_observe_ns = (time.perf_counter() - start) / 100_000 * 1e9
+    print(f"✅ {per_observe_ns:.0f}ns per observe")
+    assert per_observe_ns < 5_000
+
+
+def test_metrics_endpoint():
+    with TestClient(main.app) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "moodtune_mood_cache_entries" in response.text
+    assert "# TYPE moodtune_discover_stage_seconds histogram" in response.text
+
+
+
+def test_scrape_does_not_load_the_mood_cache():
+    original = main.mood_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        main.mood_cache = MoodCacheService(cache_file=os.path.join(tmp, "mood_cache.json"))
+        try:
+            text = main.registry.render()
+            assert "moodtune_mood_cache_entries 0" in text
+            assert not main.mood_cache.loaded
+        finally:
+            main.mood_cache = original
+
+
+if __name__ == "__main__":
+    test_prometheus_text_format()
+    test_observe_overhead_is_negligible()
+    test_metrics_endpoint()
+    test_scrape_does_not_load_the_mood_cache()
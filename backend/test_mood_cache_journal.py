@@ -0,0 +1,75 @@
+"""
+Test unitario para la persistencia del mood cache (snapshot + journal).
+Usa un directorio temporal, nunca toca datasets/mood_cache.json.
+"""
+import json
+import os
+import tempfile
+
+from services.mood_cache_service import MoodCacheService
+
+RESULT = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi 2026"}
+
+
+def test_add_appends_to_journal_and_replays():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        cache = MoodCacheService(cache_file=cache_file, fsync_interval=0.01)
+        cache.add("Studying late at night", RESULT)
+        cache.add("gym workout", {**RESULT, "energy": "high"})
+        assert cache.flush()
+
+        with open(cache.journal_file, encoding="utf-8") as f:
+            lines = f.readlines()
+        assert len(lines) == 2
+        assert not os.path.exists(cache_file)  # el snapshot no se reescribe en add()
+
+        reloaded = MoodCacheService(cache_file=cache_file)
+        assert reloaded.cache[reloaded.make_key("studying late at night")] == RESULT
+        assert reloaded.cache[reloaded.make_key("gym workout")]["energy"] == "high"
+        cache.close()
+        print(f"✅ Journal replayed: {len(reloaded.cache)} entries")
+
+
+def test_truncated_journal_line_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        journal_file = os.path.join(tmp, "mood_cache.journal.jsonl")
+        with open(journal_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"q": "ok entry", "r": RESULT}) + "\n")
+            f.write('{"q": "half writ')  # crash a mitad de un append
+
+        cache = MoodCacheService(cache_file=cache_file)
+        assert list(cache.cache) == [cache.make_key("ok entry")]
+
+        # El journal quedó truncado y admite appends nuevos sin corromperse
+        cache.add("another entry", RESULT)
+        cache.close()
+        reloaded = MoodCacheService(cache_file=cache_file)
+        assert set(reloaded.cache) == {cache.make_key("ok entry"), cache.make_key("another entry")}
+        print("✅ Truncated journal line ignored")
+
+
+def test_compaction_writes_snapshot_and_resets_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        cache = MoodCacheService(cache_file=cache_file, fsync_interval=0.01, compact_every=5)
+        for i in range(7):
+            cache.add(f"query number {i}", RESULT)
+        assert cache.flush()
+
+        with open(cache_file, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert len(snapshot) >= 5
+        assert os.path.getsize(cache.journal_file) < 7 * 80
+
+        cache.close()
+        reloaded = MoodCacheService(cache_file=cache_file)
+        assert len(reloaded.cache) == 7
+        print(f"✅ Compacted snapshot with {len(snapshot)} entries")
+
+
+if __name__ == "__main__":
+    test_add_appends_to_journal_and_replays()
+    test_truncated_journal_line_is_ignored()
+    test_compaction_writes_snapshot_and_resets_journal()
@@ -0,0 +1,202 @@
+"""
+Test unitario para la creación asíncrona de playlists (mode=job).
+Usa el emulador local de Deezer y MockTransport: sin red.
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+import main
+from deezer_emulator import EmulatorConfig, create_app
+from services.deezer_auth_service import DeezerAPIError, DeezerAuthService
+from services.playlist_job_service import PlaylistJobService
+
+TRACK_IDS = [str(1_000_000 + i) for i in range(50)]
+BODY = {"track_ids": TRACK_IDS, "mood_name": "Focus", "genres": ["lo-fi"], "energy": "low"}
+
+
+def test_job_mode_returns_immediately_and_completes():
+    emulator = create_app(EmulatorConfig(catalog_size=200, search_latency=0, user_latency=0, write_latency=0.02))
+    auth = main.deezer_auth_service
+    original = (auth._client, auth.api_url, auth.add_chunk_size)
+    auth._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=emulator))
+    auth.api_url = "http://emulator"
+    auth.add_chunk_size = 20
+    try:
+        with TestClient(main.app) as client:
+            client.cookies.set("deezer_token", "token-a")
+            headers = {"Idempotency-Key": "focus-1"}
+            start = time.perf_counter()
+            queued = client.post("/api/playlist/create?mode=job", json=BODY, headers=headers)
+            elapsed = time.perf_counter() - start
+            again = client.post("/api/playlist/create?mode=job", json=BODY, headers=headers)
+
+            assert queued.status_code == 202
+            job = queued.json()
+            assert again.json()["job_id"] == job["job_id"]
+            assert job["status_url"] == f"/api/playlist/jobs/{job['job_id']}"
+
+            for _ in range(100):
+                status = client.get(job["status_url"]).json()
+                if status["status"] in ("succeeded", "failed"):
+                    break
+                time.sleep(0.02)
+
+            client.cookies.set("deezer_token", "token-b")
+            assert client.get(job["status_url"]).status_code == 404
+    finally:
+        auth._client, auth.api_url, auth.add_chunk_size = original
+
+    assert elapsed < 0.5
+    assert status["status"] == "succeeded", status
+    assert status["tracks_added"] == status["tracks_total"] == 50
+    playlist = emulator.state.emulator.playlists[int(status["playlist_id"])]
+    # Los lotes van en paralelo: el orden final no está garantizado
+    assert sorted(playlist["tracks"]) == sorted(int(t) for t in TRACK_IDS)
+    assert len(emulator.state.emulator.playlists) == 1
+    print(f"✅ Playlist job {job['job_id']} queued in {elapsed * 1000:.1f}ms and completed")
+
+
+def test_add_tracks_retry_is_idempotent():
+    """La primera escritura llega a Deezer pero la respuesta se pierde (503)"""
+    playlist = []
+    calls = []
+
+    def handler(request):
+        path = request.url.path
+        calls.append((request.method, path))
+        if request.method == "POST" and path == "/user/me/playlists":
+            return httpx.Response(200, json={"id": 42})
+        if request.method == "POST" and path.endswith("/tracks"):
+            songs = request.url.params["songs"].split(",")
+            if any(s in playlist for s in songs):
+                return httpx.Response(200, json={"error": {"type": "DataException", "message": "exists", "code": 801}})
+            playlist.extend(songs)
+            if len(calls) == 2:
+                return httpx.Response(503)
+            return httpx.Response(200, json=True)
+        if request.method == "GET" and path.endswith("/tracks"):
+            return httpx.Response(200, json={"data": [{"id": int(s)} for s in playlist]})
+        return httpx.Response(404)
+
+    auth = DeezerAuthService()
+    auth.api_url = "http://deezer"
+    auth.add_chunk_size = 10
+    auth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        result = await auth.create_mood_playlist_async("token", "Calm", TRACK_IDS[:10] + TRACK_IDS[:3])
+        await auth.aclose()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["id"] == "42" and result["tracks_count"] == 10
+    assert playlist == TRACK_IDS[:10]
+    assert [c[0] for c in calls] == ["POST", "POST", "POST", "GET"]
+    print(f"✅ Idempotent retry: {calls}")
+
+
+def test_failed_chunk_returns_the_partial_playlist():
+    """Un lote falla: la playlist existe, se devuelve con lo añadido y el resto de lotes se cancela"""
+    added = []
+    started = []
+    cancelled = []
+
+    async def handler(request):
+        if request.method == "POST" and request.url.path == "/user/me/playlists":
+            return httpx.Response(200, json={"id": 42})
+        songs = request.url.params["songs"].split(",")
+        started.append(songs[0])
+        if songs[0] == TRACK_IDS[10]:
+            return httpx.Response(200, json={"error": {"type": "DataException", "message": "bad track", "code": 800}})
+        if songs[0] != TRACK_IDS[0]:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(songs[0])
+                raise
+        added.extend(songs)
+        return httpx.Response(200, json=True)
+
+    auth = DeezerAuthService()
+    auth.api_url = "http://deezer"
+    auth.add_chunk_size = 10
+    auth.add_concurrency = 3
+    auth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        try:
+            await auth.create_mood_playlist_async("token", "Calm", TRACK_IDS[:30])
+            raise AssertionError("expected DeezerAPIError")
+        except DeezerAPIError:
+            pass
+        added.clear()
+        started.clear()
+        cancelled.clear()
+        start = time.perf_counter()
+        result = await auth.create_mood_playlist_async("token", "Calm", TRACK_IDS[:50], partial=True)
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.05)
+        await auth.aclose()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(scenario())
+    assert result["id"] == "42" and result["tracks_count"] == 10 and result["error"]
+    assert added == TRACK_IDS[:10]
+    # Los lotes en curso se cancelan y los pendientes no llegan a empezar
+    assert elapsed < 0.5
+    assert cancelled == started[2:] and TRACK_IDS[40] not in started
+    print(f"✅ Partial playlist: {result['tracks_count']} tracks, {result['error']}")
+
+
+def test_create_playlist_is_not_retried_on_ambiguous_failures():
+    """Un timeout de lectura pudo crear la playlist: no se repite el POST"""
+    calls = []
+    failures = []
+
+    def handler(request):
+        calls.append(request.method)
+        if failures:
+            raise failures.pop(0)
+        return httpx.Response(200, json={"id": 42})
+
+    auth = DeezerAuthService()
+    auth.api_url = "http://deezer"
+    auth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    jobs = PlaylistJobService(workers=1, max_attempts=3)
+    jobs.auth = auth
+
+    async def scenario():
+        # Fallo al conectar: la petición no salió, se reintenta
+        failures.append(httpx.ConnectError("connection refused"))
+        assert await auth.create_playlist_async("token", "Mood: Calm") == "42"
+        assert len(calls) == 2
+
+        # Timeout de lectura: ni _api_call ni el trabajo reintentan
+        calls.clear()
+        failures.append(httpx.ReadTimeout("read timed out"))
+        jobs.start()
+        job = jobs.submit("token", "Calm", TRACK_IDS[:5])
+        while not job.finished:
+            await asyncio.sleep(0.01)
+        await jobs.aclose()
+        await auth.aclose()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "failed" and job.attempts == 1
+    assert calls == ["POST"]
+    print(f"✅ Ambiguous create not retried: {job.error}")
+
+
+if __name__ == "__main__":
+    test_job_mode_returns_immediately_and_completes()
+    test_add_tracks_retry_is_idempotent()
+    test_failed_chunk_returns_the_partial_playlist()
+    test_create_playlist_is_not_retried_on_ambiguous_failures()
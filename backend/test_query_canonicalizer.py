@@ -0,0 +1,106 @@
+"""
+Test unitario del canonicalizador de queries (keys del mood cache).
+"""
+import json
+import os
+import tempfile
+
+from services import mood_cache_service
+from services.mood_cache_service import MoodCacheService
+from services.query_canonicalizer import QueryCanonicalizer
+from services.sqlite_mood_cache import SQLiteMoodCacheService
+
+RESULT = {"mood_tags": ["focused"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+
+
+def test_variants_share_one_canonical_key():
+    canonicalizer = QueryCanonicalizer()
+    same = [
+        "Studying late night, need focus!!",
+        "studying late night need focus",
+        "  need focus... studying LATE night 🎧",
+        "music for studying late at night, need focus",
+    ]
+    keys = {canonicalizer.canonicalize(query) for query in same}
+    assert keys == {"focus late need night studying"}
+    assert canonicalizer.key_hash(same[0]) == canonicalizer.key_hash(same[1])
+    assert len(canonicalizer.key_hash(same[0])) == 16
+    
+    assert canonicalizer.canonicalize("Triste después de una ruptura 💔") == "despues ruptura triste"
+    assert canonicalizer.canonicalize("I don't want sad songs") == "dont sad want"
+    # Negaciones, solo stopwords y solo emojis no colapsan en la misma key
+    assert canonicalizer.canonicalize("sad") != canonicalizer.canonicalize("not sad")
+    assert canonicalizer.canonicalize("sin energía") != canonicalizer.canonicalize("energía")
+    assert canonicalizer.canonicalize("it is what it is") == "is it what"
+    assert canonicalizer.canonicalize("☕☕") == "☕☕"
+    
+    assert QueryCanonicalizer(enabled=False).canonicalize(" Hola! ") == "hola!"
+    print(f"✅ Canonical key: {keys}")
+
+
+def test_mood_cache_exact_hits_and_legacy_keys():
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = os.path.join(tmp, "mood_cache.json")
+        with open(seed_file, "w", encoding="utf-8") as f:
+            # Snapshot con keys antiguas (lower + strip)
+            f.write('{"estudiando con lluvia y café ☕": {"mood_tags": ["calm"], "energy": "low", '
+                    '"genres": ["lo-fi"], "search_query": "lofi"}}')
+        
+        cache = MoodCacheService(cache_file=os.path.join(tmp, "mood_cache.local.json"), import_file=seed_file)
+        assert list(cache.cache) == ["cafe estudiando lluvia"]
+        assert cache.get_similar("Estudiando con lluvia y cafe") is not None
+        
+        cache.add("Studying late night, need focus!!", RESULT)
+        for variant in ("studying late night need focus", "need focus, studying late night 🎧"):
+            # Hit exacto en el dict, sin pasar por el índice de trigramas
+            assert cache.make_key(variant) in cache.cache
+            assert cache.get_similar(variant) == RESULT
+        assert len(cache.cache) == 2 and len(cache.index) == 2
+        cache.close()
+        print(f"✅ Exact hits on canonical keys: {list(cache.cache)}")
+
+
+def test_original_queries_survive_compaction_and_the_seed_is_never_rewritten():
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = os.path.join(tmp, "mood_cache.json")
+        cache_file = os.path.join(tmp, "mood_cache.local.json")
+        with open(seed_file, "w", encoding="utf-8") as f:
+            json.dump({"Estudiando con lluvia y café": RESULT}, f, ensure_ascii=False)
+        with open(seed_file, "rb") as f:
+            seed = f.read()
+        
+        cache = MoodCacheService(cache_file=cache_file, import_file=seed_file)
+        cache.add("Studying late  night, need focus!!", RESULT)
+        cache.close()
+        
+        with open(seed_file, "rb") as f:
+            assert f.read() == seed
+        # En disco quedan las queries originales, no las keys canónicas
+        with open(cache_file, "r", encoding="utf-8") as f:
+            assert set(json.load(f)) == {"Estudiando con lluvia y café", "Studying late night, need focus!!"}
+        
+        # Con MOOD_CACHE_CANONICALIZE=false se vuelve a lower + strip
+        original = mood_cache_service.query_canonicalizer
+        mood_cache_service.query_canonicalizer = QueryCanonicalizer(enabled=False)
+        try:
+            reopened = MoodCacheService(cache_file=cache_file, import_file=seed_file)
+            assert set(reopened.cache) == {"estudiando con lluvia y café", "studying late night, need focus!!"}
+            reopened.close()
+            
+            sqlite_cache = SQLiteMoodCacheService(db_file=os.path.join(tmp, "mood_cache.db"), import_file=seed_file)
+            assert sqlite_cache.get_similar("estudiando con lluvia y café", threshold=0.99) == RESULT
+            sqlite_cache.close()
+        finally:
+            mood_cache_service.query_canonicalizer = original
+        
+        # La base SQLite recalcula sus keys al volver a canonicalizar
+        sqlite_cache = SQLiteMoodCacheService(db_file=os.path.join(tmp, "mood_cache.db"), import_file=seed_file)
+        assert sqlite_cache.get_similar("cafe lluvia estudiando", threshold=0.99) == RESULT
+        sqlite_cache.close()
+        print("✅ Original queries kept, seed untouched")
+
+
+if __name__ == "__main__":
+    test_variants_share_one_canonical_key()
+    test_mood_cache_exact_hits_and_legacy_keys()
+    test_original_queries_survive_compaction_and_the_seed_is_never_rewritten()
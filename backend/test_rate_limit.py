@@ -0,0 +1,76 @@
+"""
+Test unitario del rate limit por cliente (GCRA) de /api/discover.
+"""
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.rate_limit_service import RateLimiter
+
+MOOD = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+PLAYLIST = {"track_ids": ["3088638"], "mood_name": "Calma", "genres": ["lo-fi"], "energy": "low"}
+
+
+def deezer_handler(request):
+    return httpx.Response(200, json={"data": []})
+
+
+def test_gcra_burst_refill_and_bounded_memory():
+    limiter = RateLimiter(limit=4, period=0.4, burst=2, max_clients=3, sweep_interval=0.05)
+    
+    assert limiter.check("a") == (True, 0.0)
+    assert limiter.check("a")[0]
+    allowed, wait = limiter.check("a")
+    assert not allowed and 0 < wait <= 0.1
+    
+    # Tras un intervalo vuelve a haber cupo para una petición
+    time.sleep(0.11)
+    assert limiter.check("a")[0]
+    assert not limiter.check("a")[0]
+    
+    # Un coste mayor que burst pasa con el cupo lleno
+    assert limiter.check("b", cost=10)[0]
+    assert not limiter.check("b")[0]
+    
+    # max_clients acota la memoria; el barrido olvida a los que están en reposo
+    limiter.check("c")
+    limiter.check("d")
+    assert len(limiter) == 3 and limiter.evictions == 1
+    time.sleep(0.25)
+    limiter.check("e")
+    assert len(limiter) == 1
+    print(f"✅ GCRA: {limiter.get_stats()}")
+
+
+def test_discover_returns_429_with_retry_after_per_client(fake_discover, monkeypatch):
+    fake_discover(MOOD, deezer_handler)
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter(limit=2, period=3600.0))
+    monkeypatch.setattr(main, "RATE_LIMIT_PROXY_HOPS", 1)
+    with TestClient(main.app) as client:
+        # El cliente puede falsificar las entradas de la izquierda, no la del proxy
+        alice = {"X-Forwarded-For": "6.6.6.6, 10.0.0.1"}
+        spoofed = {"X-Forwarded-For": "7.7.7.7, 10.0.0.1"}
+        body = {"user_query": "quiet rainy morning", "language": "en"}
+        
+        assert client.post("/api/discover", json=body, headers=alice).status_code == 200
+        assert client.post("/api/discover", json=body, headers=spoofed).status_code == 200
+        limited = client.post("/api/discover", json=body, headers=alice)
+        assert limited.status_code == 429
+        assert 1 <= int(limited.headers["Retry-After"]) <= 1800
+        
+        # Un batch cuenta cada item
+        bob = {"X-Forwarded-For": "10.0.0.2"}
+        batch = {"items": [body, body, body]}
+        assert client.post("/api/discover/batch", json=batch, headers=bob).status_code == 200
+        assert client.post("/api/playlist/create", json=PLAYLIST, headers=bob).status_code == 429
+        
+        stats = client.get("/api/health").json()["rate_limit"]
+        assert stats["clients"] == 2 and stats["rejected"] == 2
+
+
+if __name__ == "__main__":
+    # Los tests usan fixtures de conftest.py: se ejecutan a través de pytest
+    raise SystemExit(pytest.main([__file__, "-q", "-s"]))
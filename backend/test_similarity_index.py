@@ -0,0 +1,120 @@
+"""
+Test unitario para el índice de trigramas del mood cache.
+Lo compara con el scan lineal con SequenceMatcher: en el seed set devuelve
+siempre el mismo mejor match; en un set denso el match es aproximado y se
+acota cuánto puede diferir.
+"""
+import json
+import random
+from difflib import SequenceMatcher
+
+from services.mood_cache_service import TrigramIndex
+
+
+def linear_scan(keys, query, threshold):
+    best_match = None
+    best_similarity = 0.0
+    for cached_query in keys:
+        similarity = SequenceMatcher(None, query, cached_query).ratio()
+        if similarity > best_similarity and similarity >= threshold:
+            best_similarity = similarity
+            best_match = cached_query
+    return best_match
+
+
+def dense_keys(rng, count):
+    """Queries sintéticas que comparten casi todas las palabras entre sí"""
+    moods = ["sad", "happy", "calm", "angry", "tired", "focused", "nostalgic", "anxious"]
+    activities = ["studying", "working out", "driving", "cooking", "reading", "running", "coding", "walking"]
+    times = ["at night", "in the morning", "late at night", "on sunday", "after work", "in the rain", "at 3am"]
+    extras = ["", " with friends", " alone", " after a breakup", " at the beach", " on the train"]
+    keys = set()
+    while len(keys) < count:
+        keys.add(f"{rng.choice(moods)} {rng.choice(activities)} {rng.choice(times)}{rng.choice(extras)}")
+    return sorted(keys)
+
+
+def test_index_matches_linear_scan():
+    with open("datasets/mood_cache.json", "r", encoding="utf-8") as f:
+        keys = list(json.load(f).keys())
+
+    index = TrigramIndex()
+    for key in keys:
+        index.add(key)
+
+    rng = random.Random(7)
+    queries = [
+        "estudiando examen final 3am",
+        "study exam 3am",
+        "sad breakup",
+        "beach party with my friends",
+        "something completely unrelated",
+    ]
+    for _ in range(100):
+        chars = list(rng.choice(keys))
+        for _ in range(rng.randint(1, 5)):
+            chars.pop(rng.randrange(len(chars)))
+        queries.append("".join(chars))
+
+    mismatches = 0
+    for query in queries:
+        for threshold in (0.6, 0.75, 0.9):
+            got, _ = index.best_match(query, threshold)
+            if got != linear_scan(keys, query, threshold):
+                mismatches += 1
+                print(f"❌ Mismatch for '{query}' @ {threshold}")
+
+    print(f"✅ {len(queries) * 3 - mismatches}/{len(queries) * 3} lookups match the linear scan")
+    assert mismatches == 0
+
+
+def test_index_on_dense_set_is_approximate_but_close():
+    # Con esta semilla el índice difiere del scan lineal en 1 de 180 búsquedas
+    rng = random.Random(3)
+    keys = dense_keys(rng, 250)
+    index = TrigramIndex()
+    for key in keys:
+        index.add(key)
+
+    # Palabras mezcladas de dos entradas: muchas keys empatan en trigramas
+    # compartidos y el mejor match puede quedar fuera de los candidatos
+    queries = []
+    for _ in range(60):
+        words = [rng.choice(pair) for pair in zip(rng.choice(keys).split(), rng.choice(keys).split())]
+        if rng.random() < 0.5:
+            rng.shuffle(words)
+        queries.append(" ".join(words))
+
+    lookups = mismatches = 0
+    worst_gap = 0.0
+    for query in queries:
+        for threshold in (0.6, 0.75, 0.9):
+            got, similarity = index.best_match(query, threshold)
+            expected = linear_scan(keys, query, threshold)
+            lookups += 1
+            if got != expected:
+                mismatches += 1
+                expected_similarity = SequenceMatcher(None, query, expected).ratio() if expected else 0.0
+                # Sin match, best_match devuelve la mejor similitud que ha visto
+                worst_gap = max(worst_gap, expected_similarity - similarity)
+
+    print(f"✅ Dense set: {mismatches}/{lookups} lookups differ, worst similarity gap {worst_gap:.3f}")
+    assert mismatches <= 0.02 * lookups
+    assert worst_gap <= 0.05
+
+
+def test_index_remove():
+    index = TrigramIndex()
+    index.add("studying late at night")
+    index.add("working out at gym")
+    index.remove("studying late at night")
+
+    key, _ = index.best_match("studying late at nite", 0.75)
+    assert key is None
+    assert len(index) == 1
+
+
+if __name__ == "__main__":
+    test_index_matches_linear_scan()
+    test_index_on_dense_set_is_approximate_but_close()
+    test_index_remove()
@@ -0,0 +1,43 @@
+"""
+Test unitario para el single-flight de analyze_mood.
+Sustituye Hugging Face por un fake y usa un caché temporal.
+"""
+import asyncio
+import os
+import tempfile
+
+from services import llm_service
+from services.mood_cache_service import MoodCacheService
+
+
+def test_concurrent_identical_queries_share_one_llm_call():
+    calls = []
+
+    async def fake_huggingface(query, language="en"):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return {"mood_tags": ["focused"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi 2026"}
+
+    original_hf, original_cache = llm_service.analyze_with_huggingface, llm_service.mood_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        llm_service.analyze_with_huggingface = fake_huggingface
+        llm_service.mood_cache = MoodCacheService(cache_file=os.path.join(tmp, "mood_cache.json"))
+        try:
+            async def burst():
+                queries = ["something for this evening"] * 8 + ["Something for this evening!", "  something for this evening  "]
+                return await asyncio.gather(*(llm_service.analyze_mood(q) for q in queries))
+
+            results = asyncio.run(burst())
+        finally:
+            llm_service.mood_cache.close()
+            llm_service.analyze_with_huggingface = original_hf
+            llm_service.mood_cache = original_cache
+
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    assert not llm_service._in_flight
+    print(f"✅ {len(results)} concurrent analyses → {len(calls)} LLM call")
+
+
+if __name__ == "__main__":
+    test_concurrent_identical_queries_share_one_llm_call()
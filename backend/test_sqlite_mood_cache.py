@@ -0,0 +1,117 @@
+"""
+Test unitario del mood cache en SQLite compartido entre workers.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from services.sqlite_mood_cache import SQLiteMoodCacheService
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MOOD = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+
+WRITER = r"""
+import sys
+from services.sqlite_mood_cache import SQLiteMoodCacheService
+cache = SQLiteMoodCacheService(db_file=sys.argv[1], import_file=None)
+for i in range(200):
+    cache.add(f"{sys.argv[2]} query {i}", {"worker": sys.argv[2], "i": i})
+cache.close()
+"""
+
+
+def test_entries_are_shared_between_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "mood_cache.db")
+        worker_a = SQLiteMoodCacheService(db_file=db_file, import_file=None, sync_interval=0.0)
+        worker_b = SQLiteMoodCacheService(db_file=db_file, import_file=None, sync_interval=0.0)
+        assert worker_b.get_similar("rainy sunday morning") is None
+        
+        worker_a.add("Rainy Sunday Morning", MOOD)
+        assert worker_a.flush()
+        
+        # B no lo tiene en su hot tier: lo lee de la base y sincroniza el índice
+        assert worker_b.get_similar("rainy sunday morning") == MOOD
+        assert worker_b.hot.get_stats()["size"] == 1
+        assert worker_b.get_similar("rainy sunday mornings") == MOOD
+        assert len(worker_b) == 1 and worker_b.get_stats()["backend"] == "sqlite"
+        
+        # Hit del hot tier: no toca SQLite
+        hits = worker_b.hot.hits
+        assert worker_b.get_similar("rainy sunday morning") == MOOD
+        assert worker_b.hot.hits == hits + 1
+        worker_a.close()
+        worker_b.close()
+        print("✅ Shared entries")
+
+
+def test_imports_json_snapshot_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "mood_cache.db")
+        snapshot = os.path.join(tmp, "mood_cache.json")
+        with open(snapshot, "w", encoding="utf-8") as f:
+            json.dump({"late night drive": MOOD, "gym session": {**MOOD, "energy": "high"}}, f)
+        
+        cache = SQLiteMoodCacheService(db_file=db_file, import_file=snapshot)
+        assert len(cache) == 2
+        assert cache.get_similar("Gym Session")["energy"] == "high"
+        cache.add("focus", MOOD)
+        cache.close()
+        
+        # La base ya tiene datos: el snapshot no se vuelve a importar
+        with open(snapshot, "w", encoding="utf-8") as f:
+            json.dump({"something else": MOOD}, f)
+        reopened = SQLiteMoodCacheService(db_file=db_file, import_file=snapshot)
+        assert len(reopened) == 3 and reopened.get_similar("something else", threshold=0.95) is None
+        reopened.close()
+        print("✅ Snapshot import")
+
+
+def test_concurrent_processes_lose_no_entries():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "mood_cache.db")
+        SQLiteMoodCacheService(db_file=db_file, import_file=None).load()
+        workers = [
+            subprocess.Popen([sys.executable, "-c", WRITER, db_file, name], cwd=BACKEND_DIR)
+            for name in ("alpha", "beta", "gamma")
+        ]
+        assert all(worker.wait(timeout=60) == 0 for worker in workers)
+        
+        cache = SQLiteMoodCacheService(db_file=db_file, import_file=None)
+        assert len(cache) == 600
+        assert cache.get_similar("beta query 199") == {"worker": "beta", "i": 199}
+        print("✅ 3 processes, 600 entries")
+
+
+def test_fallback_ttl_and_max_entries_prune_the_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "mood_cache.db")
+        cache = SQLiteMoodCacheService(db_file=db_file, import_file=None, max_entries=3,
+                                       fallback_ttl=0.2, prune_interval=0.0)
+        cache.add("hf is down right now", MOOD, fallback=True)
+        for i in range(3):
+            cache.add(f"query number {i}", MOOD)
+        assert cache.flush()
+        assert cache.get_similar("hf is down right now") == MOOD
+        
+        time.sleep(0.25)
+        # len() cuenta filas vivas aunque la key expirada siga en el índice
+        assert len(cache) == 3 and len(cache.index) == 4
+        assert cache.get_similar("hf is down right now") is None
+        
+        # La siguiente escritura poda: fuera las expiradas y lo que pase de max_entries
+        cache.add("query number 3", MOOD)
+        cache.close()
+        rows = cache._reader().execute("SELECT key FROM mood_cache ORDER BY id").fetchall()
+        assert [key for key, in rows] == [cache.make_key(f"query number {i}") for i in (1, 2, 3)]
+        print("✅ SQLite TTL + max_entries")
+
+
+if __name__ == "__main__":
+    test_entries_are_shared_between_instances()
+    test_imports_json_snapshot_once()
+    test_concurrent_processes_lose_no_entries()
+    test_fallback_ttl_and_max_entries_prune_the_database()
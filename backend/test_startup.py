@@ -0,0 +1,75 @@
+"""
+Test unitario del arranque en frío: carga perezosa y warm-up en background.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from services.lazy_import import LazyInstance, LazyModule
+from services.mood_cache_service import MoodCacheService
+
+RESULT = {"mood_tags": ["calm"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"}
+
+
+def test_mood_cache_and_modules_load_on_first_use():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "mood_cache.json")
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump({"studying late at night": RESULT}, f)
+        
+        cache = MoodCacheService(cache_file=cache_file)
+        # Construir el servicio no lee disco
+        assert not cache.loaded
+        assert cache.get_similar("Studying late at night") == RESULT
+        assert cache.loaded and len(cache.index) == 1
+        cache.close()
+    
+    module = LazyModule("colorsys")
+    assert not module.loaded
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert module.loaded
+    
+    built = []
+    instance = LazyInstance(lambda: built.append(1) or type("Service", (), {"name": "a"})())
+    assert not instance.loaded and not built
+    instance.name = "b"
+    assert instance.name == "b" and built == [1]
+
+
+def test_import_main_does_not_load_http_clients():
+    # Proceso nuevo: aquí TestClient ya ha importado httpx
+    probe = (
+        "import sys, main; "
+        "print(sorted(m for m in ('httpx', 'services.huggingface_service', 'services.llm_service') if m in sys.modules), "
+        "main.deezer_auth_service.loaded)"
+    )
+    backend = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", probe], cwd=backend, capture_output=True, text=True,
+                            env={**os.environ, "LOG_LEVEL": "WARNING"})
+    assert result.stdout.strip().splitlines()[-1] == "[] False", result.stderr[-2000:]
+
+
+def test_health_answers_while_warmup_runs_in_background():
+    with TestClient(main.app) as client:
+        start = time.perf_counter()
+        assert client.get("/health").json() == {"status": "ok"}
+        assert time.perf_counter() - start < 0.5
+        
+        client.portal.call(main.startup_warmup.wait)
+        warmup = client.get("/api/health").json()["warmup"]
+        assert warmup["status"] == "done"
+        assert all(step["ok"] for step in warmup["steps"].values())
+        assert main.mood_cache.loaded
+        print(f"✅ Warm-up: {warmup}")
+
+
+if __name__ == "__main__":
+    test_mood_cache_and_modules_load_on_first_use()
+    test_import_main_does_not_load_http_clients()
+    test_health_answers_while_warmup_runs_in_background()
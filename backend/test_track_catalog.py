@@ -0,0 +1,128 @@
+"""
+Test unitario para TrackCatalogService y DeezerService.discover_tracks
+Usa un catálogo SQLite temporal y httpx.MockTransport en vez de Deezer.
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+import httpx
+
+from services.deezer_service import DeezerService
+from services.track_catalog_service import TrackCatalogService
+
+
+def make_items(base: int, count: int = 12):
+    return [
+        {
+            "id": base + i,
+            "title": f"Track {base + i}",
+            "artist": {"name": f"Artist {base + i}"},
+            "album": {"title": "Album", "cover_medium": "https://example.com/c.jpg"},
+            "link": f"https://www.deezer.com/track/{base + i}",
+            "preview": None,
+            "duration": 180,
+            "rank": base + i
+        }
+        for i in range(count)
+    ]
+
+
+def test_catalog_ingest_and_find_by_genre_and_energy():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = TrackCatalogService(db_file=os.path.join(tmp, "catalog.db"))
+        catalog.ingest(make_items(0), ["Lo-Fi", "ambient"], "low", catalog.coverage_key(["lo-fi", "ambient"], "low"))
+        catalog.ingest(make_items(100), ["lo-fi"], "high")
+        catalog.ingest(make_items(200), ["rock"], "high")
+        assert catalog.flush()
+
+        tracks, needs_refresh = catalog.find(["lo-fi", "ambient"], "low", limit=10)
+        # Los tracks con los dos géneros y la energía pedida van primero
+        assert [t["id"] for t in tracks] == list(range(11, 1, -1))
+        assert not needs_refresh
+
+        tracks, needs_refresh = catalog.find(["lo-fi"], "high", limit=5)
+        assert [t["id"] for t in tracks] == [111, 110, 109, 108, 107]
+        assert needs_refresh
+
+        assert catalog.find(["jazz"], "low")[0] == []
+        with sqlite3.connect(catalog.db_file) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert catalog.get_stats()["total_tracks"] == 36
+        catalog.close()
+
+
+def test_discover_tracks_serves_from_catalog_and_tops_up():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={"data": make_items(len(calls) * 100)})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = TrackCatalogService(db_file=os.path.join(tmp, "catalog.db"), refresh_after=0.05)
+        service = DeezerService(catalog=catalog)
+        service._client = httpx.AsyncClient(base_url=service.api_base_url, transport=httpx.MockTransport(handler))
+
+        async def scenario():
+            first = await service.discover_tracks(["calm"], ["lo-fi", "ambient"], "low", 10)
+            assert first["source"] == "deezer" and calls == ["lo-fi ambient"]
+            assert catalog.flush()
+
+            # Ya hay cobertura: responde el catálogo sin llamar a Deezer
+            second = await service.discover_tracks(["calm"], ["ambient", "lo-fi"], "low", 10)
+            assert second["source"] == "catalog" and len(second["tracks"]) == 10
+            assert calls == ["lo-fi ambient"]
+
+            # Cobertura desactualizada: se sirve igual y se refresca en background
+            await asyncio.sleep(0.06)
+            third = await service.discover_tracks(["calm"], ["lo-fi", "ambient"], "low", 10)
+            assert third["source"] == "catalog"
+            await asyncio.sleep(0.01)
+            assert calls == ["lo-fi ambient", "lo-fi ambient"]
+            await service.aclose()
+
+        asyncio.run(scenario())
+        assert catalog.flush()
+        assert catalog.get_stats()["total_tracks"] == 24
+        catalog.close()
+
+
+def test_fallback_strategies_do_not_cover_the_genre_combo():
+    calls = []
+
+    def handler(request):
+        query = request.url.params["q"]
+        calls.append(query)
+        # Sin resultados para los géneros: responden un género y la estrategia por energía
+        return httpx.Response(200, json={"data": {"lo-fi ambient": [], "lo-fi": make_items(0), "chill ambient": make_items(100)}[query]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = TrackCatalogService(db_file=os.path.join(tmp, "catalog.db"))
+        service = DeezerService(catalog=catalog)
+        service._client = httpx.AsyncClient(base_url=service.api_base_url, transport=httpx.MockTransport(handler))
+
+        async def scenario():
+            result = await service.search_tracks_parallel(["calm"], ["lo-fi", "ambient"], "low", 10)
+            assert result["success"] and set(calls) == {"lo-fi ambient", "lo-fi", "chill ambient"}
+            assert catalog.flush()
+            await service.aclose()
+
+        asyncio.run(scenario())
+
+        # "chill ambient" y "lo-fi" no son "lo-fi + ambient": la combinación sigue sin cubrir
+        assert catalog.find(["lo-fi", "ambient"], "low")[0] == []
+        assert len(catalog.find(["lo-fi"], "low")[0]) == 10
+        assert len(catalog.find(["chill", "ambient"], "low")[0]) == 10
+        with sqlite3.connect(catalog.db_file) as conn:
+            covered = {key for key, in conn.execute("SELECT key FROM coverage")}
+        assert covered == {catalog.coverage_key(["lo-fi"], "low")}
+        catalog.close()
+
+
+if __name__ == "__main__":
+    test_catalog_ingest_and_find_by_genre_and_energy()
+    test_discover_tracks_serves_from_catalog_and_tops_up()
+    test_fallback_strategies_do_not_cover_the_genre_combo()
+    print("✅ Track catalog tests passed")
@@ -0,0 +1,99 @@
+"""
+Test unitario del caché de perfiles de Deezer (/auth/deezer/user).
+Usa httpx.MockTransport en vez de api.deezer.com.
+"""
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from services.deezer_auth_service import hash_token
+
+
+def test_user_profile_is_cached_by_token_hash_and_evicted_on_logout():
+    calls = []
+
+    def handler(request):
+        token = request.url.params["access_token"]
+        calls.append(token)
+        if token == "bad-token":
+            return httpx.Response(200, json={"error": {"type": "OAuthException", "message": "Invalid", "code": 300}})
+        if token == "odd-token":
+            return httpx.Response(200, json=["not", "a", "profile"])
+        return httpx.Response(200, json={"id": 7, "name": "Ana", "picture_small": "https://example.com/a.jpg"})
+
+    auth = main.deezer_auth_service
+    original = (auth._client, auth.api_url)
+    auth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    auth.api_url = "http://deezer"
+    auth.user_cache.clear()
+    try:
+        with TestClient(main.app) as client:
+            client.cookies.set("deezer_token", "good-token")
+            first = client.get("/auth/deezer/user").json()
+            second = client.get("/auth/deezer/user").json()
+            assert calls == ["good-token"]
+            assert first == second and first["user"]["name"] == "Ana"
+
+            # Nunca el token en claro como clave
+            assert hash_token("good-token") in auth.user_cache
+            assert "good-token" not in auth.user_cache
+
+            client.post("/auth/deezer/logout")
+            assert hash_token("good-token") not in auth.user_cache
+
+            client.cookies.set("deezer_token", "good-token")
+            client.get("/auth/deezer/user")
+            assert calls == ["good-token", "good-token"]
+
+            # Los errores no se cachean
+            client.cookies.set("deezer_token", "bad-token")
+            assert client.get("/auth/deezer/user").json() == {"authenticated": False, "user": None}
+            client.get("/auth/deezer/user")
+            assert calls.count("bad-token") == 2
+
+            # Una respuesta que no es un objeto tampoco rompe la ruta
+            client.cookies.set("deezer_token", "odd-token")
+            assert client.get("/auth/deezer/user").json() == {"authenticated": False, "user": None}
+    finally:
+        auth._client, auth.api_url = original
+        auth.user_cache.clear()
+
+    print(f"✅ User cache: {auth.user_cache.get_stats()}")
+
+
+def test_oauth_callback_exchanges_code_without_blocking():
+    """El callback usa el cliente httpx asíncrono (no requests) y deja el perfil en caché"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/oauth/access_token.php":
+            if request.url.params["code"] != "good-code":
+                return httpx.Response(200, text="wrong code")
+            return httpx.Response(200, json={"access_token": "fresh-token", "expires": 0})
+        return httpx.Response(200, json={"id": 7, "name": "Ana"})
+
+    auth = main.deezer_auth_service
+    original = (auth._client, auth.api_url, auth.oauth_url)
+    auth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    auth.api_url = "http://deezer"
+    auth.oauth_url = "http://deezer/oauth"
+    auth.user_cache.clear()
+    try:
+        with TestClient(main.app) as client:
+            response = client.get("/auth/deezer/callback", params={"code": "good-code"}, follow_redirects=False)
+            assert response.status_code in (302, 307)
+            assert "user=Ana" in response.headers["location"]
+            assert hash_token("fresh-token") in auth.user_cache
+
+            assert client.get("/auth/deezer/callback", params={"code": "bad"}, follow_redirects=False).status_code == 401
+        assert calls == ["/oauth/access_token.php", "/user/me", "/oauth/access_token.php"]
+    finally:
+        auth._client, auth.api_url, auth.oauth_url = original
+        auth.user_cache.clear()
+    print("✅ OAuth callback")
+
+
+if __name__ == "__main__":
+    test_user_profile_is_cached_by_token_hash_and_evicted_on_logout()
+    test_oauth_callback_exchanges_code_without_blocking()
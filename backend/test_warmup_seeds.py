@@ -0,0 +1,112 @@
+"""
+Test unitario del warm-up con queries semilla.
+Usa httpx.MockTransport en vez de api.deezer.com y un analizador falso.
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import httpx
+
+from services import warmup_service
+from services.deezer_scheduler import DeezerScheduler, Priority
+from services.deezer_service import DeezerService
+from services.mood_cache_service import MoodCacheService
+from services.warmup_service import WarmupService, load_seeds
+
+MOODS = {
+    "studying late night": {"mood_tags": ["focused"], "energy": "low", "genres": ["lo-fi"], "search_query": "lofi"},
+    "triste después de ruptura": {"mood_tags": ["sad"], "energy": "low", "genres": ["balada"], "search_query": "balada"},
+}
+
+
+def test_seed_file_is_deduplicated_and_limited():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "seeds.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([
+                {"query": "gym  workout", "language": "en"},
+                {"query": "gym workout", "language": "en"},
+                {"query": "fiesta con amigos", "language": "es"},
+                {"query": "", "language": "en"},
+                {"query": "party", "language": "fr"},
+                {"query": "chill", "language": "en"},
+            ], f)
+        assert load_seeds(path) == [("gym workout", "en"), ("fiesta con amigos", "es"), ("chill", "en")]
+        assert load_seeds(path, limit=2) == [("gym workout", "en"), ("fiesta con amigos", "es")]
+
+
+def test_seeds_prefetch_deezer_at_warmup_priority():
+    calls = []
+    
+    def handler(request):
+        calls.append(request.url.params["q"])
+        item = {
+            "id": len(calls), "title": "Song", "link": "https://www.deezer.com/track/1", "rank": 1,
+            "duration": 200, "preview": None, "artist": {"name": "Artist"}, "album": {"title": "Album"}
+        }
+        return httpx.Response(200, json={"data": [item]})
+    
+    def fake_analyze_mood_local(query, language="en"):
+        # Sin LLM: las semillas que no resuelven caché ni léxico se saltan
+        return MOODS.get(query)
+    
+    async def run(seed_file):
+        scheduler = DeezerScheduler(limit=100, window=1.0, burst=10)
+        service = DeezerService(scheduler=scheduler)
+        service._client = httpx.AsyncClient(base_url="http://deezer", transport=httpx.MockTransport(handler))
+        original = (warmup_service.analyze_mood_local, warmup_service.deezer_service, warmup_service.mood_cache)
+        warmup_service.analyze_mood_local = fake_analyze_mood_local
+        warmup_service.deezer_service = service
+        warmup_service.mood_cache = type("NoopCache", (), {"load": lambda self: None})()
+        try:
+            warmup = WarmupService(seed_file=seed_file, concurrency=2, interval=0.0)
+            warmup.start()
+            await warmup.wait()
+            # Segunda pasada: todo está ya en el caché de búsquedas
+            again = await service.prefetch(["lo-fi"], "low", warmup_service.DISCOVER_LIMIT)
+            return warmup.get_status(), scheduler.get_stats(), again
+        finally:
+            warmup_service.analyze_mood_local, warmup_service.deezer_service, warmup_service.mood_cache = original
+            await service._client.aclose()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_file = os.path.join(tmp, "seeds.json")
+        with open(seed_file, "w", encoding="utf-8") as f:
+            seeds = [{"query": q, "language": "es" if "ó" in q else "en"} for q in MOODS]
+            json.dump(seeds + [{"query": "something for this evening", "language": "en"}], f, ensure_ascii=False)
+        status, scheduler_stats, again = asyncio.run(run(seed_file))
+    
+    assert status["status"] == "done"
+    assert status["seeds"] == {"total": 3, "done": 2, "skipped": 1, "failed": 0, "deezer_requests": 2}
+    assert sorted(calls) == ["balada", "lo-fi"]
+    assert scheduler_stats["granted"] == {Priority.WARMUP.name.lower(): 2}
+    assert again == 0
+    print(f"✅ Seed warm-up: {status}")
+
+
+def test_local_analysis_never_calls_the_llm():
+    from services import llm_service
+    
+    async def fail(*args, **kwargs):
+        raise AssertionError("Hugging Face called during warm-up")
+    
+    original = (llm_service.analyze_with_huggingface, llm_service.mood_cache)
+    with tempfile.TemporaryDirectory() as tmp:
+        llm_service.analyze_with_huggingface = fail
+        llm_service.mood_cache = MoodCacheService(cache_file=os.path.join(tmp, "mood_cache.json"))
+        try:
+            assert llm_service.analyze_mood_local("working out at the gym")["energy"] == "high"
+            assert llm_service.analyze_mood_local("something for this evening") is None
+            # El resultado del léxico queda en caché para el primer request real
+            assert llm_service.mood_cache.get_similar("working out at the gym") is not None
+            llm_service.mood_cache.close()
+        finally:
+            llm_service.analyze_with_huggingface, llm_service.mood_cache = original
+
+
+if __name__ == "__main__":
+    test_seed_file_is_deduplicated_and_limited()
+    test_seeds_prefetch_deezer_at_warmup_priority()
+    test_local_analysis_never_calls_the_llm()